@@ -0,0 +1,96 @@
+"""
+QUASI-MONTE CARLO CONVERGENCE BENCHMARK
+=======================================
+
+Root mean square error of the probability of failure of Monte Carlo 
+simulations (metrics.pf_rmse) against the dynamic Bayesian network of the 
+same component, for the random, Latin hypercube and scrambled Sobol sample 
+designs and an increasing number of samples. Both models are updated with 
+no detection at the inspection years.
+
+The RMSE against the DBN levels off at the discretization error of the 
+DBN, so the sampling error alone is also given, as the RMSE against a 
+Monte Carlo simulation with <reference_samples> Sobol samples.
+"""
+import os
+import numpy as np
+from tabulate import tabulate
+
+from reliabpy.readwrite.ANAST import import_DBN_input_data, get_deterioration_sampler
+from reliabpy.models.inference import ChunkedMonteCarloSimulation, DynamicBayesianNetwork, metrics
+from reliabpy.commons.sampling import DESIGNS
+
+def dbn_reference(input_folder, lifetime, inspections, quality):
+    '''
+    DBN reference
+    =============
+
+    Dynamic Bayesian network of the component, with no detection at the 
+    inspection years.
+    '''
+    dbn = DynamicBayesianNetwork(*import_DBN_input_data(os.path.join(input_folder, "dr_OUT.mat")))
+    dbn.force_notdetection = True
+    for t in range(1, lifetime + 1):
+        dbn.predict()
+        if t in inspections:
+            dbn.update(quality)
+    return dbn
+
+def run_benchmark(input_folder=os.path.join("data", "transition_matrices", "atm"), 
+                  sample_sizes=(2**8, 2**10, 2**12, 2**14, 2**16), designs=DESIGNS, 
+                  repetitions=10, lifetime=20, inspections=(9, 17), quality="bad", 
+                  reference_samples=2**20):
+    '''
+    Run benchmark
+    =============
+
+    Parameters:
+    -----------
+    input_folder : path
+        component folder with dr_OUT.mat and the ANAST inputs
+    sample_sizes : list of int
+        numbers of samples (powers of 2 for Sobol sequences)
+    designs : list of str
+        sample designs
+    repetitions : int
+        number of independent runs (seeds) of each design and size
+    lifetime : int
+        simulation horizon
+    inspections : list of int
+        inspection years (no detection)
+    quality : str
+        inspection quality
+    reference_samples : int
+        number of samples of the reference Monte Carlo simulation
+
+    Returns:
+    --------
+    results : list of dict
+        mean pf RMSE against the DBN and against the reference Monte Carlo 
+        simulation, per design and size
+    '''
+    dbn = dbn_reference(input_folder, lifetime, inspections, quality)
+    observations = {t: (quality, np.zeros((1, 1))) for t in inspections}
+
+    sampler, a_crit = get_deterioration_sampler(input_folder, "sobol", seed=repetitions)
+    reference = ChunkedMonteCarloSimulation(sampler, a_crit, reference_samples, chunk_size=2**16)
+    reference.run(lifetime, observations)
+
+    results = list()
+    for n_samples in sample_sizes:
+        row = {"samples" : n_samples}
+        for design in designs:
+            rmse_dbn, rmse_mcs = list(), list()
+            for seed in range(repetitions):
+                sampler, a_crit = get_deterioration_sampler(input_folder, design, seed)
+                mcs = ChunkedMonteCarloSimulation(sampler, a_crit, n_samples, chunk_size=n_samples)
+                mcs.run(lifetime, observations)
+                rmse_dbn.append(metrics.pf_rmse(mcs, dbn))
+                rmse_mcs.append(metrics.pf_rmse(mcs, reference))
+            row[f"{design} vs DBN"] = np.mean(rmse_dbn)
+            row[f"{design} vs MCS"] = np.mean(rmse_mcs)
+        results.append(row)
+    return results
+
+if __name__ == '__main__':
+    print(tabulate(run_benchmark(), headers="keys", floatfmt=".3g"))
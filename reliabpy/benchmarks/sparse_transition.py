@@ -0,0 +1,66 @@
+"""
+SPARSE TRANSITION MATRICES BENCHMARK
+====================================
+
+Compare belief propagation time and memory of dense and sparse transition 
+matrices for the bundled ANAST zones (atm, sub and bur).
+"""
+import os
+import timeit
+import torch
+from tabulate import tabulate
+
+from reliabpy.readwrite.ANAST import import_DBN_input_data
+from reliabpy.models.inference import transition_tensor, propagate
+
+def tensor_nbytes(T):
+    '''
+    Tensor bytes
+    ============
+
+    Memory used by a dense or sparse compressed tensor.
+    '''
+    if T.layout == torch.strided:
+        return T.element_size()*T.nelement()
+    return sum(x.element_size()*x.nelement() for x in (T.ccol_indices(), T.row_indices(), T.values()))
+
+def run_benchmark(input_folder=os.path.join("data", "transition_matrices"), zones=("atm", "sub", "bur"), batch_size=1000, number=100):
+    '''
+    Run benchmark
+    =============
+
+    Parameters:
+    -----------
+    input_folder : path
+        folder with one <zone>/dr_OUT.mat per zone
+    zones : list of str
+        zones to benchmark
+    batch_size : int
+        number of beliefs propagated at once in the batched case
+    number : int
+        number of repetitions of each propagation
+
+    Returns:
+    --------
+    results : list of dict
+        timings (in microseconds) and memory (in kB) per zone and storage
+    '''
+    results = list()
+    for zone in zones:
+        T, s0, _ = import_DBN_input_data(os.path.join(input_folder, zone, "dr_OUT.mat"))
+        s = torch.Tensor(s0)
+        S = s.expand(batch_size, -1).clone()
+        for storage in ("dense", "sparse"):
+            T_tensor = transition_tensor(T, storage)
+            results.append({
+                "zone" : zone,
+                "storage" : storage,
+                "density" : T.nnz/(T.shape[0]*T.shape[1]),
+                "memory [kB]" : tensor_nbytes(T_tensor)/1e3,
+                "s*T [us]" : timeit.timeit(lambda: propagate(s, T_tensor), number=number)/number*1e6,
+                f"S*T, {batch_size} beliefs [us]" : timeit.timeit(lambda: propagate(S, T_tensor), number=max(1, number//10))/max(1, number//10)*1e6,
+            })
+    return results
+
+if __name__ == '__main__':
+    print(tabulate(run_benchmark(), headers="keys", floatfmt=".4g"))
@@ -46,7 +46,7 @@ class OneEpisode:
         
         ax = axes[1]
         ax.set_title('System probability of failure')
-        ax.plot(np.array(system_pf)[:, 0], np.array(system_pf)[:, 1])
+        ax.plot(np.array(system_pf)[:, 0], np.array(system_pf)[:, 2])
 
         ax = axes[2]
         t, C_C, C_I, C_R, R_F, C_T = self.system_model.yearly_costs_breakdown.values()
@@ -84,7 +84,7 @@ class OneEpisode:
         fig.add_trace(
             go.Scatter(
                 x=np.array(system_pf)[:, 0], 
-                y=np.array(system_pf)[:, 1],
+                y=np.array(system_pf)[:, 2],
                 line=dict(color='#c20000'),
                 name='System',
                 hovertemplate='Year: %{x}<br>P_F:%{y}'
@@ -124,18 +124,19 @@ class OneEpisode:
 
         # system
         df_system = pd.DataFrame(self.system_model.system_pf)
-        df_system.columns = ['t', 'pf']
-        df_system.set_index('t', inplace=True)
+        df_system.columns = ['t', 'phase', 'pf']
+        df_system.set_index(['t', 'phase'], inplace=True)
         df_system.to_excel(writer, sheet_name="System_PF")
 
         # components
         for component in self.system_model.components_list:
             temp_df = pd.DataFrame({
             't' : component.t, 
+            'phase' : component.phase, 
             'pf' : np.array(component.pf), 
             'action' : component.action, 
             'output' : component.output})
-            temp_df.set_index('t', inplace=True)
+            temp_df.set_index(['t', 'phase'], inplace=True)
             temp_df.to_excel(writer, sheet_name=component.id)
         
         writer.save()
@@ -161,21 +162,9 @@ class OneEpisode:
         list_df, comp_names = list(), list()
         for component in self.system_model.components_list:
             comp_names.append(component.id)
-            t = np.array(component.t, dtype=float)
-            pf = component.pf
-            mask = np.append([False], ~(t[1:] - t[:-1]).astype(bool))
-            if any(mask):
-                add_sth = 0.000001
-                t[mask] += np.linspace(add_sth, add_sth*mask.sum(), num=mask.sum())
-            list_df.append(pd.DataFrame(data=pf, index=t, columns=['pf']))
-        system_pf = np.array(self.system_model.system_pf)
-        t = system_pf[:, 0]
-        pf = system_pf[:, 1]
-        list_df.append(pd.DataFrame(index = system_pf[:, 0], data = system_pf[:, 1]))
-        mask = np.append([False], ~(t[1:] - t[:-1]).astype(bool))
-        if any(mask):
-            add_sth = 0.000001
-            t[mask] += np.linspace(add_sth, add_sth*mask.sum(), num=mask.sum())
+            list_df.append(pd.DataFrame(data=component.pf, index=self._index(component.t, component.phase), columns=['pf']))
+        t, phase, pf = zip(*self.system_model.system_pf)
+        list_df.append(pd.DataFrame(data=np.array(pf), index=self._index(t, phase)))
         comp_names.append("SYSTEM")
         df_pfs = pd.concat(list_df, axis=1, join='outer')
         df_pfs.columns = comp_names
@@ -192,10 +181,11 @@ class OneEpisode:
     def _build_maps(self, components_list):
         list_i, list_a, list_o = list(), list(), list()
         for comp in components_list:
-            id, t, a, o = comp.id, comp.t, comp.action, comp.output
+            id, a, o = comp.id, comp.action, comp.output
+            index = self._index(comp.t, comp.phase)
             list_i.append(id)
-            list_a.append(pd.DataFrame(a, index=t))
-            list_o.append(pd.DataFrame(o, index=t))
+            list_a.append(pd.DataFrame(a, index=index))
+            list_o.append(pd.DataFrame(o, index=index))
 
         df_action = pd.concat(list_a, axis=1, join='outer')
         df_output = pd.concat(list_o, axis=1, join='outer')
@@ -205,6 +195,11 @@ class OneEpisode:
 
         return df_action, df_output
 
+    @staticmethod
+    def _index(t, phase):
+        # (year, phase) rows, unique without shifting the time
+        return pd.MultiIndex.from_arrays([np.asarray(t, dtype=int), np.asarray(phase, dtype=int)], names=['t', 'phase'])
+
 class MonteCarlo:
     def __init__(self, folderpath):
         all_policies = list()
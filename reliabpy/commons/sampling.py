@@ -0,0 +1,60 @@
+"""
+SAMPLING DESIGNS
+================
+
+Uniform sample designs in [0, 1)^dim, to be mapped to random inputs through 
+their inverse CDFs: plain random sampling, Latin hypercube sampling and 
+scrambled Sobol sequences (quasi-Monte Carlo).
+"""
+import numpy as np
+from scipy.stats import qmc
+
+DESIGNS = ("random", "lhs", "sobol")
+
+class UniformSampler:
+    '''
+    Uniform sampler
+    ===============
+
+    Successive calls continue the design: a Sobol sequence goes on with its 
+    next points, so chunks of 2^k points keep its balance properties, while 
+    each call of the Latin hypercube design is a new hypercube.
+
+    Parameters
+    ----------
+    dim : int
+        number of random inputs
+    design : str
+        "random", "lhs" or "sobol"
+    seed : int, optional
+        seed of the design (random generator and scrambling)
+    '''
+    def __init__(self, dim, design="random", seed=None):
+        if design not in DESIGNS:
+            raise ValueError(f"Unknown sample design: {design}")
+        self.dim = dim
+        self.design = design
+        self.rng = np.random.default_rng(seed)
+        if design == "lhs":
+            self.engine = qmc.LatinHypercube(dim, seed=self.rng)
+        elif design == "sobol":
+            self.engine = qmc.Sobol(dim, scramble=True, seed=self.rng)
+
+    def __call__(self, n):
+        '''
+        Sample
+        ======
+
+        Parameters
+        ----------
+        n : int
+            number of points
+
+        Returns
+        -------
+        p : array
+            (n x dim) points in [0, 1)
+        '''
+        if self.design == "random":
+            return self.rng.random((n, self.dim))
+        return self.engine.random(n)
@@ -1,4 +1,4 @@
-from reliabpy.models.base import SystemLevel
+from reliabpy.models.base import SystemLevel, FarmLevel
 from reliabpy.models.inference import DynamicBayesianNetwork 
 from reliabpy.policy.policy import HeuristicRules, UserDefined
 from reliabpy.models.system_effects import System_of_Subsystems
@@ -7,6 +7,7 @@ from reliabpy.readwrite.ANAST import import_DBN_input_data
 # from reliabpy.policy import optimization
 
 import os
+from copy import copy
 
 class Simple:
     """
@@ -24,7 +25,7 @@ class Simple:
     - System dependencies : series system of k-out-of-n subsystems.
     - Cost model: for inspetion and maintenance.
     """
-    def __init__(self, input_folder="data\\transition_matrices", output_folder="data"):
+    def __init__(self, input_folder=os.path.join("data", "transition_matrices"), output_folder="data"):
         self.input_folder = input_folder
         self.output_folder = output_folder
 
@@ -43,9 +44,9 @@ class Simple:
             System model for the offshroe wind turbine.
         """
         # TODO: change when we have transittion matrix
-        atmosphetic_zone_inputs = import_DBN_input_data(os.path.join(self.input_folder, "atm\\dr_OUT.mat"))
-        submerged_zone__inputs = import_DBN_input_data(os.path.join(self.input_folder, "sub\\dr_OUT.mat"))
-        buried_zone_inputs = import_DBN_input_data(os.path.join(self.input_folder, "bur\\dr_OUT.mat"))
+        atmosphetic_zone_inputs = import_DBN_input_data(os.path.join(self.input_folder, "atm", "dr_OUT.mat"))
+        submerged_zone__inputs = import_DBN_input_data(os.path.join(self.input_folder, "sub", "dr_OUT.mat"))
+        buried_zone_inputs = import_DBN_input_data(os.path.join(self.input_folder, "bur", "dr_OUT.mat"))
 
         atmosphetic_zone_model = DynamicBayesianNetwork(*atmosphetic_zone_inputs)
         submerged_zone_model = DynamicBayesianNetwork(*submerged_zone__inputs)
@@ -116,29 +117,95 @@ class Simple:
 
         return self.monopile
 
-    def run_one_episode(self):
+    def run_one_episode(self, batch_size=None, seed=None, cost_only=False):
         """
         Run one episode
         ===============
 
         Run model for a lifetime of 20 years.
 
+        Parameters:
+        -----------
+        batch_size : int, optional
+            number of episodes simulated at once (batched inference).
+        seed : int, optional
+            seed of the observation outcomes.
+        cost_only : bool
+            only accumulate the costs, without storing the trajectory.
+
         Return:
         -------
-        cost_breakdown : dict
+        cost_breakdown : dict (or list of dict with <batch_size>)
             Dicionary with the cost breakdown:
                 C_C : campain costs
                 C_I : inspection costs
                 C_R : repair costs
                 R_F : risk of failure
         """
-        self.monopile.run(lifetime=20)
+        self.monopile.run(lifetime=20, batch_size=batch_size, seed=seed, cost_only=cost_only)
         return self.monopile.cost_breakdown
     
     def save_results(self, savefolder = None):
         if savefolder is not None:
             self.monopile.post_process(savefolder)
 
+class Farm(Simple):
+    """
+    Farm model
+    ==========
+
+    Offshore wind farm of identical Simple turbines, with shared inspection 
+    campaigns (see FarmLevel).
+    """
+    def mount_model(self, 
+                    n_turbines = 100,
+                    turbine_k = 95,
+                    zone_k = {"atm":3, "sub":3, "bur":3}, 
+                    policy_rules = None):
+        """
+        Mount model
+        ===========
+        
+        Mount the farm model, the turbine being the Simple model.
+
+        Returns:
+        --------
+        model : Initialized farm model
+            Farm model.
+        """
+        if policy_rules is None:
+            policy_rules = HeuristicRules(delta_t = 4, nI = 6, to_avoid=[8,9,10,11])
+        # the turbine and the farm each import their own policy rules
+        turbine = Simple.mount_model(self, zone_k, copy(policy_rules))
+        self.farm = FarmLevel(
+            turbine, n_turbines, turbine_k, 
+            policy_rules = policy_rules,
+            cost_model = InspectionMaintenance(c_c=5.0, c_i=1.0, c_r=10.0, c_f=10000, r=0.02))
+
+        return self.farm
+
+    def run_one_episode(self, batch_size=None, seed=None):
+        """
+        Run one episode
+        ===============
+
+        Run model for a lifetime of 20 years.
+
+        Parameters:
+        -----------
+        batch_size : int, optional
+            number of episodes simulated at once.
+        seed : int, optional
+            seed of the observation outcomes.
+
+        Return:
+        -------
+        cost_breakdown : dict (or list of dict with <batch_size>)
+            Dicionary with the farm cost breakdown.
+        """
+        self.farm.run(lifetime=20, batch_size=batch_size, seed=seed)
+        return self.farm.cost_breakdown
+
 class _Simple_ComponentLevel(Simple):
     def mount_model(self, component):
         """
@@ -148,7 +215,7 @@ class _Simple_ComponentLevel(Simple):
         Just for study case
         """
         # TODO: change when we have transittion matrix
-        zone_inputs = import_DBN_input_data(os.path.join(self.input_folder, component + "\\dr_OUT.mat"))
+        zone_inputs = import_DBN_input_data(os.path.join(self.input_folder, component, "dr_OUT.mat"))
 
         zone_model = DynamicBayesianNetwork(*zone_inputs)
 
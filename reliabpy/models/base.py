@@ -1,6 +1,10 @@
-from copy import deepcopy as dcopy
 from tabulate import tabulate
+from copy import copy, deepcopy as dcopy
 from reliabpy.commons.post_processing import OneEpisode
+from reliabpy.models.inference import BatchedDynamicBayesianNetwork
+from reliabpy.models.history import History, N_PHASES, PHASES
+from reliabpy.models.cost import EventLog
+from reliabpy.models.system_effects import comp_k_out_of_n_batch
 
 import numpy as np
 
@@ -20,27 +24,56 @@ class ComponentLevel:
         dynamic Bayesian network)
     inspection : initilizated inspection model class
         Initialized inspection model (e.g.: probability of detection)
+    state : SystemState, optional
+        system state where the current results are written
+    index : int, optional
+        index of the component in <state>
     """
-    def __init__(self, id, inference_model, inspection):
+    def __init__(self, id, inference_model, inspection, state=None, index=None):
         self.id = id
         self.inference_model = inference_model
         self.inspection = inspection
-        self.t, self.pf, self.action, self.output = list(), list(), list(), list()
+        self.state, self.index = state, index
+
+    @property
+    def history(self):
+        # results are kept once, by the inference model
+        return self.inference_model.results
+
+    @property
+    def t(self):
+        return self.history.get_year()
+
+    @property
+    def phase(self):
+        return self.history.get_phase()
+
+    @property
+    def pf(self):
+        return self.history.get_pf()
+
+    @property
+    def action(self):
+        return self.history.get_action()
+
+    @property
+    def output(self):
+        return self.history.get_output()
+
+    @property
+    def last_results(self):
+        model = self.inference_model
+        return {"t" : model.t, "phase" : model.phase, "pf" : model.pf, "action" : model.action, "output" : model.output}
 
     def store(self):
         """
         Store (component level)
         =======================
         
-        Store the time, probabiility of failure, observation results, and action for current timestep.
+        Current time, probabiility of failure, observation results, and 
+        action. They are written in place in the system state (the history 
+        is stored by the inference model at every phase).
 
-        Parameters:
-        -----------
-        action : Any
-            Information about action on the component observation.
-        output : Any
-            Information about the component observation.
-        
         Returns:
         --------
         t : int
@@ -53,21 +86,12 @@ class ComponentLevel:
             Curretn action (for timestep t).
 
         """
-        t      = self.inference_model.t
-        pf     = self.inference_model.pf
-        action = self.inference_model.action
-        output = self.inference_model.output
-        
-        self.last_results =  {"t" : t, "pf" : pf, "action" : action, "output" : output}
-
-        self.t.append(t) 
-        self.pf.append(pf) 
-        self.action.append(action) 
-        self.output.append(output) 
-
-        return t, pf, output, action
+        model = self.inference_model
+        if self.state is not None:
+            self.state.write(self.index, model.pf, model.action, model.output)
+        return model.t, model.pf, model.output, model.action
     
-    def predict(self, store=True):
+    def predict(self, store=True, steps=1):
         """
         Predict
         =======
@@ -79,11 +103,14 @@ class ComponentLevel:
         -----------
         store : Boolean
             store and returns the values of current state.
+        steps : int
+            number of time steps predicted at once (results of every step 
+            are stored).
         """
-        self.inference_model.predict() 
-        if store: self.store()
+        self.inference_model.predict(steps) 
+        if store: return self.store()
 
-    def update(self, store=True):
+    def update(self, store=True, detection_draw=None):
         """
         Update
         =======
@@ -94,9 +121,11 @@ class ComponentLevel:
         -----------
         store : Boolean
             store and returns the values of current state.
+        detection_draw : float, optional
+            uniform draw in [0, 1) deciding the observation outcome.
         """
-        self.inference_model.update(self.inspection) 
-        if store: self.store()
+        self.inference_model.update(self.inspection, detection_draw=detection_draw) 
+        if store: return self.store()
 
     def perform_action(self, store=True):
         """
@@ -111,7 +140,7 @@ class ComponentLevel:
             store and returns the values of current state.
         """
         self.inference_model.perform_action() 
-        if store: self.store()
+        if store: return self.store()
 
     def get_results(self, dtype="dict", to_print=False):
         """
@@ -120,10 +149,8 @@ class ComponentLevel:
 
         Get the results for the components lifetime.
         """
-        if to_print:
-            self.t = np.array(self.t, dtype=int)
         if dtype == "dict":
-            results = {"time" : self.t, "pf" : self.pf, "action" : self.action, "output" : self.output}
+            results = {"time" : self.t, "phase" : self.phase, "pf" : self.pf, "action" : self.action, "output" : self.output}
         return results
 
     def __str__(self):
@@ -131,7 +158,33 @@ class ComponentLevel:
         table = tabulate(self.get_results(to_print=True), headers="keys", tablefmt="pretty")
         return title + table
 
-class SystemLevel:
+class _DecisionTimes:
+    # decision times of the policy rules of a system (SystemLevel) or farm 
+    # (FarmLevel) at its time <t>, until its <lifetime>
+    def _steps_to_next_decision(self):
+        # policies without <next_decision> may act at any timestep
+        if self.policy_rules is None:
+            return self.lifetime - self.t
+        if not hasattr(self.policy_rules, 'next_decision'):
+            return 1
+        return max(1, min(self.policy_rules.next_decision(self.t), self.lifetime) - self.t)
+
+    def _due_batch(self, batch_size):
+        # rows deciding at t (all of them, unless the policy rules give 
+        # their own decision times), and all of them at the end
+        if self.t == self.lifetime or not hasattr(self.policy_rules, 'due_batch'):
+            return np.ones(batch_size, dtype=bool)
+        return self.policy_rules.due_batch(self.t)
+
+    @staticmethod
+    def _seeds(seed, batch_size):
+        # seed of every episode: <seed + e>, or given one by one
+        seeds = seed + np.arange(batch_size) if np.ndim(seed) == 0 else np.asarray(seed)
+        if len(seeds) != batch_size:
+            raise ValueError(f"{len(seeds)} seeds given for {batch_size} episodes")
+        return seeds
+
+class SystemLevel(_DecisionTimes):
     """
     System Level
     ============
@@ -164,24 +217,49 @@ class SystemLevel:
     
     def _reset(self):
         # set all value as initial
-        self.step_results = {}
         self.components_list = []
         self.t = 0
-        for component in self.components_reliability_models_list:
+        self.state = SystemState(len(self.components_reliability_models_list))
+        for i, component in enumerate(self.components_reliability_models_list):
             _temp_Component = ComponentLevel(
                 component, 
-                dcopy(self.components_reliability_models_list[component]['inference']),
-                self.components_reliability_models_list[component]['inspection']
+                self.components_reliability_models_list[component]['inference'].spawn(),
+                self.components_reliability_models_list[component]['inspection'],
+                self.state, i
             )
             _temp_Component.store()
 
             self.components_list.append(_temp_Component)
-            self.step_results[_temp_Component.id] = _temp_Component.last_results
         
         self.system_pf = None
+        self.detection_draws = None
+        self.cost_accumulator = None
+        self.event_log = None
 
         self._system_reliability()
     
+    def forward_without_decisions(self, steps):
+        """
+        Forward without decisions
+        =========================
+
+        Advance several timesteps for the system with prediction only (no 
+        inspection nor action), jumping ahead with the cached transition 
+        matrix powers. Results of every timestep are still stored.
+
+        Parameters:
+        -----------
+        steps : int
+            number of timesteps
+        """
+        for component in self.components_list:
+            component.predict(steps=steps)
+
+        steps_pf = np.array([component.inference_model.steps_pf for component in self.components_list])
+        steps_system_pf = self.system_dependancies.compute_system_pf(steps_pf.T)
+        for step in range(steps):
+            self.t += 1
+            self._append_system_pf(steps_system_pf[step])
     
     def forward_one_timestep(self):
         """
@@ -196,7 +274,6 @@ class SystemLevel:
         # prediction
         for component in self.components_list:
             component.predict()
-            self.step_results = self.get_step_results()
         self._system_reliability()
         
         if self.policy_rules is not None:
@@ -204,27 +281,48 @@ class SystemLevel:
             self.to_inspect = self.policy_rules.to_observe()
             if len(self.to_inspect) is not 0:
                 for i in self.to_inspect:
-                    self.components_list[i].update()
-                    self.step_results = self.get_step_results()
-                self._system_reliability()
+                    if self.detection_draws is None:
+                        self.components_list[i].update()
+                    else:
+                        self.components_list[i].update(detection_draw=self.detection_draws[self.t, i])
+                if self.cost_accumulator is not None:
+                    self.cost_accumulator.inspections(self.t, self._mask(self.to_inspect))
+                self._system_reliability(phase=PHASES['PoD'])
 
             # action
             self.to_repair = self.policy_rules.to_repair()
             if len(self.to_repair) is not 0:
                 for i in self.to_repair:
                     self.components_list[i].perform_action()
-                    self.step_results = self.get_step_results()
-                self._system_reliability()
-
-    def _system_reliability(self):
-        step_results = list(self.step_results.values())
-        pf_list = [x['pf'] for x in step_results]
-        t__pf = (self.t, self.system_dependancies.compute_system_pf(pf_list))
+                if self.cost_accumulator is not None:
+                    self.cost_accumulator.repairs(self.t, self._mask(self.to_repair))
+                self._system_reliability(phase=PHASES['PR'])
+
+    def _mask(self, ids):
+        mask = np.zeros(len(self.components_list), dtype=bool)
+        mask[ids] = True
+        return mask
+
+    def _system_reliability(self, pf_list=None, phase=0):
+        if pf_list is None:
+            pf_list = self.state.pf
+        self._append_system_pf(self.system_dependancies.compute_system_pf(pf_list), phase)
+
+    def _append_system_pf(self, pf, phase=0):
+        # (year, phase, pf), the phase as in history.PHASES
+        if self.cost_accumulator is not None:
+            self.cost_accumulator.system_pf(self.t, pf)
+            return
+        t__pf = (self.t, phase, pf)
         if self.system_pf is not None:
             self.system_pf.append(t__pf)
         else:
             self.system_pf = [t__pf]
          
+    @property
+    def step_results(self):
+        return self.get_step_results()
+
     def get_step_results(self, variable_name=False, dtype='dict'):
         """
         Get step results
@@ -279,23 +377,248 @@ class SystemLevel:
             system[component.id] = temp
         return system, self.system_pf
         
-    def run(self, lifetime):
+    def run(self, lifetime, batch_size=None, seed=None, cost_only=False):
         """
         Run model
         =========
 
         Run model for a given lifetime.
 
+        With <batch_size>, a batch of episodes is simulated at once with a 
+        batched dynamic Bayesian network and <cost_breakdown> becomes a list 
+        with one dictionary per episode, and <expected_cost_breakdown> their 
+        mean (see InspectionMaintenance.compute_cost_batch). Episode e of a batch seeded with 
+        <seed> gives the same results as one episode run with <seed + e>.
+
+        With <cost_only>, the costs are accumulated phase by phase (see 
+        CostAccumulator) and no trajectory is stored: neither the system pf 
+        nor the component histories (e.g.: for policy optimization). The 
+        cost breakdown is the same.
+
+        Batched and cost-only runs also keep the events of the episodes in 
+        <event_log>, to price them again with other cost parameters (see 
+        EventLog).
+
         Parameters:
         -----------
         lifetime : int
             Simulation horizon of the structural system.
+        batch_size : int, optional
+            Number of episodes simulated at once.
+        seed : int or array, optional
+            Seed of the observation outcomes (with <batch_size>, an array 
+            gives the seed of every episode).
+        cost_only : bool
+            Only compute the cost breakdown.
         """
         self.lifetime = lifetime
-        for timestep in range(lifetime):
-            self.forward_one_timestep()
-        self.cost_model.compute_cost_breakdown(self)
-    
+        if batch_size is not None:
+            self._run_batch(lifetime, batch_size, seed, cost_only)
+            return
+        if seed is not None:
+            self.detection_draws = self._detection_draws(lifetime, seed)
+        # results are not stored in cost only mode, for this run only
+        store_results = [component.inference_model.store_results for component in self.components_list]
+        if cost_only:
+            self.cost_accumulator = self.cost_model.accumulator(lifetime, log=True)
+            for t, _, pf in self.system_pf:
+                self.cost_accumulator.system_pf(t, pf)
+            self.system_pf = None
+            for component in self.components_list:
+                component.inference_model.store_results = False
+        else:
+            for component in self.components_list:
+                component.history.reserve(lifetime*N_PHASES + 1)
+        try:
+            while self.t < lifetime:
+                steps = self._steps_to_next_decision()
+                if steps > 1:
+                    self.forward_without_decisions(steps - 1)
+                self.forward_one_timestep()
+            if cost_only:
+                self.yearly_costs_breakdown, self.cost_breakdown = self.cost_accumulator.breakdown()
+                self.event_log = self.cost_accumulator.event_log()
+        finally:
+            for component, store in zip(self.components_list, store_results):
+                component.inference_model.store_results = store
+            self.cost_accumulator = None
+        if not cost_only:
+            self.cost_model.compute_cost_breakdown(self)
+
+    def snapshot(self):
+        """
+        Snapshot
+        ========
+
+        Capture the mutable state of the system: time, component beliefs 
+        (by reference, see DynamicBayesianNetwork.get_state), current system 
+        state, history cursors, system pf, accumulated costs and random 
+        state. The components and the models are not copied.
+
+        Returns:
+        --------
+        snapshot : SystemSnapshot
+            state to restore (any number of times)
+        """
+        return SystemSnapshot(self)
+
+    def restore(self, snapshot, rng=True):
+        """
+        Restore
+        =======
+
+        Back to a snapshot of this system: results stored after the snapshot 
+        are dropped.
+
+        Parameters:
+        -----------
+        snapshot : SystemSnapshot
+            snapshot of the system
+        rng : bool
+            restore the random state (set False to draw new observation 
+            outcomes, e.g. for a new episode)
+        """
+        snapshot.restore(self, rng)
+
+    def fork(self):
+        """
+        Fork
+        ====
+
+        Independent copy of the running system (e.g.: to compare decisions 
+        by lookahead), sharing the models, the immutable beliefs and the 
+        detection draws.
+
+        Returns:
+        --------
+        system : SystemLevel
+            copy of the system, with its own components and policy rules
+        """
+        system = self.__class__.__new__(self.__class__)
+        system.__dict__.update(self.__dict__)
+        system.state = dcopy(self.state)
+        system.components_list = [
+            ComponentLevel(component.id, component.inference_model.spawn(), component.inspection, system.state, i)
+            for i, component in enumerate(self.components_list)]
+        system.system_pf = None if self.system_pf is None else list(self.system_pf)
+        system.cost_accumulator = None if self.cost_accumulator is None else self.cost_accumulator.copy()
+        if self.policy_rules is not None:
+            system.policy_rules = copy(self.policy_rules)
+            system.policy_rules.import_model(system)
+        return system
+
+    def _detection_draws(self, lifetime, seed):
+        return np.random.default_rng(seed).random((lifetime + 1, len(self.components_reliability_models_list)))
+
+    def _run_batch(self, lifetime, batch_size, seed=None, cost_only=False):
+        mounted = self.components_reliability_models_list
+        batch = BatchedDynamicBayesianNetwork(
+            [mounted[component]['inference'] for component in mounted],
+            [mounted[component]['inspection'] for component in mounted],
+            batch_size)
+
+        if seed is None:
+            detection_draws = np.random.random((batch_size, lifetime + 1, batch.n_components))
+        else:
+            detection_draws = np.stack([self._detection_draws(lifetime, x) for x in self._seeds(seed, batch_size)])
+
+        if cost_only:
+            costs = self.cost_model.accumulator(lifetime, batch_size, log=True)
+        else:
+            inspected = np.zeros((lifetime + 1, batch_size, batch.n_components), dtype=bool)
+            observed, repaired = np.zeros_like(inspected), np.zeros_like(inspected)
+            system_pf = [list() for _ in range(batch_size)]
+            # predicted and end of year system pf, for the cost engine
+            pf_year, pf_end = np.zeros((batch_size, lifetime + 1)), np.zeros((batch_size, lifetime + 1))
+
+        def system_reliability(pf, episodes=None, phase=0):
+            episodes = np.arange(batch_size) if episodes is None else np.nonzero(episodes)[0]
+            pf_sys = self.system_dependancies.compute_system_pf(pf.numpy()[episodes])
+            if cost_only:
+                costs.system_pf(self.t, pf_sys, episodes)
+            else:
+                pf_end[episodes, self.t] = pf_sys
+                for e, x in zip(episodes, pf_sys):
+                    system_pf[e].append((self.t, phase, x))
+
+        self.t = 0
+        system_reliability(batch.pf)
+        if not cost_only:
+            pf_year[:, 0] = pf_end[:, 0]
+        # year of the belief of each episode: episodes that do not decide 
+        # (see _due_batch) are predicted later, with a longer jump
+        episode_t = np.zeros(batch_size, dtype=int)
+        while self.t < lifetime:
+            self.t += self._steps_to_next_decision()
+            due = self._due_batch(batch_size)
+            # prediction
+            for steps in np.unique(self.t - episode_t[due]):
+                episodes = np.nonzero(due & (self.t - episode_t == steps))[0]
+                episodes = None if len(episodes) == batch_size else episodes
+                batch.predict(steps, episodes)
+                episodes = np.arange(batch_size) if episodes is None else episodes
+                steps_system_pf = self.system_dependancies.compute_system_pf(batch.steps_pf.numpy().transpose(0, 2, 1))
+                for step in range(steps):
+                    t = self.t - steps + step + 1
+                    if cost_only:
+                        costs.system_pf(t, steps_system_pf[:, step], None if len(episodes) == batch_size else episodes)
+                        continue
+                    pf_year[episodes, t] = pf_end[episodes, t] = steps_system_pf[:, step]
+                    for e, x in zip(episodes, steps_system_pf[:, step]):
+                        system_pf[e].append((t, 0, x))
+            episode_t[due] = self.t
+
+            if self.policy_rules is not None:
+                # update
+                detected = np.zeros((batch_size, batch.n_components), dtype=bool)
+                to_inspect = self.policy_rules.to_observe_batch(batch.pf.numpy())
+                if to_inspect.any():
+                    detected = batch.update(to_inspect, detection_draws[:, self.t])
+                    if cost_only:
+                        costs.inspections(self.t, to_inspect)
+                    else:
+                        inspected[self.t], observed[self.t] = to_inspect, detected
+                    system_reliability(batch.pf, to_inspect.any(axis=1), PHASES['PoD'])
+
+                # action
+                to_repair = self.policy_rules.to_repair_batch(detected)
+                if to_repair.any():
+                    batch.perform_action(to_repair)
+                    if cost_only:
+                        costs.repairs(self.t, to_repair)
+                    else:
+                        repaired[self.t] = to_repair
+                    system_reliability(batch.pf, to_repair.any(axis=1), PHASES['PR'])
+
+        if cost_only:
+            self.batch_results = None
+            self.yearly_costs_breakdown, self.cost_breakdown = costs.breakdown()
+            self.expected_cost_breakdown = {key: np.mean([x[key] for x in self.cost_breakdown]) for key in self.cost_breakdown[0]}
+            self.event_log = costs.event_log()
+            return
+
+        self.batch_results = list()
+        for e in range(batch_size):
+            components_list = list()
+            for i, component in enumerate(mounted):
+                t_insp, t_repair = np.nonzero(inspected[:, e, i])[0], np.nonzero(repaired[:, e, i])[0]
+                components_list.append(_ComponentRecord(
+                    component, 
+                    np.concatenate([t_insp, t_repair]),
+                    ['PoD']*len(t_insp) + ['PR']*len(t_repair),
+                    ['D' if x else None for x in observed[t_insp, e, i]] + ['s0']*len(t_repair)))
+            self.batch_results.append(_EpisodeRecord(components_list, system_pf[e]))
+
+        yearly, total, self.expected_cost_breakdown = self.cost_model.compute_cost_batch(
+            pf_year, inspected.transpose(1, 0, 2), repaired.transpose(1, 0, 2), pf_end)
+        delta_pf = np.zeros_like(pf_year)
+        delta_pf[:, 1:] = pf_year[:, 1:] - pf_end[:, :-1]
+        self.event_log = EventLog(inspected.transpose(1, 0, 2), repaired.transpose(1, 0, 2), delta_pf)
+        for e, episode in enumerate(self.batch_results):
+            episode.yearly_costs_breakdown = {key: value if key == 't' else value[e] for key, value in yearly.items()}
+            episode.cost_breakdown = {key: value[e] for key, value in total.items()}
+        self.cost_breakdown = [episode.cost_breakdown for episode in self.batch_results]
+
     def post_process(self, savefolder, plot=True, excel=True, interactive_plot=True):
         """
         Post-proccess
@@ -319,5 +642,222 @@ class SystemLevel:
             post.to_excel()
         if interactive_plot:
             post.plot_interactive()
-        
 
+
+class FarmLevel(_DecisionTimes):
+    """
+    Farm Level
+    ==========
+
+    Class for reliability computation of a farm of identical structural 
+    systems (e.g.: wind turbines), for one or a batch of episodes.
+
+    The components of all turbines are stacked in one batched dynamic 
+    Bayesian network, so every phase is a single tensor operation over 
+    (episodes x turbines*components), whatever the size of the farm. The 
+    policy rules are applied to every turbine (one row per turbine), the 
+    turbine probabilities of failure come from the turbine system 
+    dependancies, and the farm fails when less than <turbine_k> turbines 
+    work.
+
+    Costs (see CostAccumulator) are charged per component for inspections 
+    and repairs, once per campaign year for the whole farm, and the risk of 
+    failure is the cost of failure times the increment of the expected 
+    number of failed turbines.
+
+    Policy rules with their own decision times per row (e.g.: 
+    HeuristicRulesGrid, with <n_samples> episodes times <n_turbines> rows 
+    per policy) only predict the episodes when they decide.
+
+    Parameters:
+    -----------
+    turbine : SystemLevel
+        system model of one turbine (components, inspections and system 
+        dependancies)
+    n_turbines : int
+        number of turbines
+    turbine_k : int
+        number of turbines necessary to make the farm work
+    policy_rules : policy rules initilizated class
+        Policy rules class, applied to every turbine
+    cost_model : cost model initilized class
+        Cost model class
+    """
+    def __init__(self, turbine, n_turbines, turbine_k, policy_rules, cost_model=None):
+        self.turbine = turbine
+        self.n_turbines, self.turbine_k = n_turbines, turbine_k
+        self.system_dependancies = turbine.system_dependancies
+        self.cost_model = cost_model
+        self.policy_rules = policy_rules
+        self.policy_rules.import_model(self)
+
+        mounted = turbine.components_reliability_models_list
+        self.models = [mounted[component]['inference'] for component in mounted]
+        self.inspections = [mounted[component]['inspection'] for component in mounted]
+        self.n_components = len(self.models)
+        self.t = 0
+
+    def run(self, lifetime, batch_size=None, seed=None):
+        """
+        Run model
+        =========
+
+        Run model for a given lifetime. Results of every episode:
+        - cost_breakdown : farm costs (C_C, C_I, C_R, R_F, C_T)
+        - turbine_pf : (lifetime+1 x turbines) turbine pf, end of every year
+        - farm_pf : (lifetime+1) farm pf, end of every year
+        With <batch_size>, they are stacked with a first dimension of 
+        episodes (list of dictionaries for the costs).
+
+        Parameters:
+        -----------
+        lifetime : int
+            Simulation horizon of the farm.
+        batch_size : int, optional
+            Number of episodes simulated at once.
+        seed : int or array, optional
+            Seed of the observation outcomes (episode e uses <seed + e>, or 
+            the seed of every episode with an array).
+        """
+        self.lifetime = lifetime
+        n_episodes = 1 if batch_size is None else batch_size
+        shape = (n_episodes, self.n_turbines, self.n_components)
+        n_total = self.n_turbines*self.n_components
+        self.batch = batch = BatchedDynamicBayesianNetwork(
+            self.models*self.n_turbines, self.inspections*self.n_turbines, n_episodes)
+
+        if seed is None:
+            detection_draws = np.random.random((n_episodes, lifetime + 1, n_total))
+        else:
+            detection_draws = np.stack([np.random.default_rng(x).random((lifetime + 1, n_total)) 
+                                        for x in self._seeds(seed, n_episodes)])
+
+        costs = self.cost_model.accumulator(lifetime, n_episodes)
+        self.turbine_pf = np.zeros((n_episodes, lifetime + 1, self.n_turbines))
+        self.farm_pf = np.zeros((n_episodes, lifetime + 1))
+
+        def turbines_reliability(pf, episodes=None):
+            episodes = np.arange(n_episodes) if episodes is None else np.nonzero(episodes)[0]
+            turbine_pf = self.system_dependancies.compute_system_pf(pf.reshape(shape)[episodes])
+            costs.system_pf(self.t, turbine_pf.sum(axis=1), episodes)
+            self.turbine_pf[episodes, self.t] = turbine_pf
+
+        self.t = 0
+        turbines_reliability(batch.pf.numpy())
+        # year of the belief of each episode (see SystemLevel._run_batch)
+        episode_t = np.zeros(n_episodes, dtype=int)
+        while self.t < lifetime:
+            self.t += self._steps_to_next_decision()
+            due = self._due_batch(n_episodes*self.n_turbines).reshape(n_episodes, self.n_turbines).any(axis=1)
+            # prediction
+            for steps in np.unique(self.t - episode_t[due]):
+                episodes = np.nonzero(due & (self.t - episode_t == steps))[0]
+                episodes = None if len(episodes) == n_episodes else episodes
+                batch.predict(steps, episodes)
+                episodes = np.arange(n_episodes) if episodes is None else episodes
+                steps_pf = batch.steps_pf.numpy().reshape(len(episodes), *shape[1:], steps)
+                steps_turbine_pf = self.system_dependancies.compute_system_pf(steps_pf.transpose(0, 3, 1, 2))
+                for step in range(steps):
+                    t = self.t - steps + step + 1
+                    costs.system_pf(t, steps_turbine_pf[:, step].sum(axis=1), None if len(episodes) == n_episodes else episodes)
+                    self.turbine_pf[episodes, t] = steps_turbine_pf[:, step]
+            episode_t[due] = self.t
+
+            if self.policy_rules is not None:
+                # update
+                detected = np.zeros((n_episodes, n_total), dtype=bool)
+                to_inspect = self.policy_rules.to_observe_batch(batch.pf.numpy().reshape(-1, self.n_components))
+                to_inspect = to_inspect.reshape(n_episodes, n_total)
+                if to_inspect.any():
+                    detected = batch.update(to_inspect, detection_draws[:, self.t])
+                    costs.inspections(self.t, to_inspect)
+                    turbines_reliability(batch.pf.numpy(), to_inspect.any(axis=1))
+
+                # action
+                to_repair = self.policy_rules.to_repair_batch(detected.reshape(-1, self.n_components))
+                to_repair = to_repair.reshape(n_episodes, n_total)
+                if to_repair.any():
+                    batch.perform_action(to_repair)
+                    costs.repairs(self.t, to_repair)
+                    turbines_reliability(batch.pf.numpy(), to_repair.any(axis=1))
+
+        self.farm_pf = comp_k_out_of_n_batch(self.turbine_pf.reshape(-1, self.n_turbines), self.turbine_k)
+        self.farm_pf = self.farm_pf.reshape(n_episodes, lifetime + 1)
+        self.yearly_costs_breakdown, self.cost_breakdown = costs.breakdown()
+        if batch_size is None:
+            self.turbine_pf, self.farm_pf = self.turbine_pf[0], self.farm_pf[0]
+            self.yearly_costs_breakdown, self.cost_breakdown = self.yearly_costs_breakdown[0], self.cost_breakdown[0]
+
+class SystemSnapshot:
+    """
+    System Snapshot
+    ===============
+
+    Mutable state of a SystemLevel (see SystemLevel.snapshot).
+
+    Parameters:
+    -----------
+    system : SystemLevel
+        system model
+    """
+    def __init__(self, system):
+        self.t = system.t
+        self.lifetime = getattr(system, 'lifetime', None)
+        self.components = [component.inference_model.get_state() for component in system.components_list]
+        self.cursors = [len(component.history) for component in system.components_list]
+        self.state = (system.state.pf.copy(), system.state.action.copy(), system.state.output.copy())
+        self.system_pf = None if system.system_pf is None else list(system.system_pf)
+        self.detection_draws = system.detection_draws
+        self.cost_accumulator = None if system.cost_accumulator is None else system.cost_accumulator.copy()
+        self.random_state = np.random.get_state() if system.detection_draws is None else None
+
+    def restore(self, system, rng=True):
+        system.t, system.lifetime = self.t, self.lifetime
+        for component, state, cursor in zip(system.components_list, self.components, self.cursors):
+            component.inference_model.set_state(state)
+            component.history.size = cursor
+        system.state.pf[:], system.state.action[:], system.state.output[:] = self.state
+        system.system_pf = None if self.system_pf is None else list(self.system_pf)
+        system.detection_draws = self.detection_draws
+        system.cost_accumulator = None if self.cost_accumulator is None else self.cost_accumulator.copy()
+        if rng and self.random_state is not None:
+            np.random.set_state(self.random_state)
+
+class SystemState:
+    """
+    System State
+    ============
+
+    Current probability of failure, action and output of every component, 
+    in contiguous arrays written in place by the components (see 
+    ComponentLevel.store), and read without copy by the policies and the 
+    system reliability.
+
+    Parameters:
+    -----------
+    n_components : int
+        number of components
+    """
+    def __init__(self, n_components):
+        self.pf = np.zeros(n_components)
+        self.action = np.zeros(n_components, dtype=np.int8)
+        self.output = np.zeros(n_components, dtype=np.int8)
+
+    def write(self, i, pf, action, output):
+        self.pf[i] = pf
+        self.action[i] = History._encode(History.actions, action)
+        self.output[i] = History._encode(History.outputs, output)
+
+    def detected(self):
+        return self.output == History.outputs.index('D')
+
+class _ComponentRecord:
+    # events of one component in one episode of a batched run
+    def __init__(self, id, t, action, output):
+        self.id, self.t, self.action, self.output = id, t, action, output
+
+class _EpisodeRecord:
+    # one episode of a batched run, as read by the cost model
+    def __init__(self, components_list, system_pf):
+        self.components_list = components_list
+        self.system_pf = system_pf
@@ -45,38 +45,420 @@ class InspectionMaintenance:
         - yearly_costs_breakdown
         - cost_breakdown
         """
-        system_insp, system_repair = dict(), dict()
-        t, pf = np.vstack(system_model.system_pf).T
-        unique_mask = np.diff(t) == 1
-        delta_pf = np.diff(pf)[unique_mask]
-        abs_t = np.unique(t).astype(int) # t[1:][unique_mask]
+        t, phase, pf = np.array(system_model.system_pf, dtype=float).T
+        t, phase = t.astype(int), phase.astype(int)
+        abs_t = np.arange(t[-1] + 1)
+        discount = self.discount(t[-1])
 
         C_C, C_I, C_R, R_F = np.zeros_like(abs_t, dtype=float), np.zeros_like(abs_t, dtype=float), np.zeros_like(abs_t, dtype=float), np.zeros_like(abs_t, dtype=float)
+        campaign = np.zeros_like(abs_t, dtype=bool)
         for component in system_model.components_list:
-            action, output = np.array(component.action), np.array(component.output)
-            y_t = (1 - self.r)**(np.array(component.t))
+            action = np.array(component.action)
             if any(action):
                 comp_t = np.array(component.t, dtype=int)
                 t_insp = comp_t[action == 'PoD']
                 t_repair = comp_t[action == 'PR']
 
-                C_I[t_insp] += self.c_i*(1 - self.r)**t_insp
-                C_R[t_repair] += self.c_r*(1 - self.r)**t_repair
+                C_I[t_insp] += self.c_i*discount[t_insp]
+                C_R[t_repair] += self.c_r*discount[t_repair]
+                campaign[t_insp] = True
 
-                system_insp[component.id]= t_insp
-                system_repair[component.id] = t_repair
-            
-            else:
-                system_insp[component.id]= list()
-                system_repair[component.id] = list()
+        C_C[campaign] += self.c_c*discount[campaign]
 
-        
-        t_temp = np.unique(np.concatenate(list(system_insp.values()))).astype(int)
-        C_C[t_temp] += self.c_c*(1 - self.r)**(t_temp)
-        
-        R_F[abs_t[1:]] = self.c_f*delta_pf*(1 - self.r)**abs_t[1:]
+        # risk of failure: increment of pf from the end of the previous year 
+        # to the prediction of the year
+        predicted = np.nonzero(phase == 0)[0][1:]
+        R_F[t[predicted]] = self.c_f*(pf[predicted] - pf[predicted - 1])*discount[t[predicted]]
 
         C_T = C_C + C_I + C_R + R_F
         
         system_model.yearly_costs_breakdown =  {'t' : abs_t, 'C_C' : C_C, 'C_I' : C_I, 'C_R' : C_R, 'R_F' : R_F, 'C_T': C_T}
-        system_model.cost_breakdown = {'C_C' : C_C.sum(), 'C_I' : C_I.sum(), 'C_R' : C_R.sum(), 'R_F' : R_F.sum(), 'C_T': C_T.sum()}
\ No newline at end of file
+        system_model.cost_breakdown = {'C_C' : C_C.sum(), 'C_I' : C_I.sum(), 'C_R' : C_R.sum(), 'R_F' : R_F.sum(), 'C_T': C_T.sum()}
+
+    def compute_cost_batch(self, pf, inspected, repaired, pf_end=None):
+        """
+        Compute cost batch
+        ==================
+
+        Lifetime costs of many episodes at once, from stacked (episodes x 
+        years) arrays, with the same terms as compute_cost_breakdown.
+
+        Parameters:
+        -----------
+        pf : array
+            (episodes x years) system pf predicted at the start of each 
+            year (phase 0)
+        inspected : array
+            (episodes x years) number of inspected components, or 
+            (episodes x years x components) inspected components
+        repaired : array
+            (episodes x years) number of repaired components, or 
+            (episodes x years x components) repaired components
+        pf_end : array, optional
+            (episodes x years) system pf at the end of each year, after 
+            inspections and repairs (<pf> if None)
+
+        Returns:
+        --------
+        yearly_costs_breakdown : dict
+            (episodes x years) yearly costs (t, C_C, C_I, C_R, R_F, C_T)
+        cost_breakdown : dict
+            (episodes) lifetime costs (C_C, C_I, C_R, R_F, C_T)
+        expected_cost_breakdown : dict
+            expected lifetime costs (C_C, C_I, C_R, R_F, C_T)
+        """
+        pf = np.asarray(pf, dtype=float)
+        pf_end = pf if pf_end is None else np.asarray(pf_end, dtype=float)
+        discount = self.discount(pf.shape[1] - 1)
+        n_inspected, n_repaired = _count(inspected), _count(repaired)
+
+        years = np.arange(len(discount))
+        C_C = _repeated(self.c_c*discount, 1)[(n_inspected > 0).astype(int), years]
+        C_I = _repeated(self.c_i*discount, n_inspected.max(initial=0))[n_inspected, years]
+        C_R = _repeated(self.c_r*discount, n_repaired.max(initial=0))[n_repaired, years]
+        R_F = np.zeros_like(pf)
+        R_F[:, 1:] = self.c_f*(pf[:, 1:] - pf_end[:, :-1])*discount[1:]
+
+        yearly, total = _breakdown(C_C, C_I, C_R, R_F)
+        expected = {key: value.mean() for key, value in total.items()}
+        return yearly, total, expected
+
+    def discount(self, lifetime):
+        """
+        Discount
+        ========
+
+        Discount factors (1 - r)**t of the years 0 to <lifetime>, computed 
+        once per lifetime and discount rate.
+
+        Parameters:
+        -----------
+        lifetime : int
+            simulation horizon
+        """
+        if not hasattr(self, '_discount'):
+            self._discount = dict()
+        key = (lifetime, self.r)
+        if key not in self._discount:
+            self._discount[key] = (1 - self.r)**np.arange(lifetime + 1)
+        return self._discount[key]
+
+    def accumulator(self, lifetime, batch_size=None, log=False):
+        """
+        Accumulator
+        ===========
+
+        Cost accumulator of a simulation without stored trajectory (see 
+        CostAccumulator).
+
+        Parameters:
+        -----------
+        lifetime : int
+            simulation horizon
+        batch_size : int, optional
+            number of episodes simulated at once
+        log : bool
+            also record the events of the episodes (see EventLog)
+        """
+        return CostAccumulator(self, lifetime, batch_size, log)
+
+class CostAccumulator:
+    """
+    Cost Accumulator
+    ================
+
+    Discounted costs accumulated online, phase by phase, for one episode or 
+    a batch of episodes. The yearly costs are added up as in 
+    InspectionMaintenance.compute_cost_breakdown (same terms in the same 
+    order), so the breakdown is identical, without storing the system pf 
+    nor the component histories.
+
+    Parameters:
+    -----------
+    cost_model : InspectionMaintenance
+        cost model
+    lifetime : int
+        simulation horizon
+    batch_size : int, optional
+        number of episodes simulated at once (one episode, without batch 
+        dimension, if None)
+    log : bool
+        also record the events of the episodes (see event_log)
+    """
+    def __init__(self, cost_model, lifetime, batch_size=None, log=False):
+        self.cost_model = cost_model
+        self.batch_size = batch_size
+        shape = (1 if batch_size is None else batch_size, lifetime + 1)
+        self.C_C, self.C_I, self.C_R, self.R_F = np.zeros(shape), np.zeros(shape), np.zeros(shape), np.zeros(shape)
+        # year of the last pf of each episode (none yet)
+        self.t, self.pf = np.full(shape[0], -2), np.zeros(shape[0])
+        self.discount = cost_model.discount(lifetime)
+        self.log = log
+        self.delta_pf = np.zeros(shape) if log else None
+        self.inspected, self.repaired = None, None
+
+    def system_pf(self, t, pf, episodes=None):
+        """
+        System P_f
+        ==========
+
+        New system probability of failure. The risk of failure of year t is 
+        the increment of system pf from the end of the previous year.
+
+        Parameters:
+        -----------
+        t : int
+            year
+        pf : float or array
+            system probability of failure (of the episodes)
+        episodes : array, optional
+            indices of the episodes of <pf> (all by default)
+        """
+        episodes = slice(None) if episodes is None else episodes
+        # episodes starting a new year (they can be at different years)
+        new_year = self.t[episodes] == t - 1
+        if new_year.all():
+            cost = self.cost_model
+            delta_pf = pf - self.pf[episodes]
+            self.R_F[episodes, t] = cost.c_f*delta_pf*self.discount[t]
+            if self.log: self.delta_pf[episodes, t] = delta_pf
+        elif new_year.any():
+            cost = self.cost_model
+            new = np.arange(len(self.pf))[episodes][new_year]
+            delta_pf = np.broadcast_to(pf, new_year.shape)[new_year] - self.pf[new]
+            self.R_F[new, t] = cost.c_f*delta_pf*self.discount[t]
+            if self.log: self.delta_pf[new, t] = delta_pf
+        self.t[episodes] = t
+        self.pf[episodes] = pf
+
+    def inspections(self, t, inspected):
+        """
+        Inspections
+        ===========
+
+        Campaign and inspection costs of year t.
+
+        Parameters:
+        -----------
+        t : int
+            year
+        inspected : array
+            (components) or (episodes x components) inspected components
+        """
+        cost = self.cost_model
+        inspected = np.asarray(inspected).reshape(len(self.pf), -1)
+        if self.log: self.inspected = self._record(self.inspected, t, inspected)
+        n_inspected = inspected.sum(axis=1)
+        # one addition per component, as in the breakdown
+        for k in range(1, n_inspected.max() + 1):
+            self.C_I[n_inspected >= k, t] += cost.c_i*self.discount[t]
+        self.C_C[n_inspected > 0, t] += cost.c_c*self.discount[t]
+
+    def repairs(self, t, repaired):
+        """
+        Repairs
+        =======
+
+        Repair costs of year t.
+
+        Parameters:
+        -----------
+        t : int
+            year
+        repaired : array
+            (components) or (episodes x components) repaired components
+        """
+        cost = self.cost_model
+        repaired = np.asarray(repaired).reshape(len(self.pf), -1)
+        if self.log: self.repaired = self._record(self.repaired, t, repaired)
+        n_repaired = repaired.sum(axis=1)
+        for k in range(1, n_repaired.max() + 1):
+            self.C_R[n_repaired >= k, t] += cost.c_r*self.discount[t]
+
+    def breakdown(self):
+        """
+        Breakdown
+        =========
+
+        Returns:
+        --------
+        yearly_costs_breakdown : dict or list of dict
+            yearly costs (t, C_C, C_I, C_R, R_F, C_T) of each episode
+        cost_breakdown : dict or list of dict
+            lifetime costs (C_C, C_I, C_R, R_F, C_T) of each episode
+        """
+        yearly, total = _breakdown(self.C_C, self.C_I, self.C_R, self.R_F)
+        yearly = [{key: value if key == 't' else value[e] for key, value in yearly.items()} for e in range(len(self.pf))]
+        total = [{key: value[e] for key, value in total.items()} for e in range(len(self.pf))]
+        if self.batch_size is None:
+            return yearly[0], total[0]
+        return yearly, total
+
+    def copy(self):
+        """
+        Copy
+        ====
+
+        Copy of the accumulated costs, sharing the cost model and its 
+        discount factors (e.g. for SystemLevel.snapshot).
+        """
+        accumulator = CostAccumulator.__new__(CostAccumulator)
+        accumulator.__dict__.update(self.__dict__)
+        for name in ('C_C', 'C_I', 'C_R', 'R_F', 't', 'pf', 'delta_pf', 'inspected', 'repaired'):
+            value = getattr(self, name)
+            if value is not None:
+                setattr(accumulator, name, value.copy())
+        return accumulator
+
+    def _record(self, events, t, mask):
+        if events is None:
+            events = np.zeros(self.C_C.shape + mask.shape[1:], dtype=bool)
+        events[:, t] |= mask.astype(bool)
+        return events
+
+    def event_log(self):
+        """
+        Event log
+        =========
+
+        Events of the accumulated episodes (needs <log = True>).
+
+        Returns:
+        --------
+        event_log : EventLog
+            events of the episodes
+        """
+        if not self.log:
+            raise Warning("No recorded events: log is", self.log)
+        n = [x.shape[2] for x in (self.inspected, self.repaired) if x is not None]
+        empty = np.zeros(self.C_C.shape + (max(n, default=0),), dtype=bool)
+        return EventLog(empty if self.inspected is None else self.inspected, 
+                        empty if self.repaired is None else self.repaired, 
+                        self.delta_pf)
+
+class EventLog:
+    """
+    Event Log
+    =========
+
+    Events of simulated episodes, which do not depend on the cost 
+    parameters: inspections and repairs of every component, campaigns and 
+    increments of the system pf of every year. The episodes can be priced 
+    again with any cost parameters without simulating them again (see 
+    price and expected_costs).
+
+    Parameters:
+    -----------
+    inspected : array
+        (episodes x years x components) inspected components
+    repaired : array
+        (episodes x years x components) repaired components
+    delta_pf : array
+        (episodes x years) increment of the system pf of each year, from 
+        the end of the previous year to the prediction
+    """
+    def __init__(self, inspected, repaired, delta_pf):
+        self.inspected = np.asarray(inspected, dtype=bool)
+        self.repaired = np.asarray(repaired, dtype=bool)
+        self.delta_pf = np.asarray(delta_pf, dtype=float)
+
+    def __len__(self):
+        return len(self.delta_pf)
+
+    def __getitem__(self, episodes):
+        return EventLog(self.inspected[episodes], self.repaired[episodes], self.delta_pf[episodes])
+
+    @property
+    def campaign(self):
+        return self.inspected.any(axis=2)
+
+    @staticmethod
+    def concatenate(logs):
+        """
+        Concatenate
+        ===========
+
+        One event log with the episodes of several logs.
+
+        Parameters:
+        -----------
+        logs : list of EventLog
+            event logs of the same lifetime and components
+        """
+        return EventLog(np.concatenate([log.inspected for log in logs]), 
+                        np.concatenate([log.repaired for log in logs]), 
+                        np.concatenate([log.delta_pf for log in logs]))
+
+    def save(self, path):
+        np.savez_compressed(path, inspected=self.inspected, repaired=self.repaired, delta_pf=self.delta_pf)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['inspected'], data['repaired'], data['delta_pf'])
+
+    def price(self, cost_model):
+        """
+        Price
+        =====
+
+        Cost breakdown of every episode with a cost model (see 
+        InspectionMaintenance.compute_cost_batch).
+
+        Parameters:
+        -----------
+        cost_model : InspectionMaintenance
+            cost model
+        """
+        # increments as predicted pf, from a zero end of year pf
+        return cost_model.compute_cost_batch(self.delta_pf, self.inspected, self.repaired, np.zeros_like(self.delta_pf))
+
+    def expected_costs(self, c_c=5.0, c_i=1.0, c_r=10.0, c_f=10000, r=0.02):
+        """
+        Expected costs
+        ==============
+
+        Expected lifetime costs of the episodes for a grid of cost 
+        parameters, in one pass. Parameters are floats or arrays broadcast 
+        together (e.g.: one value per point of the grid).
+
+        Parameters:
+        -----------
+        c_c, c_i, c_r, c_f, r : float or array
+            cost parameters (see InspectionMaintenance)
+
+        Returns:
+        --------
+        expected_cost_breakdown : dict
+            expected lifetime costs (C_C, C_I, C_R, R_F, C_T) of every point 
+            of the grid
+        """
+        c_c, c_i, c_r, c_f, r = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (c_c, c_i, c_r, c_f, r)])
+        discount = (1 - r[..., None])**np.arange(self.delta_pf.shape[1])
+        # expected discounted number of events (campaigns, ...) of the grid
+        events = np.stack([self.campaign.mean(axis=0), self.inspected.sum(axis=2).mean(axis=0), 
+                           self.repaired.sum(axis=2).mean(axis=0), self.delta_pf.mean(axis=0)])
+        C_C, C_I, C_R, R_F = np.stack([c_c, c_i, c_r, c_f])*np.moveaxis(discount @ events.T, -1, 0)
+        return {'C_C' : C_C, 'C_I' : C_I, 'C_R' : C_R, 'R_F' : R_F, 'C_T': C_C + C_I + C_R + R_F}
+
+def _count(events):
+    # (episodes x years) number of components from counts or booleans
+    events = np.asarray(events)
+    return events.sum(axis=-1) if events.dtype == bool and events.ndim == 3 else events.astype(int)
+
+def _repeated(cost, n):
+    # (n + 1 x years) yearly cost added k = 0..n times, one addition per 
+    # component as in compute_cost_breakdown (so results are identical)
+    table = np.zeros((n + 1, len(cost)))
+    for k in range(1, n + 1):
+        table[k] = table[k - 1] + cost
+    return table
+
+def _breakdown(C_C, C_I, C_R, R_F):
+    # yearly and lifetime costs of (episodes x years) arrays (C-ordered, so 
+    # that each lifetime sum is the one of the episode alone)
+    C_C, C_I, C_R, R_F = [np.ascontiguousarray(x) for x in (C_C, C_I, C_R, R_F)]
+    C_T = C_C + C_I + C_R + R_F
+    yearly = {'t' : np.arange(C_C.shape[1]), 'C_C' : C_C, 'C_I' : C_I, 'C_R' : C_R, 'R_F' : R_F, 'C_T': C_T}
+    total = {key: value.sum(axis=1) for key, value in yearly.items() if key != 't'}
+    return yearly, total
@@ -6,6 +6,8 @@ Script organized in class with the deterioration models to be used on the
 Kalman Filters.
 """
 import numpy as np
+from scipy.stats import norm, lognorm
+from scipy.special import gamma
 from reliabpy.commons.normal_relations import logN2N
 
 class GeometricFactor:
@@ -42,6 +44,25 @@ class GeometricFactor:
         Y_g = np.random.lognormal(muYg, sigmaYg, size=n_samples)
 
         return Y_g
+
+    def distribution(mean=1.0, std=0.1):
+        '''
+        Distribution of the lognormal geometric factor (see lognormal).
+
+        Params:
+        -------
+        mean : float
+            mean of lognormal distribution
+        std : float
+            standart deviation of lognormal distribution
+
+        Return:
+        =======
+        Y_g : scipy.stats frozen distribution
+            geometric factor distribution
+        '''
+        muYg, sigmaYg = logN2N(mean, std)
+        return lognorm(s=sigmaYg, scale=np.exp(muYg))
     
 
 class Paris_Erdogan:
@@ -70,45 +91,143 @@ class Paris_Erdogan:
         pass
 
     def initialize(self, a_0, m, n, C, S, Y_g):
-        self.a_0, self.a, self.m, self.n, self.C, self.S, self.Y_g = a_0, a_0, m, n, C, S, Y_g
+        self.a_0, self.m, self.n, self.C, self.S, self.Y_g = a_0, m, n, C, S, Y_g
+
+        # the law is linear in b = a^((2-m)/2): b_{t+1} = b_t + growth
+        self.exponent = (2 - m)/2
+        self.growth = np.asarray(self.exponent*C*(Y_g*np.pi**0.5*S)**m*n, dtype=float)
+
+        # state and buffers, updated in place
+        self.a = np.array(np.broadcast_to(a_0, np.broadcast(a_0, self.growth).shape), dtype=float)
+        self._b = self.a**self.exponent
+        self.growth = np.broadcast_to(self.growth, self.a.shape)
+        # for m > 2, b reaching 0 is an infinite crack
+        self._singular = np.broadcast_to(np.asarray(self.exponent) < 0, self.a.shape)
+        self._a_next = np.empty_like(self.a)
+        self._step = np.empty_like(self._b)
+        self._bad_values = np.zeros(self.a.shape, dtype=bool)
+        self._decreasing = np.empty(self.a.shape, dtype=bool)
 
         self.bad_values_counts = {}
 
     def _filter_values(self, a):
-        bad_values = np.full_like(a, False, dtype=bool)
-        isnan = np.isnan(a)
-        decrasing = (a - self.a) <= 0 
-        bad_values[isnan | decrasing] = True
+        # unstable values (nan, not increasing or past the singularity) are infinite cracks, for good
+        np.less_equal(self._b, 0, out=self._decreasing)
+        self._decreasing &= self._singular
+        self._bad_values |= self._decreasing
+        np.isnan(a, out=self._decreasing)
+        self._bad_values |= self._decreasing
+        np.less_equal(a, self.a, out=self._decreasing)
+        self._bad_values |= self._decreasing
+        if self._bad_values.any():
+            np.copyto(a, np.inf, where=self._bad_values)
+            Warning("Unstable values")
 
         # TODO: count and register bad values count. Must deal with arrays and floats
 
-        if type(a) is np.ndarray:
-            a[bad_values] = np.inf
-            Warning("Unstable values")
-        elif bad_values:
-            a = np.inf
-            Warning("Unstable values")
-        
-        self.a = a
-
+        np.copyto(self.a, a)
 
-    def propagate(self):
+    def propagate(self, steps=1):
         '''
         Propagate
         =========
 
-        Progagate one time step.
+        Progagate one or more time steps. Under a constant load the law 
+        integrates in closed form, so k time steps cost as much as one:
+
+            a_k = (a^((2-m)/2) + k*((2-m)/2)*C*(Y_g*pi^0.5*S)^m*n)^(2/(2-m))
+
+        Parameters
+        ----------
+        steps : int
+            number of time steps
 
         Return
         ------
         a : float or array of floats
-            crack size
+            crack size: the state array <a> itself, overwritten by the next 
+            call (copy it to keep it)
+        '''
+        np.multiply(self.growth, steps, out=self._step)
+        self._b += self._step
+        with np.errstate(invalid='ignore', divide='ignore'):
+            np.power(self._b, 1.0/self.exponent, out=self._a_next)
+        self._filter_values(self._a_next)
+        return self.a if self.a.ndim else self.a[()]
+
+    def path(self, steps):
+        '''
+        Path
+        ====
+
+        Crack sizes of the next time steps in closed form, without 
+        propagating the state (unstable values are infinite cracks, as in 
+        propagate).
+
+        Parameters
+        ----------
+        steps : int
+            number of time steps
+
+        Return
+        ------
+        a : array of floats
+            crack sizes, one row per time step
+        '''
+        k = np.arange(1, steps + 1).reshape((-1,) + (1,)*self.a.ndim)
+        b = self._b + k*self.growth
+        with np.errstate(invalid='ignore', divide='ignore'):
+            a = np.power(b, 1.0/self.exponent)
+            previous = np.concatenate([self.a[np.newaxis], a])[:-1]
+            bad = ((b <= 0) & self._singular) | np.isnan(a) | (a <= previous) | self._bad_values
+        a[np.logical_or.accumulate(bad, axis=0)] = np.inf
+        return a
+
+    def get_state(self):
+        '''
+        Get state
+        =========
+
+        State of the samples: the arrays propagated in place are copied, 
+        the others (replaced by take) are referenced.
+        '''
+        state = dict(self.__dict__)
+        for name in ['a', '_b', '_bad_values']:
+            state[name] = state[name].copy()
+        return state
+
+    def set_state(self, state):
+        '''
+        Set state
+        =========
+
+        Back to a state given by get_state (which can be set again).
         '''
-        a, m, n, C, S, Y_g = self.a, self.m, self.n, self.C, self.S, self.Y_g
+        self.__dict__.update(state)
+        for name in ['a', '_b', '_bad_values']:
+            setattr(self, name, state[name].copy())
 
-        a = (a**((2-m)/2) + ((2-m)/2)*C*(Y_g*np.pi**0.5*S)**m*n)**(2./(2-m))
-        self._filter_values(a)
-        return self.a
+    def take(self, index):
+        '''
+        Take
+        ====
+
+        Keep (or repeat) the given samples, in the given order, e.g. to drop 
+        or resample particles.
+
+        Parameters
+        ----------
+        index : array of int
+            samples to keep
+        '''
+        shape = self.a.shape
+        for name in ['a_0', 'm', 'n', 'C', 'S', 'Y_g', 'exponent', 'growth', 'a', '_b', '_singular', '_bad_values']:
+            value = getattr(self, name)
+            if np.shape(value) == shape:
+                setattr(self, name, np.asarray(value)[index])
+        self._a_next = np.empty_like(self.a)
+        self._step = np.empty_like(self._b)
+        self._decreasing = np.empty(self.a.shape, dtype=bool)
 
     @staticmethod
     def run_example():
@@ -139,4 +258,95 @@ class Paris_Erdogan:
 
 
 
-            
\ No newline at end of file
+            
+
+class ParisErdoganInputs:
+    '''
+    Paris-Erdogan random inputs
+    ===========================
+
+    Random inputs of the Paris-Erdogan law (a_0, C, q and Y_g) as 
+    independent distributions, so that samples can be generated from any 
+    space through the inverse CDFs (e.g.: standard normal space for rare 
+    event methods). The stress range is S = q*Gamma(1 + 1/h).
+
+    Parameters
+    ----------
+    distributions : dict
+        scipy.stats frozen distributions of "a_0", "C", "q" and "Y_g"
+    m : float
+        crack growth parameter
+    n : float
+        number of fatigue cycles per time step
+    h : float
+        Weibull shape parameter of the stress ranges
+    '''
+    def __init__(self, distributions, m, n, h):
+        self.distributions = distributions
+        self.names = list(distributions)
+        self.m, self.n, self.h = m, n, h
+
+    @property
+    def dim(self):
+        return len(self.names)
+
+    def from_standard_normal(self, u):
+        '''
+        From standard normal
+        ====================
+
+        Input samples of standard normal samples (each upper tail read from 
+        the survival function, to keep its precision).
+
+        Params:
+        -------
+        u : array
+            (... x dim) standard normal samples
+
+        Return:
+        =======
+        samples : dict
+            samples of each input
+        '''
+        samples = dict()
+        for i, name in enumerate(self.names):
+            x = u[..., i]
+            dist = self.distributions[name]
+            samples[name] = np.where(x < 0, dist.ppf(norm.cdf(np.minimum(x, 0))), dist.isf(norm.sf(np.maximum(x, 0))))
+        return samples
+
+    def from_uniform(self, p):
+        '''
+        From uniform
+        ============
+
+        Input samples of points in [0, 1)^dim (e.g.: a UniformSampler design).
+
+        Params:
+        -------
+        p : array
+            (... x dim) uniform samples
+
+        Return:
+        =======
+        samples : dict
+            samples of each input
+        '''
+        return {name: self.distributions[name].ppf(p[..., i]) for i, name in enumerate(self.names)}
+
+    def model(self, samples):
+        '''
+        Model
+        =====
+
+        Paris-Erdogan law initialized with the input samples.
+
+        Return:
+        =======
+        model : Paris_Erdogan
+            deterioration model
+        '''
+        model = Paris_Erdogan()
+        S = samples['q']*gamma(1.0 + 1.0/self.h)
+        model.initialize(samples['a_0'], self.m, self.n, samples['C'], S, samples['Y_g'])
+        return model
@@ -0,0 +1,145 @@
+import numpy as np
+
+# phases of a year: prediction (or initial state), inspection and repair
+PHASES = {None: 0, 'PoD': 1, 'PR': 2}
+N_PHASES = len(PHASES)
+
+class History:
+    """
+    History
+    =======
+
+    Results of one component over an episode (year, probability of failure,
+    action and output of every phase), stored in preallocated columns that
+    grow by doubling:
+    - code   : int32, phase-coded time (year*N_PHASES + phase, see PHASES)
+    - pf     : float64, probability of failure
+    - action : int8, index in <actions> (None, 'PoD', 'PR')
+    - output : int8, index in <outputs> (None, 'D', 's0', ...)
+
+    It is written by the inference model and read by ComponentLevel, so
+    results are kept once.
+
+    Parameters:
+    -----------
+    capacity : int
+        number of preallocated rows (e.g.: lifetime*N_PHASES + 1)
+    """
+    # fixed label tables, so that the codes are the same in every history
+    actions = tuple(PHASES)
+    outputs = (None, 'D', 's0')
+
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.code = np.empty(capacity, dtype=np.int32)
+        self.pf = np.empty(capacity, dtype=np.float64)
+        self.action = np.empty(capacity, dtype=np.int8)
+        self.output = np.empty(capacity, dtype=np.int8)
+
+    def __len__(self):
+        return self.size
+
+    def reserve(self, capacity):
+        """
+        Reserve
+        =======
+
+        Grow the columns to hold at least <capacity> rows.
+
+        Parameters:
+        -----------
+        capacity : int
+            number of rows
+        """
+        if capacity <= len(self.code):
+            return
+        for name in ('code', 'pf', 'action', 'output'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, t, pf, action=None, output=None):
+        """
+        Append
+        ======
+
+        Store the results of one phase.
+
+        Parameters:
+        -----------
+        t : int
+            year (the phase is given by the action)
+        pf : float
+            probability of failure
+        action : str
+            action (None, 'PoD', 'PR')
+        output : str
+            output (None, 'D', 's0')
+        """
+        if self.size == len(self.code):
+            self.reserve(2*self.size)
+        i = self.size
+        self.action[i] = self._encode(History.actions, action)
+        self.code[i] = int(t)*N_PHASES + self.action[i]
+        self.pf[i] = pf
+        self.output[i] = self._encode(History.outputs, output)
+        self.size += 1
+
+    def extend(self, t, pf):
+        """
+        Extend
+        ======
+
+        Store the results of several prediction steps at once.
+
+        Parameters:
+        -----------
+        t : array
+            years
+        pf : array
+            probability of failure of every year
+        """
+        n = len(t)
+        if self.size + n > len(self.code):
+            self.reserve(max(2*len(self.code), self.size + n))
+        rows = slice(self.size, self.size + n)
+        self.code[rows] = np.asarray(t, dtype=np.int32)*N_PHASES
+        self.pf[rows] = pf
+        self.action[rows] = 0
+        self.output[rows] = 0
+        self.size += n
+
+    @staticmethod
+    def _encode(labels, label):
+        if label not in labels:
+            raise ValueError(f"Unknown label: {label} (expected one of {labels})")
+        return labels.index(label)
+
+    def copy(self):
+        history = History(len(self.code))
+        history.size = self.size
+        for name in ('code', 'pf', 'action', 'output'):
+            getattr(history, name)[:self.size] = getattr(self, name)[:self.size]
+        return history
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def get_year(self):
+        return self.code[:self.size]//N_PHASES
+
+    def get_phase(self):
+        return self.code[:self.size]%N_PHASES
+
+    def get_pf(self):
+        return self.pf[:self.size]
+
+    def get_action(self):
+        return np.array(History.actions, dtype=object)[self.action[:self.size]]
+
+    def get_output(self):
+        return np.array(History.outputs, dtype=object)[self.output[:self.size]]
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ('code', 'pf', 'action', 'output'))
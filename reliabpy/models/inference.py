@@ -1,9 +1,94 @@
 import numpy as np
 from scipy.stats import norm
+from scipy import sparse
+from copy import deepcopy as dcopy
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
+import warnings
 from reliabpy.models.observation import Probability_of_Detection as PoD
+from reliabpy.commons.sampling import UniformSampler
+from reliabpy.models.history import History, PHASES
 
 import torch
 
+# transition matrices with a lower fraction of non-zeros are stored sparse
+SPARSE_DENSITY = 0.1
+# default number of beliefs kept by the BeliefCache of each zone model
+BELIEF_CACHE_SIZE = 4096
+# particles below this fraction of the largest weight are dropped
+WEIGHT_EPS = 1e-12
+
+def transition_tensor(T, storage='auto'):
+    '''
+    Transition tensor
+    =================
+
+    Convert a transition matrix to the tensor used for belief propagation.
+
+    Parameters:
+    -----------
+    T : matrix
+        (n x n) transition matrix (array, scipy.sparse matrix or tensor)
+    storage : str
+        "dense", "sparse" (compressed sparse column) or "auto" to choose 
+        from the density of T (see SPARSE_DENSITY).
+
+    Returns:
+    --------
+    T : tensor
+        dense or sparse CSC (n x n) transition matrix
+    '''
+    if isinstance(T, torch.Tensor) and T.layout != torch.strided:
+        T = T.to_dense()
+    if sparse.issparse(T):
+        density = T.nnz/np.prod(T.shape)
+    else:
+        T = np.asarray(T)
+        density = np.count_nonzero(T)/T.size
+    
+    if storage == 'auto':
+        storage = 'sparse' if density < SPARSE_DENSITY else 'dense'
+    if storage == 'dense':
+        return torch.Tensor(T.toarray() if sparse.issparse(T) else T)
+    elif storage == 'sparse':
+        T = sparse.csc_matrix(T, dtype=np.float32)
+        T.sort_indices()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning) # beta state warning
+            return torch.sparse_csc_tensor(
+                torch.from_numpy(T.indptr.astype(np.int64)), 
+                torch.from_numpy(T.indices.astype(np.int64)), 
+                torch.from_numpy(T.data), size=T.shape)
+    else:
+        raise ValueError(f"Unknown storage: {storage}")
+
+def propagate(s, T):
+    '''
+    Propagate
+    =========
+
+    Belief propagation s*T for dense or sparse transition matrices.
+
+    Parameters:
+    -----------
+    s : tensor
+        (... x n) belief states
+    T : tensor
+        (n x n) dense or sparse CSC transition matrix
+
+    Returns:
+    --------
+    s : tensor
+        (... x n) propagated belief states
+    '''
+    if T.layout == torch.strided:
+        return torch.matmul(s, T)
+    # (s*T)' = T'*s', where T' of a CSC matrix is a CSR matrix
+    shape = s.shape
+    return torch.matmul(T.t(), s.reshape(-1, shape[-1]).T).T.reshape(shape)
+
 class _Base(object):
     def _global_init(self):
         self.store_results = True
@@ -12,15 +97,19 @@ class _Base(object):
         self.force_detection =  False
         self.force_notdetection = False
 
+    @property
+    def phase(self):
+        # phase of the current year (prediction, inspection or repair)
+        return PHASES[self.action]
+
+    def _reset_results(self):
+        if self.store_results:
+            self.results = History()
+            self._store_results()
 
     def _store_results(self):
         if self.store_results:
-            self.results.append([
-                self.t, 
-                self.pf,
-                self.action,
-                self.output
-                ])
+            self.results.append(self.t, self.pf, self.action, self.output)
 
     def get_pf(self):
         """
@@ -32,8 +121,9 @@ class _Base(object):
 
         Return:
         -------
-        time : array
-            time for the pf
+        year : array
+            year of the pf (repeated after inspections and repairs, see 
+            <phase>)
         pf : array
             probability of failure
         """
@@ -41,11 +131,51 @@ class _Base(object):
         if not self.store_results:
             raise Warning("No stored probability of failure: store_results is", self.store_results)
         
-        results = np.array(self.results)
-        time, pf = results[:,0], results[:,1]
-
-        return time, pf
+        return self.results.get_year(), self.results.get_pf()
     
+    def spawn(self):
+        """
+        Spawn
+        =====
+
+        Independent copy of the model, e.g. for one component of a system.
+        """
+        return dcopy(self)
+
+    def get_state(self):
+        """
+        Get state
+        =========
+
+        Mutable state of the model (everything but the stored results), 
+        e.g. for SystemLevel.snapshot. Arrays of the model are replaced, 
+        not modified in place, so the state holds references, except for 
+        the deterioration model, propagated in place (see 
+        Paris_Erdogan.get_state).
+        """
+        state = {key: value for key, value in self.__dict__.items() if key != 'results'}
+        deterioration = self._deterioration()
+        if deterioration is not None:
+            state['_deterioration_state'] = (deterioration, deterioration.get_state())
+        return state
+
+    def set_state(self, state):
+        """
+        Set state
+        =========
+
+        Back to a state given by get_state (which can be set again).
+        """
+        state = dict(state)
+        deterioration, deterioration_state = state.pop('_deterioration_state', (None, None))
+        self.__dict__.update(state)
+        if deterioration is not None:
+            deterioration.set_state(deterioration_state)
+
+    def _deterioration(self):
+        # deterioration model propagated in place (None if there is none)
+        return None
+
     def get_results(self):
         """
         Get results
@@ -53,6 +183,7 @@ class _Base(object):
         
         Return a dictionary with the results for the entire episode: 
         - year   : year
+        - phase  : phase of the year (see history.PHASES)
         - pf     : probability of failure
         - action    : observation
         - output : output on a component
@@ -60,15 +191,14 @@ class _Base(object):
         Return:
         -------
         results : dict
-            year, pf, action, output
+            year, phase, pf, action, output
         """
 
         if not self.store_results:
             raise Warning("No stored probability of failure: store_results is", self.store_results)
 
-        results = np.array(self.results)
-
-        return {"year" : results[:,0], "pf" : results[:,1], "action" : results[:,2], "output" : results[:,3]}
+        return {"year" : self.results.get_year(), "phase" : self.results.get_phase(), "pf" : self.results.get_pf(), 
+                "action" : self.results.get_action(), "output" : self.results.get_output()}
 
 class MonteCarloSimulation(_Base):
     """
@@ -94,31 +224,48 @@ class MonteCarloSimulation(_Base):
 
         self.num_samples = len(self.a_0)
 
-        self.pf = self.get_prob_fail()
-
         self.t = 0
         self.PoD = np.ones_like(a_0)
 
-        if self.store_results:
-            self.results = [[
-                self.t, 
-                self.pf,
-                None,
-                None]]
+        self.pf = self.get_prob_fail()
 
-    def predict(self):
+        # inverse PoD settings of each inspection quality and threshold buffer
+        self.inverse_likelihoods = {quality: PoD.get_settings(quality, inverse=True) for quality in PoD.settings}
+        self._a_detected = np.empty(self.num_samples)
+
+        self._reset_results()
+
+    def predict(self, steps=1):
         """
         Predict
         =======
         
-        Propagate one time step.
-        """
-        self.a = self.f()
-        self.t += 1
-
-        if self.store_results: self._store_results()
+        Propagate one or more time steps. The probability of failure of 
+        every step is stored in <steps_pf>.
 
-    def update(self, parameters):
+        Parameters:
+        -----------
+        steps : int
+            number of time steps
+        """
+        self.action = None
+        self.output = None
+        self.steps_pf = list()
+        for step in range(steps):
+            # copy: the function may return its own state (Paris_Erdogan.propagate)
+            self.a = np.array(self.f())
+            self.t += 1
+            self.pf = self.get_prob_fail()
+            self.steps_pf.append(self.pf)
+
+            if self.store_results: self._store_results()
+
+    def _deterioration(self):
+        # model of the propagation function (e.g.: Paris_Erdogan.propagate)
+        model = getattr(self.f, '__self__', None)
+        return model if hasattr(model, 'get_state') else None
+
+    def update(self, parameters, detection_draw=None):
         """
         Update
         ======
@@ -129,16 +276,26 @@ class MonteCarloSimulation(_Base):
 
         Parameters:
         -----------
-        parameters : dict
+        parameters : dict or str
             inspection parameters. so far, with only "quality" key (good, normal and bad)
+        detection_draw : float, optional
+            uniform draw in [0, 1) deciding the observation outcome. If None, 
+            the outcome is sampled from the global numpy random state.
         """
         self.action = 'PoD'
-        parameters, invPoD_func = PoD.get_settings(parameters['quality'], inverse=True)
+        quality = parameters['quality'] if isinstance(parameters, dict) else parameters
+        if quality not in self.inverse_likelihoods:
+            self.inverse_likelihoods[quality] = PoD.get_settings(quality, inverse=True)
+        parameters, invPoD_func = self.inverse_likelihoods[quality]
 
         uniform_dist = np.random.uniform(size=self.num_samples)
-        a_detected = invPoD_func(uniform_dist, **parameters)
+        a_detected = invPoD_func(uniform_dist, **parameters, out=self._a_detected)
         samples_detected = self.a > a_detected
-        self.crack_detected = bool(np.random.binomial(1, samples_detected.sum()/self.num_samples))
+        p_detection = samples_detected.sum()/self.num_samples
+        if detection_draw is None:
+            self.crack_detected = bool(np.random.binomial(1, p_detection))
+        else:
+            self.crack_detected = bool(detection_draw < p_detection)
         if any([self.force_detection, self.force_notdetection]):
             if self.force_detection:
                 gH = samples_detected
@@ -151,6 +308,7 @@ class MonteCarloSimulation(_Base):
                 gH = self.a <= a_detected
         self.PoD = self.PoD*gH
 
+        self.pf = self.get_prob_fail()
         if self.store_results: self._store_results()
 
     def get_prob_fail(self):
@@ -172,63 +330,701 @@ class MonteCarloSimulation(_Base):
 
         return failed_detected/total
 
+class ChunkedMonteCarloSimulation:
+    """
+    Chunked Monte Carlo Simulation
+    ==============================
+
+    Monte Carlo Simulation of many episodes and components at once, with 
+    (episodes x components x samples) arrays processed in chunks of 
+    <chunk_size> samples, so the memory is bounded whatever the total 
+    number of samples. Observations are accounted for with likelihood 
+    weights (PoD of the sampled crack depth if detected, 1 - PoD if not), 
+    each chunk being reduced to weighted sums before the next one is drawn.
+
+    Parameters:
+    -----------
+    sampler : function
+        sampler(size) returns the initial crack sizes of an array of shape 
+        <size> and a function propagating them one time step (with no 
+        input, as in MonteCarloSimulation)
+    a_crit : float
+        critical crack depth
+    n_samples : int
+        number of samples of each (episode, component)
+    chunk_size : int
+        number of samples of each (episode, component) in a chunk
+    """
+    def __init__(self, sampler, a_crit, n_samples, chunk_size=100000):
+        self.sampler = sampler
+        self.a_crit = a_crit
+        self.n_samples = n_samples
+        self.chunk_size = chunk_size
+
+    def run(self, lifetime, observations=None, shape=(1, 1)):
+        """
+        Run
+        ===
+
+        Probability of failure of every episode and component over the 
+        lifetime, given the inspection outcomes.
+
+        Parameters:
+        -----------
+        lifetime : int
+            simulation horizon
+        observations : dict, optional
+            {year: (quality, detected)} with detected a (episodes x 
+            components) array: 1 if detected, 0 if not detected and nan if 
+            not inspected
+        shape : tuple
+            (episodes, components), when there is no observation
+
+        Returns:
+        --------
+        pf : array
+            (episodes x components x lifetime+1) probability of failure, 
+            after the observations of each year
+        """
+        observations = dict() if observations is None else observations
+        likelihoods = dict()
+        for year, (quality, detected) in observations.items():
+            parameters, function = PoD.get_settings(quality)
+            detected = np.asarray(detected, dtype=float)
+            likelihoods[year] = (parameters, function, detected[..., None])
+            shape = detected.shape
+
+        sum_w = np.zeros((*shape, lifetime + 1))
+        sum_w2, sum_wf = np.zeros_like(sum_w), np.zeros_like(sum_w)
+        prior_w, prior_wf = dict(), dict()
+        for first in range(0, self.n_samples, self.chunk_size):
+            size = min(self.chunk_size, self.n_samples - first)
+            a, function = self.sampler((*shape, size))
+            w = np.ones_like(a)
+            for t in range(lifetime + 1):
+                if t > 0:
+                    a = function()
+                if t in likelihoods:
+                    prior_w[t] = prior_w.get(t, 0.0) + w.sum(axis=-1)
+                    prior_wf[t] = prior_wf.get(t, 0.0) + (w*(a > self.a_crit)).sum(axis=-1)
+                    parameters, pod, detected = likelihoods[t]
+                    p = pod(a, **parameters)
+                    w *= np.where(np.isnan(detected), 1.0, np.where(detected == 1, p, 1.0 - p))
+                sum_w[..., t] += w.sum(axis=-1)
+                sum_w2[..., t] += (w**2).sum(axis=-1)
+                sum_wf[..., t] += (w*(a > self.a_crit)).sum(axis=-1)
+
+        # effective sample size of the likelihood weights
+        self.ess = sum_w**2/sum_w2
+        self.pf = sum_wf/sum_w
+        self.prior_pf = {t: prior_wf[t]/prior_w[t] for t in prior_w}
+        return self.pf
+
+    def get_pf(self, episode=0, component=0):
+        """
+        Get P_f
+        =======
+
+        Probability of failure of one episode and component and its 
+        timestep, laid out as the results of the other inference models 
+        (before and after the observations, both at year t), e.g. for 
+        metrics.pf_rmse.
+
+        Return:
+        -------
+        year : array
+            year of the pf
+        pf : array
+            probability of failure
+        """
+        year, pf = list(), list()
+        for t in range(self.pf.shape[-1]):
+            if t in self.prior_pf:
+                year.append(t)
+                pf.append(self.prior_pf[t][episode, component])
+            year.append(t)
+            pf.append(self.pf[episode, component, t])
+        return np.array(year), np.array(pf)
+
+class ParticleFilter(_Base):
+    """
+    Particle Filter
+    ===============
+
+    Sequential Monte Carlo inference of one component: particles of the 
+    Paris-Erdogan inputs are propagated and weighted by the PoD likelihood 
+    of the inspection outcomes. Particles with a negligible weight left are 
+    dropped, and when the effective sample size falls below <ess_threshold> 
+    times the number of particles, they are resampled (systematic 
+    resampling) back to <n_particles> with equal weights. It is used by ComponentLevel as the 
+    dynamic Bayesian network (perfect repair draws new particles).
+
+    Parameters:
+    -----------
+    inputs : ParisErdoganInputs
+        random inputs of the deterioration model
+    a_crit : float
+        critical crack depth
+    n_particles : int
+        number of particles
+    ess_threshold : float
+        fraction of <n_particles> under which the particles are resampled
+    """
+    def __init__(self, inputs, a_crit, n_particles, ess_threshold=0.5):
+        self._global_init()
+        self.inputs = inputs
+        self.a_crit = a_crit
+        self.n_particles = n_particles
+        self.ess_threshold = ess_threshold
+        self.reset()
+
+    def reset(self):
+        """
+        Reset
+        =====
+
+        Back to the initial state (new particles at t = 0).
+        """
+        self.t, self.action, self.output = 0, None, None
+        self._draw_particles()
+        self.pf = self.get_prob_fail()
+
+        self._reset_results()
+
+    def _draw_particles(self):
+        u = np.random.standard_normal((self.n_particles, self.inputs.dim))
+        self.deterioration = self.inputs.model(self.inputs.from_standard_normal(u))
+        self.weights = np.ones(self.n_particles)
+        self.n_resampling = 0
+
+    @property
+    def ess(self):
+        return self.weights.sum()**2/(self.weights**2).sum()
+
+    def predict(self, steps=1):
+        """
+        Predict
+        =======
+        
+        Propagate one or more time steps. The probability of failure of 
+        every step is stored in <steps_pf>. When the results are not stored, 
+        the particles jump ahead in closed form.
+
+        Parameters:
+        -----------
+        steps : int
+            number of time steps
+        """
+        self.action = None
+        self.output = None
+        if not self.store_results:
+            path = self.deterioration.path(steps - 1)
+            self.steps_pf = list(np.dot(path > self.a_crit, self.weights)/self.weights.sum())
+            self.deterioration.propagate(steps)
+            self.t += steps
+            self.pf = self.get_prob_fail()
+            self.steps_pf.append(self.pf)
+            return
+
+        self.steps_pf = list()
+        for step in range(steps):
+            self.deterioration.propagate()
+            self.t += 1
+            self.pf = self.get_prob_fail()
+            self.steps_pf.append(self.pf)
+
+            self._store_results()
+
+    def update(self, insp_quality, detection_draw=None):
+        """
+        Update
+        ======
+
+        Update the particle weights with the Probability of Detection 
+        inspection model, then drop or resample the particles.
+
+        Parameters:
+        -----------
+        insp_quality : str
+            inspection quality (good, normal and bad)
+        detection_draw : float, optional
+            uniform draw in [0, 1) deciding the observation outcome. If None, 
+            the outcome is sampled from the global numpy random state.
+        """
+        parameters, function = PoD.get_settings(insp_quality)
+        likelihood = function(self.deterioration.a, **parameters)
+        p_detection = np.dot(self.weights, likelihood)/self.weights.sum()
+
+        if detection_draw is None:
+            self.crack_detected = bool(np.random.binomial(1, p_detection))
+        else:
+            self.crack_detected = bool(float(detection_draw) < p_detection)
+        if any([self.force_detection, self.force_notdetection]):
+            detected = self.force_detection
+        else:
+            detected = self.crack_detected
+
+        self.weights = self.weights*(likelihood if detected else 1.0 - likelihood)
+        # particles with a negligible weight left are dropped
+        alive = self.weights > WEIGHT_EPS*self.weights.max()
+        if not alive.all():
+            self._take(np.nonzero(alive)[0])
+        if self.ess < self.ess_threshold*self.n_particles:
+            self._resample()
+
+        self.pf = self.get_prob_fail()
+        self.action = 'PoD'
+        if self.crack_detected: self.output = 'D'
+        
+        if self.store_results: self._store_results()
+
+    def perform_action(self):
+        """
+        Perform output
+        ==============
+
+        Perform perfect repair output.
+        """
+        self._draw_particles()
+
+        self.pf = self.get_prob_fail()
+        self.action = 'PR'
+        self.output = 's0'
+
+        if self.store_results: self._store_results()
+
+    def _deterioration(self):
+        return self.deterioration
+
+    def _take(self, index):
+        self.deterioration.take(index)
+        self.weights = self.weights[index]
+
+    def _resample(self):
+        # systematic resampling
+        cumulative = np.cumsum(self.weights)
+        positions = (np.random.uniform() + np.arange(self.n_particles))*cumulative[-1]/self.n_particles
+        index = np.minimum(np.searchsorted(cumulative, positions, side='right'), len(cumulative) - 1)
+        self._take(index)
+        self.weights = np.ones(self.n_particles)
+        self.n_resampling += 1
+
+    def get_prob_fail(self):
+        """
+        Get probability of failure
+        ==========================
+
+        Get the probability of failure for the current timestep
+
+        Returns
+        -------
+        pf : float
+            current probability of failure
+        """
+        return np.dot(self.weights, self.deterioration.a > self.a_crit)/self.weights.sum()
+
 class TransitionMatrix:
-    # TODO: Transition matrix class
     """
     Transtion Matrix
     ================
     
-    Build the transtion matrix for a given function and discretization scheme.
+    Build the transtion matrix of a dynamic Bayesian network, as ANAST 
+    (dr_OUT.mat), from Monte Carlo samples of the deterioration model. The 
+    states are (deterioration index, crack depth) pairs: the index of a 
+    sample is its age in years (the last index is absorbing) and its crack 
+    depth is binned with the discretization. The transition probabilities 
+    are the frequencies of the one year transitions of the samples, rows 
+    never reached going to the failure state (last crack depth bin).
+
+    Samples are processed in chunks (optionally in parallel processes), and 
+    built matrices can be cached on disk, keyed by a hash of the inputs.
 
     Parameters:
     -----------
-    discretization : array
-        initial state vector (& x n)
-    function : function
-        propagation function over time: f(a)
+    discretization : dict
+        bin edges of the deterioration index ("t") and crack depth ("a"), 
+        as returned by import_DBN_input_data
+    inputs : ParisErdoganInputs
+        random inputs of the deterioration model
+    n_samples : int
+        number of samples
+    design : str
+        sample design: "random", "lhs" or "sobol" (see UniformSampler)
+    seed : int
+        seed of the sample design
     """
-    def __init__(self, discretization, function):
+    def __init__(self, discretization, inputs, n_samples=100000, design="random", seed=0):
         self.discretization = discretization
-        self.function = function
+        self.inputs = inputs
+        self.n_samples = n_samples
+        self.design = design
+        self.seed = seed
+
+        self.n_t = len(discretization['t']) - 1
+        self.n_a = len(discretization['a']) - 1
 
-    def build_T(self):
+    def hash(self, chunk_size=None):
+        """
+        Hash
+        ====
+
+        Hash of all the inputs of the transition matrix.
+
+        Parameters:
+        -----------
+        chunk_size : int, optional
+            number of samples per chunk (see build_T), an input only of the 
+            Latin hypercube design, each chunk being a new hypercube (random 
+            and Sobol chunks continue the same sequence)
+        """
+        inputs = [self.n_samples, self.design, self.seed, self.inputs.m, self.inputs.n, self.inputs.h]
+        if self.design == "lhs":
+            inputs.append(min(self.n_samples, 100000 if chunk_size is None else chunk_size))
+        for name, dist in self.inputs.distributions.items():
+            inputs += [name, dist.dist.name, dist.args, sorted(dist.kwds.items())]
+        digest = hashlib.sha256(repr(inputs).encode())
+        for name in sorted(self.discretization):
+            digest.update(np.asarray(self.discretization[name], dtype=float).tobytes())
+        return digest.hexdigest()
+
+    def build_T(self, chunk_size=100000, n_jobs=1, cache_folder=None):
         """
         Build T
         =======
 
-        Build transtiion matrix.
+        Build transtiion matrix. The initial belief state is stored in <b0>.
+
+        Parameters:
+        -----------
+        chunk_size : int
+            number of samples per chunk
+        n_jobs : int
+            number of processes processing chunks
+        cache_folder : path, optional
+            folder of the cached matrices (T_<hash>.npz)
 
         Returns:
         --------
-        T : matrix
+        T : scipy.sparse.csc_matrix
             transtion matrix
         """
-        T = None
+        if cache_folder is not None:
+            path = os.path.join(cache_folder, f"T_{self.hash(chunk_size)}.npz")
+            if os.path.exists(path):
+                with np.load(path) as cached:
+                    self.b0 = cached['b0']
+                    return sparse.csc_matrix((cached['data'], cached['indices'], cached['indptr']), shape=tuple(cached['shape']))
+
+        uniform = UniformSampler(self.inputs.dim, self.design, self.seed)
+        sizes = [min(chunk_size, self.n_samples - first) for first in range(0, self.n_samples, chunk_size)]
+        initial, transitions = 0, 0
+        if n_jobs > 1:
+            # chunks are drawn in order (the result does not depend on n_jobs), 
+            # at most 2*n_jobs of them at a time
+            with ProcessPoolExecutor(n_jobs) as executor:
+                for first in range(0, len(sizes), 2*n_jobs):
+                    points = [uniform(size) for size in sizes[first:first + 2*n_jobs]]
+                    for chunk_initial, chunk_transitions in executor.map(self._count, points):
+                        initial, transitions = initial + chunk_initial, transitions + chunk_transitions
+        else:
+            for size in sizes:
+                chunk_initial, chunk_transitions = self._count(uniform(size))
+                initial, transitions = initial + chunk_initial, transitions + chunk_transitions
+
+        T = self._normalize(transitions)
+        self.b0 = np.zeros(self.n_t*self.n_a)
+        self.b0[:self.n_a] = initial/initial.sum()
+
+        if cache_folder is not None:
+            os.makedirs(cache_folder, exist_ok=True)
+            np.savez(path, data=T.data, indices=T.indices, indptr=T.indptr, shape=T.shape, b0=self.b0)
         return T
 
-class DynamicBayesianNetwork(_Base):
+    def get_DBN_input_data(self, **kwargs):
+        """
+        Get DBN input data
+        ==================
+
+        Transition matrix, initial belief state and discretizations, as 
+        import_DBN_input_data (keyword arguments of build_T).
+        """
+        T = self.build_T(**kwargs)
+        return T, self.b0, self.discretization
+
+    def _bin(self, a):
+        # crack depth bins, by arithmetic for evenly spaced inner edges
+        edges = np.asarray(self.discretization['a'][1:-1], dtype=float)
+        step = np.diff(edges)
+        if len(edges) < 2 or not np.allclose(step, step[0]):
+            return np.searchsorted(edges, a, side='right')
+
+        j = np.floor(np.clip((a - edges[0])/step[0] + 1, 0, len(edges))).astype(np.int64)
+        # rounding at the edges
+        padded = np.concatenate([[-np.inf], edges, [np.inf]])
+        j += (a >= padded[j + 1]) & (j < len(edges))
+        j -= a < padded[j]
+        return j
+
+    def _count(self, points):
+        # counts of the initial crack depths and of the (index, depth) -> depth transitions
+        model = self.inputs.model(self.inputs.from_uniform(points))
+        j = self._bin(model.a)
+        initial = np.bincount(j, minlength=self.n_a)
+        transitions = np.zeros(self.n_t*self.n_a*self.n_a, dtype=np.int64)
+        for i in range(self.n_t):
+            k = self._bin(model.propagate())
+            transitions += np.bincount((i*self.n_a + j)*self.n_a + k, minlength=len(transitions))
+            j = k
+        return initial, transitions
+
+    def _normalize(self, transitions):
+        # frequencies of the transitions, unreached rows go to failure
+        transitions = transitions.reshape(self.n_t*self.n_a, self.n_a).astype(float)
+        unreached = transitions.sum(axis=1) == 0
+        transitions[unreached, -1] = 1.0
+        transitions /= transitions.sum(axis=1, keepdims=True)
+
+        rows, k = np.nonzero(transitions)
+        i = np.minimum(rows//self.n_a + 1, self.n_t - 1)
+        n = self.n_t*self.n_a
+        return sparse.csc_matrix((transitions[rows, k], (rows, i*self.n_a + k)), shape=(n, n))
+
+class TransitionPowers:
     '''
-    Component level dynamic Bayesian network
-    ========================================
+    Transition powers
+    =================
 
-    Dynamic Bayesian nework for one component.
+    Cache of the powers T^k of a transition matrix, of the failure 
+    projections T^k*f (so that pf(s*T^k) = s*T^k*f is a dot product), and of 
+    the beliefs s0*T^k of components starting from the initial (or repaired) 
+    state. It is part of the ZoneModel, so it is shared by all components 
+    using the same model.
+
+    Parameters:
+    -----------
+    T : tensor
+        (n x n) dense or sparse CSC transition matrix
+    s0 : tensor
+        initial state vector (n)
+    failure : tensor
+        (n) indicator of the failure states
+    '''
+    def __init__(self, T, s0, failure):
+        self.T = T
+        self._powers = {1: T}
+        self._projections = failure.reshape(1, -1)
+        self._s0_beliefs = s0.reshape(1, -1)
+
+    def power(self, k):
+        """
+        Power
+        =====
+
+        Transition matrix for k time steps, T^k.
+        """
+        if k not in self._powers:
+            T_k = self.power(k - 1)
+            if T_k.layout != torch.strided:
+                T_k = T_k.to_dense()
+            self._powers[k] = transition_tensor(propagate(T_k, self.T))
+        return self._powers[k]
+
+    def projections(self, k):
+        """
+        Projections
+        ===========
+
+        Failure projections T^j*f for j = 0, ..., k as a (k+1 x n) tensor.
+        """
+        if len(self._projections) <= k:
+            T = self.T.to_dense() if self.T.layout != torch.strided else self.T
+            projections = list(self._projections)
+            while len(projections) <= k:
+                projections.append(torch.matmul(T, projections[-1]))
+            self._projections = torch.stack(projections)
+        return self._projections[:k+1]
+
+    def s0_beliefs(self, k):
+        """
+        s0 beliefs
+        ==========
+
+        Beliefs s0*T^j for j = 0, ..., k as a (k+1 x n) tensor.
+        """
+        if len(self._s0_beliefs) <= k:
+            beliefs = list(self._s0_beliefs)
+            while len(beliefs) <= k:
+                beliefs.append(propagate(beliefs[-1], self.T))
+            self._s0_beliefs = torch.stack(beliefs)
+        return self._s0_beliefs[:k+1]
+
+    def predict(self, s, steps_from_s0, steps):
+        """
+        Predict
+        =======
+
+        Propagate beliefs <steps> time steps: the beliefs of components 
+        repaired (or initial) <steps_from_s0> steps ago are read from the 
+        s0 beliefs, the others are propagated with T^steps. <s> and 
+        <steps_from_s0> are updated in place.
+
+        Parameters:
+        -----------
+        s : tensor
+            (... x n) belief states
+        steps_from_s0 : tensor
+            (...) steps since the initial state (-1 if unknown)
+        steps : int
+            number of time steps
+
+        Returns:
+        --------
+        steps_pf : tensor
+            (... x steps-1) probability of failure of the intermediate steps
+        """
+        steps_pf = torch.matmul(s, self.projections(steps - 1)[1:].T)
+        from_s0 = steps_from_s0 >= 0
+        steps_from_s0[from_s0] += steps
+        if from_s0.any():
+            s[from_s0] = self.s0_beliefs(int(steps_from_s0.max()))[steps_from_s0[from_s0]]
+        if not from_s0.all():
+            s[~from_s0] = propagate(s[~from_s0], self.power(steps))
+        return steps_pf
+
+class ObservationLikelihoods:
+    '''
+    Observation likelihoods
+    =======================
+
+    Likelihoods of detection and no detection of every state for each 
+    inspection quality, computed once for a discretization (ZoneModel). 
+    Inspection techniques registered later in Probability_of_Detection are 
+    computed at their first use.
+
+    Parameters:
+    -----------
+    states_values : array
+        crack depth of each crack state
+    total_nstates : int
+        total number of states
+    '''
+    def __init__(self, states_values, total_nstates):
+        self.states_values = states_values
+        self.total_nstates = total_nstates
+        self.tables = dict()
+        for quality in PoD.settings:
+            self[quality]
+
+    def __getitem__(self, quality):
+        """
+        Likelihoods of an inspection quality
+        ====================================
+
+        Returns:
+        --------
+        detected : tensor
+            (n) probability of detection of each state
+        not_detected : tensor
+            (n) probability of no detection of each state
+        """
+        if quality not in self.tables:
+            parameters, function = PoD.get_settings(quality)
+            obs_pmf = function(self.states_values, **parameters)
+            detected = torch.Tensor(np.tile(obs_pmf, int(self.total_nstates/len(obs_pmf))))
+            self.tables[quality] = (detected, 1 - detected)
+        return self.tables[quality]
+
+class BeliefCache:
+    '''
+    Belief cache
+    ============
+
+    Least recently used cache of the beliefs reached from the initial (or 
+    repaired) state through a history of predictions and observations. It is 
+    part of the ZoneModel, so components with the same model and the same 
+    history (within an episode or across episodes) share the result.
+
+    Parameters:
+    -----------
+    maxsize : int
+        maximum number of cached beliefs (0 disables the cache)
+    '''
+    def __init__(self, maxsize=BELIEF_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits, self.misses = 0, 0
+        self._beliefs = OrderedDict()
+
+    def __len__(self):
+        return len(self._beliefs)
+
+    def get(self, history):
+        """
+        Get
+        ===
+
+        Cached value of a history signature, None if it is not cached.
+        """
+        value = self._beliefs.get(history)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._beliefs.move_to_end(history)
+        return value
+
+    def put(self, history, value):
+        """
+        Put
+        ===
+
+        Cache the value of a history signature, evicting the least recently 
+        used one if the cache is full.
+        """
+        if self.maxsize <= 0:
+            return
+        self._beliefs[history] = value
+        self._beliefs.move_to_end(history)
+        if len(self._beliefs) > self.maxsize:
+            self._beliefs.popitem(last=False)
+
+    def clear(self):
+        """
+        Clear
+        =====
+
+        Empty the cache and its hit/miss counters.
+        """
+        self._beliefs.clear()
+        self.hits, self.misses = 0, 0
+
+class ZoneModel:
+    '''
+    Zone model
+    ==========
+
+    Immutable part of a dynamic Bayesian network: transition matrix, initial 
+    state, discretizations, cache of transition powers and observation 
+    likelihoods. It is shared by all components with the same deterioration 
+    model (copies of a model point to the same ZoneModel), while each 
+    DynamicBayesianNetwork only keeps its own small state.
 
     Parameters:
     -----------
     T : matrix
-        (n x n) transtiion matrix
+        (n x n) transtiion matrix (dense or scipy.sparse)
     s0 : array
         initial state vector (1 x n)
     discretization : dict
         discretization of all variables (e.g.: crack depth and time) 
+    storage : str
+        transition matrix storage: "dense", "sparse" or "auto" (from its 
+        density)
+    cache_size : int
+        maximum number of beliefs kept by the BeliefCache
     '''
-    
-    def __init__(self, T, s0, discretizations):
-        self._global_init()
-
-        self.T = torch.Tensor(T)
-        self.s = torch.Tensor(s0)
-        self.s0 = torch.Tensor(s0.copy())
+    def __init__(self, T, s0, discretizations, storage='auto', cache_size=BELIEF_CACHE_SIZE):
+        self.T = transition_tensor(T, storage)
+        self.s0 = torch.Tensor(np.array(s0))
         self.discretizations = discretizations
 
         self.states_values = np.diff(discretizations['a']/2) + discretizations['a'][:-1]
@@ -240,33 +1036,193 @@ class DynamicBayesianNetwork(_Base):
             self.n_states[var_name] = quant
             self.total_nstates *= quant
         
-        self.pf = self.get_prob_fail()
+        failure = torch.zeros(list(self.n_states.values()))
+        failure[:, -1] = 1
+        self.powers = TransitionPowers(self.T, self.s0, failure.reshape(-1))
+        self.likelihoods = ObservationLikelihoods(self.states_values, self.total_nstates)
+        self.beliefs = BeliefCache(cache_size)
+        self.pf0 = self.prob_fail(self.s0)
+
+    def prob_fail(self, s):
+        """
+        Probability of failure
+        ======================
 
+        Probability of failure of a belief state.
+
+        Parameters:
+        -----------
+        s : tensor
+            belief state (1 x n)
+
+        Returns
+        -------
+        pf : float
+            probability of failure
+        """
+        return s.reshape(list(self.n_states.values())).sum(axis=0)[-1]
+
+    def __deepcopy__(self, memo):
+        return self
+
+class DynamicBayesianNetwork(_Base):
+    '''
+    Component level dynamic Bayesian network
+    ========================================
+
+    Dynamic Bayesian nework for one component. The immutable data (T, s0, 
+    discretizations, ...) is held by a ZoneModel shared between copies, 
+    the network itself only keeps the state of the component (belief, time, 
+    pf, action and output). Beliefs are never modified in place.
+
+    The history of predictions and observations since the initial state (or 
+    the last repair) is the key of the belief in the BeliefCache of the zone 
+    model: components repeating a history reuse its belief without matmul.
+
+    Parameters:
+    -----------
+    T : matrix
+        (n x n) transtiion matrix (dense or scipy.sparse)
+    s0 : array
+        initial state vector (1 x n)
+    discretization : dict
+        discretization of all variables (e.g.: crack depth and time) 
+    storage : str
+        transition matrix storage: "dense", "sparse" or "auto" (from its 
+        density)
+    cache_size : int
+        maximum number of beliefs kept by the BeliefCache
+    '''
+    
+    def __init__(self, T, s0, discretizations, storage='auto', cache_size=BELIEF_CACHE_SIZE):
+        self._global_init()
+        self.model = ZoneModel(T, s0, discretizations, storage, cache_size)
+        self.reset()
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        From model
+        ==========
+
+        Dynamic Bayesian network in the initial state of a (shared) zone model.
+
+        Parameters:
+        -----------
+        model : ZoneModel
+            zone model
+        """
+        dbn = cls.__new__(cls)
+        dbn._global_init()
+        dbn.model = model
+        dbn.reset()
+        return dbn
+
+    def __getattr__(self, name):
+        # immutable data is read from the shared zone model
+        if name == 'model':
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def reset(self):
+        """
+        Reset
+        =====
+
+        Back to the initial state (s0 at t = 0).
+        """
+        self.t, self.action, self.output = 0, None, None
+        self.s = self.model.s0
+        self.steps_from_s0 = 0
+        self.history = ()
+        self.pf = self.model.pf0
+
+        self._reset_results()
+
+    def spawn(self):
+        """
+        Spawn
+        =====
+
+        Independent copy of the current state, sharing the zone model.
+        """
+        dbn = self.__class__.__new__(self.__class__)
+        dbn.__dict__.update(self.__dict__)
         if self.store_results:
-            self.results = [[
-                self.t, 
-                self.pf,
-                self.action,
-                self.output]]
+            dbn.results = self.results.copy()
+        return dbn
+
+    def get_state(self):
+        """
+        Get state
+        =========
+
+        Mutable state of the network. Beliefs are never modified in place, 
+        so the state only holds references (copy-on-write).
+        """
+        return {key: value for key, value in self.__dict__.items() if key != 'results'}
+
+    def set_state(self, state):
+        """
+        Set state
+        =========
 
-    def predict(self):
+        Back to a state given by get_state (which can be set again).
+        """
+        self.__dict__.update(state)
+
+    def predict(self, steps=1):
         """
         Predict
         =======
         
-        Propagate one time step.
+        Propagate one or more time steps at once with the cached powers of 
+        the transition matrix (see TransitionPowers). Beliefs that are still 
+        s0*T^j (no observation since the initial state or the last repair) 
+        are read from the cache without any matmul, other ones from the 
+        BeliefCache when their history was already propagated.
+
+        The probability of failure of every step is stored in <steps_pf>.
+
+        Parameters:
+        -----------
+        steps : int
+            number of time steps
         """
-        
-        self.s = torch.matmul(self.s, self.T)
+        if self.history and self.history[-1][0] == 'predict':
+            history = self.history[:-1] + (('predict', self.history[-1][1] + steps),)
+        else:
+            history = self.history + (('predict', steps),)
+
+        if self.steps_from_s0 is not None:
+            self.steps_from_s0 += steps
+            s = self.powers.s0_beliefs(self.steps_from_s0)[-1].reshape(self.s.shape)
+            steps_pf = self.powers.projections(steps - 1)[1:].matmul(self.s.reshape(-1)) if steps > 1 else None
+        else:
+            cached = self.beliefs.get((self.history, steps))
+            if cached is None:
+                s = propagate(self.s, self.powers.power(steps))
+                steps_pf = self.powers.projections(steps - 1)[1:].matmul(self.s.reshape(-1)) if steps > 1 else None
+                self.beliefs.put((self.history, steps), (s, steps_pf))
+            else:
+                s, steps_pf = cached
+        self.s, self.history = s, history
+
+        self.action = None
+        self.output = None
+        self.steps_pf = list()
+        if steps > 1:
+            self.steps_pf = list(steps_pf)
+            if self.store_results: self.results.extend(np.arange(1, steps) + int(self.t), steps_pf)
+            self.t += steps - 1
         
         self.t += 1
         self.pf = self.get_prob_fail()
-        self.action = None
-        self.output = None
+        self.steps_pf.append(self.pf)
         
         if self.store_results: self._store_results()
     
-    def update(self, insp_quality):
+    def update(self, insp_quality, detection_draw=None):
         """
         Update
         ======
@@ -277,33 +1233,34 @@ class DynamicBayesianNetwork(_Base):
 
         Parameters:
         -----------
-        parameters : dict
-            inspection parameters. so far, with only "quality" key (good, normal and bad)
+        insp_quality : str
+            inspection quality (good, normal and bad)
+        detection_draw : float, optional
+            uniform draw in [0, 1) deciding the observation outcome. If None, 
+            the outcome is sampled from the global numpy random state.
         """
+        obs_state, not_obs_state = self.likelihoods[insp_quality]
+        p_detection = float((self.s*obs_state).sum())
 
-        parameters, function = PoD.get_settings(insp_quality)
-        obs_pmf = function(self.states_values, **parameters)
-
-        obs_state = np.tile(obs_pmf, int(self.total_nstates/len(obs_pmf)))
-        obs_state = torch.Tensor(obs_state)
-        detected_pmf = torch.mul(self.s, obs_state)
-
-        self.crack_detected = bool(np.random.binomial(1, detected_pmf.sum()))
+        if detection_draw is None:
+            self.crack_detected = bool(np.random.binomial(1, p_detection))
+        else:
+            self.crack_detected = bool(float(detection_draw) < p_detection)
         if any([self.force_detection, self.force_notdetection]):
-            if self.force_detection:
-                self.s = detected_pmf
-            if self.force_notdetection:
-                self.s = self.s*(1 - obs_state)
+            detected = self.force_detection
         else:
-            if self.crack_detected:
-                self.s = detected_pmf
-            else:
-                self.s = self.s*(1 - obs_state)
-
-        self.s /= self.s.sum()
+            detected = self.crack_detected
+
+        history = self.history + (('PoD', insp_quality, 'D' if detected else 'ND'),)
+        s = self.beliefs.get(history)
+        if s is None:
+            s = self.s*obs_state if detected else self.s*not_obs_state
+            s = s/s.sum()
+            self.beliefs.put(history, s)
+        self.s, self.history = s, history
+        self.steps_from_s0 = None
         self.pf = self.get_prob_fail()
 
-        self.t += 1e-6 # to enable Dataframe Concat
         self.pf = self.get_prob_fail()
         self.action = 'PoD'
         if self.crack_detected: self.output = 'D'
@@ -318,8 +1275,9 @@ class DynamicBayesianNetwork(_Base):
         Perform perfect repair output.
         """
         self.s = self.s0
+        self.steps_from_s0 = 0
+        self.history = ()
 
-        self.t += 1e-6 # to enable Dataframe Concat
         self.pf = self.get_prob_fail()
         self.action = 'PR'
         self.output = 's0'
@@ -338,8 +1296,7 @@ class DynamicBayesianNetwork(_Base):
         pf : float
             current probability of failure
         """
-        s = self._reorder()
-        return s.sum(axis=0)[-1]
+        return self.model.prob_fail(self.s)
 
     def _reorder(self):
         return self.s.reshape(list(self.n_states.values()))
@@ -348,6 +1305,183 @@ class DynamicBayesianNetwork(_Base):
         dist_params['a'] = discretization
         return np.diff(function(**dist_params))/np.diff(discretization)
 
+class BatchedDynamicBayesianNetwork:
+    """
+    Batched dynamic Bayesian network
+    ================================
+
+    Dynamic Bayesian networks of all components of a system advanced together 
+    for a batch of episodes. The belief is a (episodes x components x n) 
+    tensor, so prediction, update and perfect repair are single tensor 
+    operations instead of one call per component per episode.
+
+    Components with the same zone model share its transition matrix (and 
+    its cache of powers) and are propagated with one matmul.
+
+    Parameters:
+    -----------
+    models : list of DynamicBayesianNetwork
+        mounted inference model of each component
+    inspections : list of str
+        inspection quality of each component (None if it cannot be inspected)
+    batch_size : int
+        number of episodes
+    """
+    def __init__(self, models, inspections, batch_size):
+        if len({model.total_nstates for model in models}) != 1:
+            raise ValueError("All components must have the same number of states to be batched")
+
+        self.batch_size = batch_size
+        self.n_components = len(models)
+        self.n_states = dict(models[0].n_states)
+        self.t = 0
+
+        # components sharing the same model share the transition matrix
+        groups = dict()
+        for i, model in enumerate(models):
+            groups.setdefault(id(model.model), (model.powers, list()))[1].append(i)
+        self.groups = [(torch.tensor(idx), powers) for powers, idx in groups.values()]
+        steps_from_s0 = [-1 if model.steps_from_s0 is None else model.steps_from_s0 for model in models]
+        self.steps_from_s0 = torch.tensor(steps_from_s0).expand(batch_size, -1).clone()
+
+        self.s0 = torch.stack([model.s0.reshape(-1) for model in models])
+        s = torch.stack([model.s.reshape(-1) for model in models])
+        self.s = s.expand(batch_size, -1, -1).clone()
+
+        # components that cannot be inspected raise in update (as the 
+        # sequential update), their likelihoods are placeholders
+        self.inspectable = np.array([quality is not None for quality in inspections])
+        self.obs_state = torch.stack([
+            model.likelihoods[quality][0] if quality is not None else torch.zeros_like(model.s0.reshape(-1))
+            for model, quality in zip(models, inspections)])
+        self.not_obs_state = 1 - self.obs_state
+        self.force = torch.tensor([
+            1 if model.force_detection else -1 if model.force_notdetection else 0
+            for model in models])
+
+        self.pf = self.get_prob_fail()
+        self.pf0 = self._prob_fail(self.s0)
+
+    def predict(self, steps=1, episodes=None):
+        """
+        Predict
+        =======
+        
+        Propagate one or more time steps all components of all episodes 
+        (see DynamicBayesianNetwork.predict). The probability of failure of 
+        every step is stored in <steps_pf> (episodes x components x steps).
+
+        Parameters:
+        -----------
+        steps : int
+            number of time steps
+        episodes : array, optional
+            indices of the propagated episodes (all by default), e.g. when 
+            the episodes decide at different times
+        """
+        rows = slice(None) if episodes is None else torch.as_tensor(episodes)
+        # (rows x components of the group) indices
+        group_rows = rows if episodes is None else rows[:, None]
+        self.steps_pf = torch.empty(len(self.pf[rows]), self.n_components, steps)
+        for idx, powers in self.groups:
+            s, steps_from_s0 = self.s[group_rows, idx], self.steps_from_s0[group_rows, idx]
+            self.steps_pf[:, idx, :-1] = powers.predict(s, steps_from_s0, steps)
+            self.s[group_rows, idx], self.steps_from_s0[group_rows, idx] = s, steps_from_s0
+
+        if episodes is None:
+            self.t += steps
+        self._set_prob_fail(rows, slice(None), self.get_prob_fail(rows))
+        self.steps_pf[..., -1] = self.pf[rows]
+
+    def update(self, to_inspect, detection_draws):
+        """
+        Update
+        ======
+
+        Update the inspected components with the Probability of Detection 
+        inspection model. Every (episode, component) has its own detection 
+        draw.
+
+        Parameters:
+        -----------
+        to_inspect : array of bool
+            (episodes x components) mask of the inspected components
+        detection_draws : array
+            (episodes x components) uniform draws in [0, 1) deciding the 
+            observation outcomes
+
+        Returns:
+        --------
+        detected : array of bool
+            (episodes x components) mask of the detected cracks
+        """
+        # only the inspected (episode, component) beliefs
+        episodes, components = np.nonzero(to_inspect)
+        if not self.inspectable[components].all():
+            raise ValueError("Unknown inspection quality: None")
+        s = self.s[episodes, components]
+        detected_pmf = s*self.obs_state[components]
+        draws = torch.as_tensor(np.asarray(detection_draws)[episodes, components], dtype=torch.float64)
+        detected = draws < detected_pmf.sum(-1).double()
+        force = self.force[components]
+        detected = torch.where(force == 1, True, torch.where(force == -1, False, detected))
+
+        s = torch.where(detected[..., None], detected_pmf, s*self.not_obs_state[components])
+        s /= s.sum(-1, keepdim=True)
+        self.s[episodes, components] = s
+        self.steps_from_s0[episodes, components] = -1
+        self._set_prob_fail(episodes, components, self._prob_fail(s))
+
+        all_detected = np.zeros(self.pf.shape, dtype=bool)
+        all_detected[episodes, components] = detected.numpy()
+        return all_detected
+
+    def perform_action(self, to_repair):
+        """
+        Perform action
+        ==============
+
+        Perform perfect repair on the selected components.
+
+        Parameters:
+        -----------
+        to_repair : array of bool
+            (episodes x components) mask of the repaired components
+        """
+        episodes, components = np.nonzero(to_repair)
+        self.s[episodes, components] = self.s0[components]
+        self.steps_from_s0[episodes, components] = 0
+        self._set_prob_fail(episodes, components, self.pf0[components])
+
+    def _set_prob_fail(self, episodes, components, pf):
+        # new tensor, so that arrays of the previous pf are kept
+        self.pf = self.pf.clone()
+        self.pf[episodes, components] = pf
+
+    def _prob_fail(self, s):
+        # probability of failure of (..., n) beliefs
+        s = s.reshape(*s.shape[:-1], *self.n_states.values())
+        return s.sum(axis=s.dim() - len(self.n_states))[..., -1]
+
+    def get_prob_fail(self, episodes=slice(None)):
+        """
+        Get probability of failure
+        ==========================
+
+        Get the probability of failure for the current timestep
+
+        Parameters:
+        -----------
+        episodes : array, optional
+            indices of the episodes (all by default)
+
+        Returns
+        -------
+        pf : tensor
+            (episodes x components) current probability of failure
+        """
+        return self._prob_fail(self.s[episodes])
+
 class metrics:
     """
     Metrics
@@ -374,7 +1508,7 @@ class metrics:
         rmse : float
             Root mean square
         """
-        pf1 = model_1.get_pf()[1]
-        pf2 = model_2.get_pf()[1]
+        pf1 = np.array(model_1.get_pf()[1], dtype=float)
+        pf2 = np.array(model_2.get_pf()[1], dtype=float)
 
         return np.sqrt(((pf1 - pf2)**2.0).mean())
\ No newline at end of file
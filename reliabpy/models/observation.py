@@ -1,6 +1,13 @@
 import numpy as np
 
 class Probability_of_Detection:
+    # Source: DNVGL-RP-C210_RBI - Section 11
+    #         Table 11-1 PoD curves for EC, MPI, ACFM
+    settings = {
+        "good"   : {'X0':0.40, 'b':1.43},
+        "normal" : {'X0':0.45, 'b':0.90},
+        "bad"    : {'X0':1.16, 'b':0.90}}
+
     @staticmethod
     def get_settings(quality, inverse=False):
         '''
@@ -15,7 +22,8 @@ class Probability_of_Detection:
         Parameter:
         ----------
         quality : str
-            inspection paramters. It can be "good", "normal", or "bad".
+            inspection paramters. It can be "good", "normal", "bad" or any 
+            registered inspection technique.
 
         '''
 
@@ -24,15 +32,41 @@ class Probability_of_Detection:
         else:
             function = Probability_of_Detection.function
 
-        if quality == "good":
-            return {'X0':0.40, 'b':1.43}, function
-        elif quality == "normal":
-            return {'X0':0.45, 'b':0.90}, function
-        elif quality =="bad":
-            return {'X0':1.16, 'b':0.90}, function
+        if quality not in Probability_of_Detection.settings:
+            raise ValueError(f"Unknown inspection quality: {quality}")
+        return dict(Probability_of_Detection.settings[quality]), function
+
+    @staticmethod
+    def register(quality, X0, b):
+        '''
+        Register inspection technique
+        =============================
+
+        Add a new PoD curve. Inference models compute its likelihoods once, 
+        at the first inspection with it.
+
+        Parameter:
+        ----------
+        quality : str
+            name of the inspection technique
+        X0 : float
+            PoD curve parameter
+        b : float
+            PoD curve parameter
+        '''
+        if quality in Probability_of_Detection.settings:
+            raise ValueError(f"Inspection quality already registered: {quality}")
+        Probability_of_Detection.settings[quality] = {'X0':X0, 'b':b}
 
     def function(a, X0, b):
         return 1.0 - (1.0/(1.0 + (a/X0)**b))
 
-    def inv_function(P, X0, b):
-        return X0*(1.0/(1.0 - P) - 1.0)**(1.0/b)
\ No newline at end of file
+    def inv_function(P, X0, b, out=None):
+        if out is None:
+            return X0*(1.0/(1.0 - P) - 1.0)**(1.0/b)
+        # same operations, without temporaries
+        np.subtract(1.0, P, out=out)
+        np.divide(1.0, out, out=out)
+        out -= 1.0
+        out **= 1.0/b
+        return np.multiply(X0, out, out=out)
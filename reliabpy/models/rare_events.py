@@ -0,0 +1,298 @@
+"""
+RARE EVENTS
+===========
+
+Estimators of small probabilities of failure of the Paris-Erdogan
+deterioration model, given inspection outcomes: importance sampling and
+subset simulation. Both work in the standard normal space of the random
+inputs (see ParisErdoganInputs) and report the coefficient of variation of
+their estimates.
+"""
+import numpy as np
+from scipy.stats import norm
+from reliabpy.models.observation import Probability_of_Detection as PoD
+
+def _crack_growth(inputs, u, years):
+    # crack depths of standard normal samples u at the given years, jumping 
+    # in closed form between them; also returns the number of evaluations
+    model = inputs.model(inputs.from_standard_normal(u))
+    a, t = dict(), 0
+    for year in sorted(set(years)):
+        if year > t:
+            model.propagate(year - t)
+        a[year], t = model.a.copy(), year
+    return a, (len(a) - (0 in a))*len(u)
+
+def _likelihoods(a, observations):
+    # PoD likelihood weight of the inspection outcomes {year: (quality, detected)}
+    w = 1.0
+    for year, (quality, detected) in observations.items():
+        parameters, function = PoD.get_settings(quality)
+        p = function(a[year], **parameters)
+        w *= p if detected else 1.0 - p
+    return w
+
+class ImportanceSampling:
+    """
+    Importance Sampling
+    ===================
+
+    The inputs are sampled from a standard normal density shifted toward
+    failure, N(shift, I), and weighted by phi(u)/phi(u - shift) and by the
+    PoD likelihood of the inspection outcomes:
+
+        pf_t = E[w*1(a_t > a_crit)]/E[w]
+
+    (the denominator is 1 without observations). The shift is given or
+    fitted with the cross entropy method (see fit).
+
+    Parameters:
+    -----------
+    inputs : ParisErdoganInputs
+        random inputs of the deterioration model
+    a_crit : float
+        critical crack depth
+    n_samples : int
+        number of samples
+    shift : dict or array, optional
+        shift of each input in the standard normal space (e.g.: {'C': 2.0,
+        'a_0': 1.0}), zero by default
+    """
+    def __init__(self, inputs, a_crit, n_samples, shift=None):
+        self.inputs = inputs
+        self.a_crit = a_crit
+        self.n_samples = n_samples
+        if isinstance(shift, dict):
+            shift = [shift.get(name, 0.0) for name in inputs.names]
+        self.shift = np.zeros(inputs.dim) if shift is None else np.asarray(shift, dtype=float)
+        self.n_evaluations = 0
+
+    def fit(self, year, observations=None, n_samples=1000, rho=0.1, max_iter=20):
+        """
+        Fit
+        ===
+
+        Cross entropy method: the shift is moved to the weighted mean of the
+        <rho> fraction of samples with the largest crack depth at <year>,
+        until this fraction reaches the critical crack depth.
+
+        Parameters:
+        -----------
+        year : int
+            year of the probability of failure of interest
+        observations : dict, optional
+            {year: (quality, detected)} inspection outcomes
+        n_samples : int
+            number of samples per iteration
+        rho : float
+            fraction of elite samples
+        max_iter : int
+            maximum number of iterations
+
+        Returns:
+        --------
+        shift : array
+            fitted shift
+        """
+        observations = dict() if observations is None else observations
+        for _ in range(max_iter):
+            u = np.random.standard_normal((n_samples, self.inputs.dim)) + self.shift
+            a, n_evaluations = _crack_growth(self.inputs, u, [year, *observations])
+            self.n_evaluations += n_evaluations
+
+            level = min(np.sort(a[year])[int((1.0 - rho)*n_samples)], self.a_crit)
+            elite = a[year] >= level
+            w = self._weights(u)*_likelihoods(a, observations)
+            self.shift = (w[elite, None]*u[elite]).sum(axis=0)/w[elite].sum()
+            if level >= self.a_crit:
+                break
+        return self.shift
+
+    def run(self, lifetime, observations=None):
+        """
+        Run
+        ===
+
+        Probability of failure of every year and its coefficient of
+        variation.
+
+        Parameters:
+        -----------
+        lifetime : int
+            simulation horizon
+        observations : dict, optional
+            {year: (quality, detected)} inspection outcomes
+
+        Returns:
+        --------
+        pf : array
+            (lifetime+1) probability of failure
+        cov : array
+            (lifetime+1) coefficient of variation of pf
+        """
+        observations = dict() if observations is None else observations
+        u = np.random.standard_normal((self.n_samples, self.inputs.dim)) + self.shift
+        a, n_evaluations = _crack_growth(self.inputs, u, range(lifetime + 1))
+        self.n_evaluations += n_evaluations
+
+        w = self._weights(u)*_likelihoods(a, observations)
+        failed = np.stack(list(a.values())) > self.a_crit
+        x = w*failed
+        if observations:
+            # ratio estimator, delta method variance
+            pf = x.mean(axis=1)/w.mean()
+            var = (x - pf[:, None]*w).var(axis=1)/(self.n_samples*w.mean()**2)
+        else:
+            pf = x.mean(axis=1)
+            var = x.var(axis=1)/self.n_samples
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = np.sqrt(var)/pf
+        self.pf, self.cov = pf, cov
+        return pf, cov
+
+    def _weights(self, u):
+        # phi(u)/phi(u - shift)
+        return np.exp(-np.dot(u, self.shift) + 0.5*np.dot(self.shift, self.shift))
+
+class SubsetSimulation:
+    """
+    Subset Simulation
+    =================
+
+    Probability of failure at one year as a product of conditional
+    probabilities of nested events a_t > b_1 > ... > a_crit, each level
+    being sampled with the modified Metropolis algorithm from the <p0>
+    fraction of samples of the previous level (Au and Beck, 2001).
+
+    The inspection outcomes are included with one more standard normal
+    input per inspection: the outcome is detected if Phi(u) < PoD(a), so
+    that the likelihood weighting of the PoD becomes part of the event, and
+
+        pf = P(F and outcomes)/P(outcomes)
+
+    Parameters:
+    -----------
+    inputs : ParisErdoganInputs
+        random inputs of the deterioration model
+    a_crit : float
+        critical crack depth
+    n_samples : int
+        number of samples per level
+    p0 : float
+        conditional probability of the intermediate levels
+    spread : float
+        standard deviation of the Metropolis proposal
+    max_levels : int
+        maximum number of levels
+    """
+    def __init__(self, inputs, a_crit, n_samples=1000, p0=0.1, spread=1.0, max_levels=20):
+        self.inputs = inputs
+        self.a_crit = a_crit
+        self.n_samples = n_samples
+        self.p0 = p0
+        self.spread = spread
+        self.max_levels = max_levels
+        self.n_evaluations = 0
+
+    def run(self, year, observations=None):
+        """
+        Run
+        ===
+
+        Probability of failure at <year> and its coefficient of variation.
+
+        Parameters:
+        -----------
+        year : int
+            year of the probability of failure
+        observations : dict, optional
+            {year: (quality, detected)} inspection outcomes
+
+        Returns:
+        --------
+        pf : float
+            probability of failure
+        cov : float
+            coefficient of variation of pf
+        """
+        self.year = year
+        self.observations = dict() if observations is None else observations
+        n_seeds = int(self.p0*self.n_samples)
+        dim = self.inputs.dim + len(self.observations)
+
+        u = np.random.standard_normal((self.n_samples, dim))
+        g, observed = self._evaluate(u)
+        # the outcomes are rarely rare: crude Monte Carlo for P(outcomes)
+        p_observed = observed.mean()
+        cov2 = (1 - p_observed)/(p_observed*self.n_samples) if self.observations else 0.0
+        if not observed.any():
+            raise ValueError("No sample matches the inspection outcomes")
+        g = np.where(observed, g, -np.inf)
+
+        self.levels, p, chains = list(), p_observed, None
+        for _ in range(self.max_levels):
+            # seeds among the observed samples only (fewer when the 
+            # outcomes are jointly rare)
+            n_level_seeds = min(n_seeds, observed.sum())
+            level = min(np.sort(g[observed])[-n_level_seeds], self.a_crit)
+            self.levels.append(level)
+            above = g >= level
+            p_level = min(1.0, above.mean()/(observed.mean() if chains is None else 1.0))
+            p *= p_level
+            cov2 += (1 - p_level)/(p_level*len(g))*(1 + self._gamma(above, chains))
+            if level >= self.a_crit or not above.any():
+                break
+
+            # modified Metropolis chains from the samples above the level
+            seeds = np.argsort(g)[-n_level_seeds:]
+            chain_length = self.n_samples//n_level_seeds
+            u, g = self._chains(u[seeds], g[seeds], level, chain_length)
+            chains = (n_level_seeds, chain_length)
+            observed = np.ones(len(g), dtype=bool)
+
+        self.pf, self.cov = p/p_observed, np.sqrt(cov2)
+        return self.pf, self.cov
+
+    def _evaluate(self, u):
+        # limit state: crack depth at the year, and the match of the inspection outcomes
+        a, n_evaluations = _crack_growth(self.inputs, u[:, :self.inputs.dim], [self.year, *self.observations])
+        self.n_evaluations += n_evaluations
+
+        observed = np.ones(len(u), dtype=bool)
+        for i, (year, (quality, detected)) in enumerate(self.observations.items()):
+            parameters, function = PoD.get_settings(quality)
+            is_detected = norm.cdf(u[:, self.inputs.dim + i]) < function(a[year], **parameters)
+            observed &= is_detected == detected
+        return a[self.year], observed
+
+    def _chains(self, u, g, level, chain_length):
+        # (seeds x chain_length) samples conditional on g >= level, ordered by chain
+        samples, values = [u], [g]
+        for _ in range(chain_length - 1):
+            candidate = u + self.spread*np.random.standard_normal(u.shape)
+            accept = np.random.uniform(size=u.shape) < np.exp(-0.5*(candidate**2 - u**2))
+            candidate = np.where(accept, candidate, u)
+
+            g_candidate, observed = self._evaluate(candidate)
+            move = observed & (g_candidate >= level)
+            u = np.where(move[:, None], candidate, u)
+            g = np.where(move, g_candidate, g)
+            samples.append(u)
+            values.append(g)
+        return np.stack(samples, axis=1).reshape(-1, u.shape[1]), np.stack(values, axis=1).reshape(-1)
+
+    def _gamma(self, above, chains):
+        # correlation factor of the indicator along the Markov chains
+        if chains is None:
+            return 0.0
+        n_seeds, chain_length = chains
+        indicator = above.reshape(n_seeds, chain_length).astype(float)
+        p = indicator.mean()
+        r0 = p*(1 - p)
+        if r0 == 0:
+            return 0.0
+        gamma = 0.0
+        for k in range(1, chain_length):
+            r = (indicator[:, :-k]*indicator[:, k:]).mean() - p**2
+            gamma += 2*(1 - k/chain_length)*r/r0
+        return gamma
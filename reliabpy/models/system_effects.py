@@ -55,7 +55,104 @@ def comp_k_out_of_n(pf, k):
         for i in range(h, L-1, -1):
             A[i] = A[i] + (A[i-1]-A[i])*Rel
     PF_sys = 1-A[m]
-    return PF_sys   
+    return PF_sys
+
+def comp_k_out_of_n_batch(pf, k):
+    '''
+    COMPUTE PROBABILITY OF FAILURE OF A BATCH OF K-OUT-OF-N SYSTEMS
+    ===============================================================
+
+    Same recursion as comp_k_out_of_n (R.E. Barlow and K.D. Heidtmann), 
+    for every row of a (batch x n) array at once: the inner loop of the 
+    recursion reads the values of the previous component only, so it is a 
+    single slice operation.
+
+    Parameters
+    ----------
+    pf : array
+        (batch x n) probability of failure of each element
+    k : integer
+        the number of components necessary to make the system work
+
+    Retuns
+    ------
+    PF_sys : array
+        (batch) system probability of failure
+    '''
+    pf = np.asarray(pf, dtype=float)
+    batch_size, n = pf.shape
+    
+    # in case of no element
+    if n == 0:
+        return np.full(batch_size, np.nan)
+
+    nk = n-k
+    m = k+1
+    A = np.zeros((batch_size, m+1))
+    A[:, 1] = 1
+    L = 1
+    for j in range(1,n+1):
+        h = j + 1
+        Rel = 1-pf[:, j-1:j]
+        if nk < j:
+            L = h - nk
+        if k < j:
+            A[:, m] += A[:, k]*Rel[:, 0]
+            h = k
+        if h >= L:
+            A[:, L:h+1] += (A[:, L-1:h] - A[:, L:h+1])*Rel
+    return 1-A[:, m]
+
+def comp_k_out_of_n_importance(pf, k):
+    '''
+    COMPUTE BIRNBAUM IMPORTANCE IN A BATCH OF K-OUT-OF-N SYSTEMS
+    ============================================================
+
+    Birnbaum importance of each element: the change of the system 
+    probability of failure between the element failed and working,
+
+        I_i = PF_sys(pf_i = 1) - PF_sys(pf_i = 0),
+
+    that is, the probability that exactly k-1 of the other elements work. 
+    The distributions of the number of working elements before and after 
+    each element (capped at k) are computed with one forward and one 
+    backward pass, so the cost is O(n*k) instead of n system evaluations.
+
+    Parameters
+    ----------
+    pf : array
+        (batch x n) probability of failure of each element
+    k : integer
+        the number of components necessary to make the system work
+
+    Retuns
+    ------
+    PF_sys : array
+        (batch) system probability of failure
+    importance : array
+        (batch x n) Birnbaum importance of each element
+    '''
+    pf = np.asarray(pf, dtype=float)
+    batch_size, n = pf.shape
+    if n == 0:
+        return np.full(batch_size, np.nan), np.zeros((batch_size, 0))
+    Rel = 1-pf
+
+    def count_working(order):
+        # distributions of min(#working, k) among the elements before each one
+        counts = np.zeros((n+1, batch_size, k+1))
+        counts[0, :, 0] = 1
+        for j, i in enumerate(order):
+            counts[j+1] = counts[j]*pf[:, i:i+1]
+            counts[j+1, :, 1:] += counts[j, :, :-1]*Rel[:, i:i+1]
+            counts[j+1, :, k] += counts[j, :, k]*Rel[:, i]
+        return counts
+
+    forward = count_working(range(n))
+    backward = count_working(range(n-1, -1, -1))[::-1]
+    # exactly c working before element i and k-1-c after it
+    importance = np.einsum('ibc,ibc->bi', forward[:n, :, :k], backward[1:, :, k-1::-1])
+    return 1-forward[n, :, k], importance
 
 class System_of_Subsystems:
     """
@@ -75,27 +172,283 @@ class System_of_Subsystems:
     def __init__(self, assignments, k_dict):
         self.assignments = np.array(assignments)
         self.k_dict = k_dict
+        self.zone_masks = {zone: self.assignments == zone for zone in k_dict}
 
     def compute_system_pf(self, pf_list):
         """
         Compute system P_f
         ==================
 
-        Compute system probability of failure.
+        Compute system probability of failure, for one system or a batch of 
+        them (e.g.: episodes or timesteps).
 
         Parameters:
         -----------
         pf_list : array
-            list of probabilities of failure of each component.
+            probabilities of failure of each component (n), or (batch x n)
         
         Returns:
         --------
-        pf_sys : float
-            probability of failure of th eentire system
+        pf_sys : float or array
+            probability of failure of th eentire system (or of each row)
+        """
+        pf_list = np.array(pf_list, dtype=float)
+        if pf_list.ndim == 1:
+            subsystem_pfs = [comp_k_out_of_n(pf_list[self.zone_masks[zone]], k) for zone, k in self.k_dict.items()]
+            return comp_k_out_of_n(subsystem_pfs, len(subsystem_pfs))
+
+        pf = pf_list.reshape(-1, pf_list.shape[-1])
+        subsystem_pfs = np.stack([comp_k_out_of_n_batch(pf[:, self.zone_masks[zone]], k) 
+                                  for zone, k in self.k_dict.items()], axis=1)
+        pf_sys = comp_k_out_of_n_batch(subsystem_pfs, subsystem_pfs.shape[1])
+        return pf_sys.reshape(pf_list.shape[:-1])
+
+    def compute_importance(self, pf_list, measure='birnbaum'):
         """
-        pf_list = np.array(pf_list)
-        subsystem_pfs = []
+        Compute importance measures
+        ===========================
+
+        Compute system probability of failure and the importance of every 
+        component in one pass (see comp_k_out_of_n_importance). Subsystems 
+        are in series, so the importance of a component is its importance in 
+        its subsystem times the reliability of the other subsystems.
+
+        Parameters:
+        -----------
+        pf_list : array
+            probabilities of failure of each component (n), or (batch x n)
+        measure : str
+            "birnbaum": PF_sys(pf_i = 1) - PF_sys(pf_i = 0)
+            "raw": risk achievement worth, PF_sys(pf_i = 1)/PF_sys
+        
+        Returns:
+        --------
+        pf_sys : float or array
+            probability of failure of the entire system (or of each row)
+        importance : array
+            importance of each component (n), or (batch x n)
+        """
+        if measure not in ('birnbaum', 'raw'):
+            raise ValueError(f"Unknown importance measure: {measure}")
+        pf_list = np.array(pf_list, dtype=float)
+        pf = pf_list.reshape(-1, pf_list.shape[-1])
+
+        subsystem_pfs, importance = list(), np.zeros_like(pf)
         for zone, k in self.k_dict.items():
-            zone_pfs = pf_list[self.assignments == zone]
-            subsystem_pfs.append(comp_k_out_of_n(zone_pfs, k))
-        return comp_k_out_of_n(subsystem_pfs, len(subsystem_pfs))
+            zone_pf, importance[:, self.zone_masks[zone]] = comp_k_out_of_n_importance(pf[:, self.zone_masks[zone]], k)
+            subsystem_pfs.append(zone_pf)
+        for z, zone in enumerate(self.k_dict):
+            others = [1-x for y, x in enumerate(subsystem_pfs) if y != z]
+            importance[:, self.zone_masks[zone]] *= np.prod(others, axis=0)[:, None] if others else 1.0
+        pf_sys = 1-np.prod([1-x for x in subsystem_pfs], axis=0)
+
+        if measure == 'raw':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                importance = (pf_sys[:, None] + (1-pf)*importance)/pf_sys[:, None]
+        if pf_list.ndim == 1:
+            return pf_sys[0], importance[0]
+        return pf_sys.reshape(pf_list.shape[:-1]), importance.reshape(pf_list.shape)
+
+class Binary_Decision_Diagram:
+    """
+    Binary Decision Diagram
+    =======================
+
+    System structure compiled once into a reduced ordered binary decision 
+    diagram of the system failure, so that the system probability of failure 
+    is computed in a time linear in the size of the diagram, for any fault 
+    tree or reliability block diagram.
+
+    The structure is a nested tuple of gates, the leaves being component 
+    indices (e.g.: ("series", 0, ("parallel", 1, 2)) fails if the component 
+    0 fails or both components 1 and 2 fail):
+        ("series", *children) or ("or", *children): fails if one child fails
+        ("parallel", *children) or ("and", *children): fails if all children fail
+        ("k_out_of_n", k, *children): works if at least k children work
+
+    Components are ordered by first appearance in the structure.
+
+    Parameters:
+    -----------
+    structure : tuple or int
+        system structure
+    """
+    def __init__(self, structure):
+        # nodes 0 and 1 are the terminals (system works, system fails)
+        self.var, self.low, self.high = [-1, -1], [0, 1], [0, 1]
+        self._unique, self._ite_cache = dict(), dict()
+        self.order = list()
+        self._leaves(structure)
+        self.level = {component: level for level, component in enumerate(self.order)}
+        self.root = self._compile(structure)
+        del self._unique, self._ite_cache
+
+        self._prune()
+        # nodes of every level, the deepest level first
+        self.levels = [(component, np.nonzero(self.var == component)[0]) for component in self.order[::-1]]
+        self.levels = [(component, nodes) for component, nodes in self.levels if len(nodes)]
+
+    def __len__(self):
+        return len(self.var)
+
+    def _leaves(self, structure):
+        if isinstance(structure, (int, np.integer)):
+            if structure not in self.order:
+                self.order.append(int(structure))
+            return
+        gate, *children = structure
+        if gate == "k_out_of_n":
+            children = children[1:]
+        elif gate not in ("series", "or", "parallel", "and"):
+            raise ValueError(f"Unknown gate: {gate}")
+        for child in children:
+            self._leaves(child)
+
+    def _node(self, component, low, high):
+        if low == high:
+            return low
+        key = (component, low, high)
+        if key not in self._unique:
+            self._unique[key] = len(self.var)
+            self.var.append(component)
+            self.low.append(low)
+            self.high.append(high)
+        return self._unique[key]
+
+    def _ite(self, f, g, h):
+        # if f then g else h
+        if f == 1:
+            return g
+        if f == 0:
+            return h
+        if g == h:
+            return g
+        if g == 1 and h == 0:
+            return f
+        key = (f, g, h)
+        if key in self._ite_cache:
+            return self._ite_cache[key]
+        top = min((self.level[self.var[x]] for x in (f, g, h) if x > 1))
+        component = self.order[top]
+        cofactors = [(self.low[x], self.high[x]) if x > 1 and self.var[x] == component else (x, x) for x in (f, g, h)]
+        low = self._ite(*[x[0] for x in cofactors])
+        high = self._ite(*[x[1] for x in cofactors])
+        self._ite_cache[key] = result = self._node(component, low, high)
+        return result
+
+    def _compile(self, structure):
+        if isinstance(structure, (int, np.integer)):
+            return self._node(int(structure), 0, 1)
+        gate, *children = structure
+        if gate == "k_out_of_n":
+            k, children = children[0], [self._compile(child) for child in children[1:]]
+            return self._at_least(children, len(children) - k + 1)
+        children = [self._compile(child) for child in children]
+        if gate in ("series", "or"):
+            return self._at_least(children, 1)
+        return self._at_least(children, len(children))
+
+    def _at_least(self, children, n_failed):
+        # fails if at least <n_failed> children fail, from the last child backwards
+        failed = [1 if c <= 0 else 0 for c in range(max(n_failed, 0) + 1)]
+        for child in children[::-1]:
+            failed = [1] + [self._ite(child, failed[c-1], failed[c]) for c in range(1, len(failed))]
+        return failed[-1]
+
+    def _prune(self):
+        # drop the intermediate nodes of the compilation that the root does 
+        # not reach, and renumber the others (terminals first, same order)
+        reached, stack = {0, 1, self.root}, [self.root]
+        while stack:
+            x = stack.pop()
+            if x > 1:
+                for child in (self.low[x], self.high[x]):
+                    if child not in reached:
+                        reached.add(child)
+                        stack.append(child)
+        kept = np.array(sorted(reached))
+        index = np.zeros(len(self.var), dtype=int)
+        index[kept] = np.arange(len(kept))
+        self.var = np.array(self.var)[kept]
+        self.low, self.high = index[np.array(self.low)[kept]], index[np.array(self.high)[kept]]
+        self.root = int(index[self.root])
+
+    def _reach(self, pf):
+        # (batch x nodes) probability of failure below every node
+        P = np.zeros((len(pf), len(self)))
+        P[:, 1] = 1
+        for component, nodes in self.levels:
+            p = pf[:, component, None]
+            P[:, nodes] = p*P[:, self.high[nodes]] + (1-p)*P[:, self.low[nodes]]
+        return P
+
+    def compute_system_pf(self, pf_list):
+        """
+        Compute system P_f
+        ==================
+
+        Compute system probability of failure, for one system or a batch of 
+        them (e.g.: episodes or timesteps), with one bottom-up pass over the 
+        diagram.
+
+        Parameters:
+        -----------
+        pf_list : array
+            probabilities of failure of each component (n), or (batch x n)
+        
+        Returns:
+        --------
+        pf_sys : float or array
+            probability of failure of the entire system (or of each row)
+        """
+        pf_list = np.array(pf_list, dtype=float)
+        pf_sys = self._reach(pf_list.reshape(-1, pf_list.shape[-1]))[:, self.root]
+        return pf_sys[0] if pf_list.ndim == 1 else pf_sys.reshape(pf_list.shape[:-1])
+
+    def compute_importance(self, pf_list, measure='birnbaum'):
+        """
+        Compute importance measures
+        ===========================
+
+        Compute system probability of failure and the importance of every 
+        component, with one bottom-up and one top-down pass over the diagram 
+        (see System_of_Subsystems.compute_importance).
+
+        Parameters:
+        -----------
+        pf_list : array
+            probabilities of failure of each component (n), or (batch x n)
+        measure : str
+            "birnbaum": PF_sys(pf_i = 1) - PF_sys(pf_i = 0)
+            "raw": risk achievement worth, PF_sys(pf_i = 1)/PF_sys
+        
+        Returns:
+        --------
+        pf_sys : float or array
+            probability of failure of the entire system (or of each row)
+        importance : array
+            importance of each component (n), or (batch x n)
+        """
+        if measure not in ('birnbaum', 'raw'):
+            raise ValueError(f"Unknown importance measure: {measure}")
+        pf_list = np.array(pf_list, dtype=float)
+        pf = pf_list.reshape(-1, pf_list.shape[-1])
+        P = self._reach(pf)
+        pf_sys = P[:, self.root]
+
+        # probability of visiting every node, from the root down
+        visit = np.zeros_like(P)
+        visit[:, self.root] = 1
+        importance = np.zeros_like(pf)
+        for component, nodes in self.levels[::-1]:
+            p = pf[:, component, None]
+            np.add.at(visit.T, self.high[nodes], (p*visit[:, nodes]).T)
+            np.add.at(visit.T, self.low[nodes], ((1-p)*visit[:, nodes]).T)
+            importance[:, component] = (visit[:, nodes]*(P[:, self.high[nodes]] - P[:, self.low[nodes]])).sum(axis=1)
+
+        if measure == 'raw':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                importance = (pf_sys[:, None] + (1-pf)*importance)/pf_sys[:, None]
+        if pf_list.ndim == 1:
+            return pf_sys[0], importance[0]
+        return pf_sys.reshape(pf_list.shape[:-1]), importance.reshape(pf_list.shape)
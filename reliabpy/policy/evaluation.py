@@ -0,0 +1,267 @@
+import numpy as np
+import torch
+
+class _BeliefTable:
+    # distinct beliefs of the components with the same zone model and inspection
+    def __init__(self, inference_model, quality):
+        self.model = inference_model.model
+        self.quality = quality
+        self.force = 1 if inference_model.force_detection else -1 if inference_model.force_notdetection else 0
+        steps_from_s0 = -1 if inference_model.steps_from_s0 is None else inference_model.steps_from_s0
+        self.s = inference_model.s.reshape(1, -1)
+        self.steps_from_s0 = torch.tensor([steps_from_s0])
+        self.pf = self.prob_fail(self.s)
+
+    def prob_fail(self, s):
+        return s.reshape(len(s), *self.model.n_states.values()).sum(axis=1)[..., -1]
+
+    def predict(self, steps):
+        # see BatchedDynamicBayesianNetwork.predict
+        steps_pf = torch.empty(len(self.s), steps)
+        self.s = self.s.clone()
+        steps_pf[:, :-1] = self.model.powers.predict(self.s, self.steps_from_s0, steps)
+        self.pf = self.prob_fail(self.s)
+        steps_pf[:, -1] = self.pf
+        return steps_pf
+
+    def append(self, s, steps_from_s0):
+        first = len(self.s)
+        self.s = torch.cat([self.s, s])
+        self.steps_from_s0 = torch.cat([self.steps_from_s0, steps_from_s0])
+        self.pf = self.prob_fail(self.s)
+        return torch.arange(first, len(self.s)).numpy()
+
+    def observe(self):
+        # probability of detection and ids of the posterior beliefs of every entry
+        if self.quality is None:
+            entries = np.arange(len(self.s))
+            return np.zeros(len(self.s)), entries, entries
+        detected, not_detected = self.model.likelihoods[self.quality]
+        detected_pmf, not_detected_pmf = self.s*detected, self.s*not_detected
+        p_detection = detected_pmf.sum(axis=1).double()
+        if self.force != 0:
+            p_detection[:] = 1.0 if self.force == 1 else 0.0
+        unknown = torch.full((len(self.s),), -1)
+        detected_ids = self.append(detected_pmf/detected_pmf.sum(axis=1, keepdim=True), unknown)
+        not_detected_ids = self.append(not_detected_pmf/not_detected_pmf.sum(axis=1, keepdim=True), unknown)
+        return p_detection.numpy(), detected_ids, not_detected_ids
+
+    def s0_id(self):
+        return self.append(self.model.s0.reshape(1, -1), torch.tensor([0]))[0]
+
+    def compact(self, used):
+        # keep the used entries only, merging identical beliefs
+        used = np.unique(used)
+        s = self.s[used]
+        _, first, inverse = _unique_rows(s)
+        new_ids = np.full(len(self.s), -1)
+        new_ids[used] = inverse
+        self.s, self.steps_from_s0 = s[first], self.steps_from_s0[used][first]
+        self.pf = self.prob_fail(self.s)
+        return new_ids
+
+def _unique_rows(s):
+    # unique rows of a tensor: identical rows share a fingerprint, equality is then checked
+    weights = torch.rand(s.shape[1], dtype=torch.float64, generator=torch.Generator().manual_seed(0))
+    fingerprint = torch.matmul(s.double(), weights).numpy()
+    _, first, inverse = np.unique(fingerprint, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    equal = (s == s[first[inverse]]).all(axis=1).numpy()
+    if not equal.all():
+        # fingerprint collisions are kept apart
+        first = np.concatenate([first, np.nonzero(~equal)[0]])
+        inverse[~equal] = np.arange(len(first) - (~equal).sum(), len(first))
+    return s, first, inverse
+
+class BeliefTreeEvaluator:
+    """
+    Belief tree evaluator
+    =====================
+
+    Exact expected lifecycle costs of a policy (e.g.: HeuristicRules) for a
+    system of dynamic Bayesian networks, without sampling.
+
+    The only randomness of an episode is the outcome of the inspections, so
+    all episodes form a finite tree of observation outcomes. The tree is
+    walked forward in time, one node per distinct system belief weighted by
+    its probability: branches reaching the same system belief are merged,
+    and branches below <min_probability> are pruned. The costs are the ones
+    of InspectionMaintenance.compute_cost_breakdown.
+
+    A system belief is stored as the ids of its component beliefs in tables
+    of distinct beliefs (one per zone model and inspection quality), so each
+    distinct component belief is propagated and updated only once.
+
+    Parameters:
+    -----------
+    system_model : SystemLevel
+        mounted system model (inference, policy, system dependancies and cost)
+    min_probability : float
+        probability below which a branch is pruned
+    exchangeable : list of lists of int, optional
+        groups of components that the policy treats symmetrically (same
+        model, inspection and rules, e.g. [[0,1,2,3], [4,5,6,7], [8,9,10,11]]
+        for the Simple model with HeuristicRules). System beliefs that only
+        differ by a permutation inside a group are merged.
+    """
+    def __init__(self, system_model, min_probability=1e-9, exchangeable=None):
+        self.system_model = system_model
+        self.min_probability = min_probability
+        self.exchangeable = exchangeable if exchangeable is not None else list()
+
+    def evaluate(self, lifetime):
+        """
+        Evaluate
+        ========
+
+        Walk the tree of observation outcomes over the lifetime.
+
+        Parameters:
+        -----------
+        lifetime : int
+            Simulation horizon of the structural system.
+
+        Returns:
+        --------
+        cost_breakdown : dict
+            expected costs C_C, C_I, C_R, R_F and C_T
+        error_bound : float
+            bound of the expected cost of the pruned branches after pruning:
+            the exact C_T lies in [C_T - error_bound, C_T + error_bound].
+        """
+        # the walk moves the system time, the system is left as it was
+        system = self.system_model
+        saved = system.t, getattr(system, 'lifetime', None)
+        try:
+            return self._walk(lifetime)
+        finally:
+            system.t, system.lifetime = saved
+
+    def _walk(self, lifetime):
+        system = self.system_model
+        cost = system.cost_model
+        mounted = list(system.components_reliability_models_list.values())
+        n = len(mounted)
+
+        # components with the same model and inspection share a belief table
+        tables, self.component_table = dict(), list()
+        for component in mounted:
+            key = (id(component['inference'].model), component['inspection'])
+            if key not in tables:
+                tables[key] = _BeliefTable(component['inference'], component['inspection'])
+            self.component_table.append(list(tables).index(key))
+        self.tables = list(tables.values())
+
+        system.lifetime = lifetime
+        discount = cost.discount(lifetime)
+        self._cost_bounds(lifetime, n, discount)
+
+        system.t = 0
+        self.costs = dict.fromkeys(['C_C', 'C_I', 'C_R', 'R_F'], 0.0)
+        self.error_bound, self.pruned_probability = 0.0, 0.0
+        self.n_nodes = [1]
+
+        prob, ids = np.ones(1), np.zeros((1, n), dtype=int)
+        last_pf = self._system_pf(self._pf(ids))
+        while system.t < lifetime:
+            # prediction
+            steps = system._steps_to_next_decision()
+            steps_pf = [table.predict(steps).numpy() for table in self.tables]
+            for step in range(steps):
+                system.t += 1
+                pf = self._system_pf(self._pf(ids, [x[:, step] for x in steps_pf]))
+                self.costs['R_F'] += cost.c_f*discount[system.t]*np.dot(prob, pf - last_pf)
+                last_pf = pf
+
+            if system.policy_rules is None:
+                continue
+            t = system.t
+
+            # update: one branch per observation outcome
+            to_inspect = system.policy_rules.to_observe_batch(self._pf(ids))
+            n_inspected = to_inspect.sum(axis=1)
+            self.costs['C_C'] += cost.c_c*discount[t]*prob[n_inspected > 0].sum()
+            self.costs['C_I'] += cost.c_i*discount[t]*np.dot(prob, n_inspected)
+
+            detected = np.zeros_like(to_inspect)
+            if not to_inspect.any():
+                self.n_nodes.append(len(prob))
+                continue
+            outcomes = [table.observe() for table in self.tables]
+            for i in np.nonzero(to_inspect.any(axis=0))[0]:
+                split = np.nonzero(to_inspect[:, i])[0]
+                if len(split) == 0:
+                    continue
+                if self.tables[self.component_table[i]].quality is None:
+                    raise ValueError("Unknown inspection quality: None")
+                p_detection, detected_ids, not_detected_ids = outcomes[self.component_table[i]]
+                prior, p = ids[split, i], p_detection[ids[split, i]]
+                index = np.concatenate([np.arange(len(prob)), split])
+                prob = np.concatenate([prob, prob[split]*p])
+                prob[split] *= 1 - p
+                ids, to_inspect, detected = ids[index], to_inspect[index], detected[index]
+                ids[split, i] = not_detected_ids[prior]
+                ids[-len(split):, i] = detected_ids[prior]
+                detected[-len(split):, i] = True
+
+                # repairs at t not charged yet
+                keep = self._prune(prob, n*cost.c_r*discount[t] + self._cost_bound[t])
+                prob, ids, to_inspect, detected = prob[keep], ids[keep], to_inspect[keep], detected[keep]
+
+            # action
+            to_repair = system.policy_rules.to_repair_batch(detected)
+            self.costs['C_R'] += cost.c_r*discount[t]*np.dot(prob, to_repair.sum(axis=1))
+            for i in np.nonzero(to_repair.any(axis=0))[0]:
+                ids[to_repair[:, i], i] = self.tables[self.component_table[i]].s0_id()
+
+            prob, ids = self._merge(prob, ids)
+            keep = self._prune(prob, self._cost_bound[t])
+            prob, ids = prob[keep], ids[keep]
+            last_pf = self._system_pf(self._pf(ids))
+            self.n_nodes.append(len(prob))
+
+        self.costs['C_T'] = sum(self.costs.values())
+        return dict(self.costs), self.error_bound
+
+    def _cost_bounds(self, lifetime, n, discount):
+        # bound of the costs after every year: campaigns, inspections and 
+        # repairs at the decision times only, and a failure risk increment of
+        # at most c_f per year in absolute value (pf stays in [0, 1])
+        system, cost = self.system_model, self.system_model.cost_model
+        decisions, system.t = list(), 0
+        while system.t < lifetime:
+            system.t += system._steps_to_next_decision()
+            decisions.append(system.t)
+        decisions = np.array(decisions)
+        action_bound = np.array([((cost.c_c + n*cost.c_i + n*cost.c_r)*discount[decisions[decisions > t]]).sum() for t in range(lifetime + 1)])
+        risk_bound = cost.c_f*(discount.sum() - np.cumsum(discount))
+        self._cost_bound = action_bound + risk_bound
+
+    def _pf(self, ids, tables_pf=None):
+        # (nodes x components) pf of the components
+        if tables_pf is None:
+            tables_pf = [table.pf.numpy() for table in self.tables]
+        return np.stack([tables_pf[self.component_table[i]][ids[:, i]] for i in range(ids.shape[1])], axis=1)
+
+    def _system_pf(self, pf):
+        return self.system_model.system_dependancies.compute_system_pf(pf)
+
+    def _prune(self, prob, cost_bound):
+        # cost_bound: bound of the future costs of a branch
+        keep = prob >= self.min_probability
+        self.pruned_probability += prob[~keep].sum()
+        self.error_bound += cost_bound*prob[~keep].sum()
+        return keep
+
+    def _merge(self, prob, ids):
+        # compact the belief tables and merge the identical system beliefs
+        for k, table in enumerate(self.tables):
+            columns = [i for i in range(ids.shape[1]) if self.component_table[i] == k]
+            new_ids = table.compact(ids[:, columns].reshape(-1))
+            ids[:, columns] = new_ids[ids[:, columns]]
+        for group in self.exchangeable:
+            ids[:, group] = np.sort(ids[:, group], axis=1)
+
+        ids, inverse = np.unique(ids, axis=0, return_inverse=True)
+        return np.bincount(inverse.reshape(-1), weights=prob, minlength=len(ids)), ids
@@ -7,7 +7,8 @@ from glob import glob
 from tabulate import tabulate
 import pandas as pd
 
-from reliabpy.policy.policy import HeuristicRules
+from reliabpy.policy.policy import HeuristicRules, HeuristicRulesGrid
+from reliabpy.models.cost import EventLog
 
 class HeuristicBased:
     def __init__(self, model, save_folder):
@@ -22,7 +23,23 @@ class HeuristicBased:
 
         self.policies.append((10000, 1)) # no I&M policy
         
-    def run_samples(self):
+    def run_samples(self, batch_size=None, policy_batch=False):
+        """
+        Run samples
+        ===========
+
+        Simulate <n_samples> episodes of every policy and save their costs 
+        and event logs in <save_folder>.
+
+        Parameters:
+        -----------
+        batch_size : int, optional
+            number of episodes simulated at once (of every policy with 
+            <policy_batch>)
+        policy_batch : bool
+            simulate all the policies at once, the policy being a batch 
+            dimension (see HeuristicRulesGrid)
+        """
         self.start_time = datetime.now()
         os.mkdir(self.save_folder)
 
@@ -31,27 +48,73 @@ class HeuristicBased:
             input_reg.write(input_txt)
 
         print(f"=== start of simulation : {self.start_time} ===")
+        if policy_batch:
+            self._run_policy_batch(batch_size)
+        else:
+            self._run_policies(batch_size)
+
+        self.end_time = datetime.now()
+        print(f"=== end of simulation : {self.end_time} ===")
+        print(f"Elsapsed time : {self.end_time - self.start_time}")
+
+    def _run_policies(self, batch_size=None):
         for delta_t, nI in self.policies:
             start = datetime.now()
             policy = HeuristicRules(delta_t, nI, self.to_avoid)
             policy.import_model(self.model.monopile)
             self.model.monopile.policy_rules = policy
 
-            with open(os.path.join(self.save_folder, datetime.now().strftime("d%Y%m%dt%H%M%S") + f"__s_{self.n_samples}__deltat_{delta_t}__nI_{nI}.npy"), 'wb') as outfile:
-                for samples in range(self.n_samples):
-                    sample_results = self.model.run_one_episode()
-                    pickle.dump(sample_results, outfile)
-                    self.model.monopile._reset()
+            logs = list()
+            output_path = self._output_path(delta_t, nI)
+            with open(output_path + ".npy", 'wb') as outfile:
+                if batch_size is None:
+                    initial = self.model.monopile.snapshot()
+                    for samples in range(self.n_samples):
+                        sample_results = self.model.run_one_episode(cost_only=True)
+                        pickle.dump(sample_results, outfile)
+                        logs.append(self.model.monopile.event_log)
+                        self.model.monopile.restore(initial, rng=False)
+                else:
+                    for first in range(0, self.n_samples, batch_size):
+                        for sample_results in self.model.run_one_episode(batch_size=min(batch_size, self.n_samples - first), cost_only=True):
+                            pickle.dump(sample_results, outfile)
+                        logs.append(self.model.monopile.event_log)
+            # events of the samples, to price them again (see reprice)
+            EventLog.concatenate(logs).save(output_path + ".npz")
 
             end = datetime.now()
             self.left_samples -= self.n_samples
             episode_time = (end - start)/self.n_samples
             print(f'- Mean episode time: {episode_time} | Remaining time: {episode_time*self.left_samples}')
             print('\t Expect to finish at:', datetime.now() + episode_time*self.left_samples)
-                
-        self.end_time = datetime.now()
-        print(f"=== end of simulation : {self.end_time} ===")
-        print(f"Elsapsed time : {self.end_time - self.start_time}")
+
+    def _run_policy_batch(self, batch_size=None):
+        delta_t, nI = np.array(self.policies).T
+        batch_size = self.n_samples if batch_size is None else batch_size
+        results, logs = [list() for _ in self.policies], [list() for _ in self.policies]
+        for first in range(0, self.n_samples, batch_size):
+            n_samples = min(batch_size, self.n_samples - first)
+            policy = HeuristicRulesGrid(delta_t, nI, self.to_avoid, n_samples)
+            policy.import_model(self.model.monopile)
+            self.model.monopile.policy_rules = policy
+
+            costs = self.model.run_one_episode(batch_size=policy.batch_size, cost_only=True)
+            for p in range(len(self.policies)):
+                rows = slice(p*n_samples, (p + 1)*n_samples)
+                results[p] += costs[rows]
+                logs[p].append(self.model.monopile.event_log[rows])
+            self.left_samples -= n_samples*len(self.policies)
+            print(f'- {first + n_samples} samples of every policy | Elapsed time: {datetime.now() - self.start_time}')
+
+        for (delta_t, nI), samples, policy_logs in zip(self.policies, results, logs):
+            output_path = self._output_path(delta_t, nI)
+            with open(output_path + ".npy", 'wb') as outfile:
+                for sample_results in samples:
+                    pickle.dump(sample_results, outfile)
+            EventLog.concatenate(policy_logs).save(output_path + ".npz")
+
+    def _output_path(self, delta_t, nI):
+        return os.path.join(self.save_folder, datetime.now().strftime("d%Y%m%dt%H%M%S") + f"__s_{self.n_samples}__deltat_{delta_t}__nI_{nI}")
 
     def process_data(self, load_folder=None):
         expected_costs = list()
@@ -90,6 +153,52 @@ class HeuristicBased:
         df_general.to_excel(writer, sheet_name="overview")
         writer.save()
 
+    def reprice(self, cost_grid, load_folder=None):
+        """
+        Reprice
+        =======
+
+        Expected costs of every searched policy for a grid of cost 
+        parameters, from the event logs saved by run_samples (without 
+        simulating again).
+
+        Parameters:
+        -----------
+        cost_grid : dict
+            values of the cost parameters (c_c, c_i, c_r, c_f, r) to 
+            combine, e.g.: {'c_f': [1000, 10000], 'r': [0.0, 0.02]}; the 
+            others take the values of the model cost model
+        load_folder : path, optional
+            folder of the event logs (save_folder by default)
+
+        Returns:
+        --------
+        df : DataFrame
+            delta_t, nI, cost parameters and expected costs (C_C, C_I, 
+            C_R, R_F, C_T) of every policy and point of the grid
+        """
+        cost_model = self.model.monopile.cost_model
+        names = ['c_c', 'c_i', 'c_r', 'c_f', 'r']
+        values = [cost_grid.get(name, [getattr(cost_model, name)]) for name in names]
+        grid = dict(zip(names, np.array(list(product(*values)), dtype=float).T))
+
+        results = list()
+        for log_path in glob(os.path.join(self.save_folder if load_folder is None else load_folder, '*.npz')):
+            policy_dict = dict()
+            for temp in os.path.basename(os.path.splitext(log_path)[0]).split('__')[1:]:
+                variable, value = temp.split('_')
+                policy_dict[variable] = float(value)
+
+            df_temp = pd.DataFrame(grid)
+            df_temp["delta_t"], df_temp["nI"] = int(policy_dict['deltat']), int(policy_dict['nI'])
+            for cost, expected in EventLog.load(log_path).expected_costs(**grid).items():
+                df_temp[cost] = expected
+            results.append(df_temp)
+
+        df_general = pd.concat(results, ignore_index=True)
+        df_general.sort_values(names + ['C_T'], inplace=True)
+        return df_general
+
 if __name__ == '__main__':
     from reliabpy.examples.offshore_wind_turbine import Simple 
 
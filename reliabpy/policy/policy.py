@@ -22,10 +22,20 @@ class UserDefined:
         return to_inspect
     
     def to_repair(self):
-        output = self.system_model.get_step_results('output', dtype='list')
-        detected = np.array(output) == 'D'
-        ids = [i for i, x in enumerate(detected) if x]
-        return ids
+        return np.nonzero(self.system_model.state.detected())[0]
+
+    def to_observe_batch(self, pf_array):
+        t = self.system_model.t
+        to_inspect = np.zeros_like(pf_array, dtype=bool)
+        if t > 20:
+            return to_inspect
+        components_to_insp = self.inspection_map.loc[t].dropna().index
+        for component in components_to_insp:
+            to_inspect[:, self.inspection_map.columns.get_loc(component)] = True
+        return to_inspect
+
+    def to_repair_batch(self, detected):
+        return detected.copy()
 
 class DoNothing:
     def __init__(self, system_model):
@@ -38,29 +48,148 @@ class DoNothing:
         pass
 
 class HeuristicRules:
-    def __init__(self, delta_t, nI, to_avoid=None, last_year_action=False):
+    """
+    Heuristic rules
+    ===============
+
+    Inspect the <nI> components with the highest rank every <delta_t> years 
+    and repair the detected ones.
+
+    Parameters:
+    -----------
+    delta_t : int
+        inspection interval
+    nI : int
+        number of components inspected
+    to_avoid : list, optional
+        components never inspected
+    last_year_action : bool
+        inspect at the end of the lifetime
+    importance : str, optional
+        rank by system importance measure ("birnbaum" or "raw", see 
+        System_of_Subsystems.compute_importance) instead of component pf
+    """
+    def __init__(self, delta_t, nI, to_avoid=None, last_year_action=False, importance=None):
         self.delta_t, self.nI = delta_t, nI
         self.to_avoid = to_avoid
         self.last_year_action = last_year_action
+        self.importance = importance
 
     def import_model(self, system_model):
         self.system_model = system_model
 
+    def next_decision(self, t):
+        return (t//self.delta_t + 1)*self.delta_t
+
+    def _rank(self, pf_array):
+        if self.importance is None:
+            return np.array(pf_array, dtype=float)
+        _, importance = self.system_model.system_dependancies.compute_importance(pf_array, self.importance)
+        return importance
+
     def to_observe(self):
         to_inspect = []
-        pf_list = np.array([x['pf'] for x in self.system_model.step_results.values()])
+        pf_list = self._rank(self.system_model.state.pf)
         t = int(self.system_model.components_list[0].last_results['t'])
         if self.to_avoid is not None:
             pf_list[self.to_avoid] = -1
         if t % self.delta_t == 0:
             to_inspect = np.argpartition(pf_list, -int(self.nI))[-int(self.nI):]
-        if ~self.last_year_action and self.system_model.t == self.system_model.lifetime:
+        if not self.last_year_action and self.system_model.t == self.system_model.lifetime:
             to_inspect = []
             
         return to_inspect
     
     def to_repair(self):
-        output = self.system_model.get_step_results('output', dtype='list')
-        detected = np.array(output) == 'D'
-        ids = [i for i, x in enumerate(detected) if x]
-        return ids
+        return np.nonzero(self.system_model.state.detected())[0]
+
+    def to_observe_batch(self, pf_array):
+        to_inspect = np.zeros_like(pf_array, dtype=bool)
+        pf_array = self._rank(pf_array)
+        t = self.system_model.t
+        if self.to_avoid is not None:
+            pf_array[:, self.to_avoid] = -1
+        if t % self.delta_t == 0:
+            idx = np.argpartition(pf_array, -int(self.nI), axis=1)[:, -int(self.nI):]
+            np.put_along_axis(to_inspect, idx, True, axis=1)
+        if not self.last_year_action and self.system_model.t == self.system_model.lifetime:
+            to_inspect[:] = False
+
+        return to_inspect
+
+    def to_repair_batch(self, detected):
+        return detected.copy()
+
+class HeuristicRulesGrid(HeuristicRules):
+    """
+    Heuristic rules grid
+    ====================
+
+    Several heuristic rules (see HeuristicRules) evaluated at once in a 
+    batched run: the policy is a batch dimension. The rows of the batch are 
+    the <n_samples> episodes of the first policy, then of the second, etc. 
+    and each row inspects with its own <delta_t>, <nI> and <to_avoid>. 
+    Only for batched runs (SystemLevel.run with <batch_size>).
+
+    Parameters:
+    -----------
+    delta_t : array
+        inspection interval of every policy
+    nI : array
+        number of components inspected of every policy
+    to_avoid : list, optional
+        components never inspected, by all policies or one list per policy
+    n_samples : int
+        number of episodes (rows) of every policy
+    last_year_action : bool
+        inspect at the end of the lifetime
+    importance : str, optional
+        rank by system importance measure (see HeuristicRules)
+    """
+    def __init__(self, delta_t, nI, to_avoid=None, n_samples=1, last_year_action=False, importance=None):
+        super().__init__(np.asarray(delta_t, dtype=int), np.asarray(nI, dtype=int), to_avoid, last_year_action, importance)
+        self.n_samples = n_samples
+        self.row_delta_t = np.repeat(self.delta_t, n_samples)
+        self.row_nI = np.repeat(self.nI, n_samples)
+
+    @property
+    def batch_size(self):
+        return len(self.row_delta_t)
+
+    def next_decision(self, t):
+        # next decision of any policy
+        return ((t//self.delta_t + 1)*self.delta_t).min()
+
+    def _avoid(self, n_components):
+        # (rows x components) components never inspected
+        avoid = np.zeros((len(self.delta_t), n_components), dtype=bool)
+        if self.to_avoid is not None and len(self.to_avoid) != 0:
+            if np.ndim(self.to_avoid[0]) == 0:
+                avoid[:, self.to_avoid] = True
+            else:
+                for policy, components in enumerate(self.to_avoid):
+                    avoid[policy, components] = True
+        return np.repeat(avoid, self.n_samples, axis=0)
+
+    def to_observe(self):
+        raise TypeError("HeuristicRulesGrid only selects components in batched runs (to_observe_batch)")
+
+    def due_batch(self, t):
+        # episodes (rows) deciding at t, the others are not predicted
+        return t % self.row_delta_t == 0
+
+    def to_observe_batch(self, pf_array):
+        to_inspect = np.zeros_like(pf_array, dtype=bool)
+        pf_array = self._rank(pf_array)
+        t = self.system_model.t
+        pf_array[self._avoid(pf_array.shape[1])] = -1
+        due = self.due_batch(t)
+        # one partition per number of inspected components (as HeuristicRules)
+        for nI in np.unique(self.row_nI[due]):
+            rows = np.nonzero(due & (self.row_nI == nI))[0]
+            idx = np.argpartition(pf_array[rows], -nI, axis=1)[:, -nI:]
+            to_inspect[rows[:, None], idx] = True
+        if not self.last_year_action and self.system_model.t == self.system_model.lifetime:
+            to_inspect[:] = False
+
+        return to_inspect
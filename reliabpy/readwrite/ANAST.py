@@ -1,8 +1,10 @@
 import numpy as np
 from scipy.io import loadmat
+from scipy import sparse
 import os
-from scipy.special import gamma
-from reliabpy.models.deterioration import GeometricFactor, Paris_Erdogan
+from scipy.stats import expon, lognorm, norm
+from reliabpy.models.deterioration import GeometricFactor, ParisErdoganInputs
+from reliabpy.commons.sampling import UniformSampler
 
 """
 ANAST import functions
@@ -13,7 +15,7 @@ these function are to rapidly import MatLab ANAST results.
 possible TODO: transform the rest of Matlab code into python
 """
 
-def import_DBN_input_data(path):
+def import_DBN_input_data(path, dense=False):
     '''
     Import DBN input data
     =====================
@@ -26,11 +28,13 @@ def import_DBN_input_data(path):
     ---------
     path : file path
         file path of dr_out.mat
+    dense : bool
+        if True, the transition matrix is converted to a dense array.
     
     Return:
     -------
     T : matrix 
-        transtiion matrix (n, n)
+        transtiion matrix (n, n), scipy.sparse unless <dense>
     b0 : array 
         initial belief state (n)
     discretizations : dict
@@ -39,7 +43,8 @@ def import_DBN_input_data(path):
     MatLab_file = loadmat(path)['dr_env'][0]
     
     aint = MatLab_file['aint'][0]
-    T = MatLab_file['T0'][0].toarray()
+    T = MatLab_file['T0'][0]
+    T = T.toarray() if dense else sparse.csc_matrix(T)
     b0 = MatLab_file['b0'][0]
     
     discretizations = {'t': np.linspace(0,21,22), 'a':aint[0]}
@@ -92,11 +97,11 @@ def import_component_inputs(path):
     description, h, \
     sn_params, m, \
     q_cov, n_samples, n_cycles =  \
-    float(M['FDF']), int(M['T']), float(M['a0_mean']), float(M['acrit']), \
-    M['description'][0], float(M['h']), \
-    { your_key: float(M[your_key]) for your_key in ['la1', 'la2', 'm1', 'm2'] },\
-    float(M['m']), \
-    float(M['q_cov']), int(M['samp']), int(M['v'])
+    float(M['FDF'].item()), int(M['T'].item()), float(M['a0_mean'].item()), float(M['acrit'].item()), \
+    M['description'][0], float(M['h'].item()), \
+    { your_key: float(M[your_key].item()) for your_key in ['la1', 'la2', 'm1', 'm2'] },\
+    float(M['m'].item()), \
+    float(M['q_cov'].item()), int(M['samp'].item()), int(M['v'].item())
 
     return DFF, lifetime, a0_mean, a_crit, description, h, sn_params, m, q_cov, n_samples, n_cycles
 
@@ -152,23 +157,99 @@ def import_weilbull_mean(path):
 
     return q
 
-def get_deterioration_model(folder_path):
+def get_deterioration_sampler(folder_path, design="random", seed=None):
+    '''
+    Deterioration sampler
+    =====================
+
+    Sampler of the Paris-Erdogan deterioration model of a component, e.g. 
+    for ChunkedMonteCarloSimulation. The inputs are drawn from a sample 
+    design (see UniformSampler) through their inverse CDFs.
+
+    Parameter
+    ---------
+    folder_path : file path
+        folder with cal_out.mat, _SNparams.mat and q_out.mat
+    design : str
+        sample design: "random", "lhs" or "sobol"
+    seed : int, optional
+        seed of the sample design
+
+    Return
+    ------
+    sampler : function
+        sampler(size) returns the initial crack sizes of an array of shape 
+        <size> and the function propagating them one time step
+    a_crit : float
+        critical crack size
+    '''
+    inputs, a_crit = get_deterioration_inputs(folder_path)
+    uniform = UniformSampler(inputs.dim, design, seed)
+
+    def sampler(size):
+        p = uniform(int(np.prod(size))).reshape(*size, inputs.dim)
+        samples = inputs.from_uniform(p)
+        det_model = inputs.model(samples)
+        return samples['a_0'], det_model.propagate
+
+    return sampler, a_crit
+
+def get_deterioration_inputs(folder_path):
+    '''
+    Deterioration inputs
+    ====================
+
+    Random inputs of the Paris-Erdogan deterioration model of a component, 
+    e.g. for the rare event methods.
+
+    Parameter
+    ---------
+    folder_path : file path
+        folder with cal_out.mat, _SNparams.mat and q_out.mat
+
+    Return
+    ------
+    inputs : ParisErdoganInputs
+        distributions of a_0, C, q and Y_g
+    a_crit : float
+        critical crack size
+    '''
     lnC_mean, lnC_std = import_calibrated_values(os.path.join(folder_path, "cal_out.mat"))
     DFF, lifetime, a0_mean, a_crit, description, h, sn_params, m, q_cov, n_samples, n = import_component_inputs(os.path.join(folder_path,"_SNparams.mat"))
     q_mean = import_weilbull_mean(os.path.join(folder_path,"q_out.mat"))
-    q = np.random.normal(q_mean, q_mean*q_cov, n_samples)
-    C = np.random.lognormal(lnC_mean, lnC_std, n_samples)
-    a_0 = np.random.exponential(a0_mean, n_samples)
-    S = q*gamma(1.0+1.0/h)
 
-    Y_g = GeometricFactor.lognormal(n_samples=n_samples)
-    det_model = Paris_Erdogan()
-    det_model.initialize(a_0, m, n, C, S, Y_g)
-    function = det_model.propagate
+    distributions = {
+        'a_0': expon(scale=a0_mean),
+        'C': lognorm(s=lnC_std, scale=np.exp(lnC_mean)),
+        'q': norm(q_mean, q_mean*q_cov),
+        'Y_g': GeometricFactor.distribution()}
 
-    import_DBN_input_data()
+    return ParisErdoganInputs(distributions, m, n, h), a_crit
 
-    return function
+def get_deterioration_model(folder_path, design="random", seed=None):
+    '''
+    Deterioration model
+    ===================
+
+    Samples of the Paris-Erdogan deterioration model of a component, with 
+    the number of samples of _SNparams.mat.
 
+    Parameter
+    ---------
+    folder_path : file path
+        folder with cal_out.mat, _SNparams.mat and q_out.mat
+    design : str
+        sample design: "random", "lhs" or "sobol"
+    seed : int, optional
+        seed of the sample design
 
+    Return
+    ------
+    function : function
+        function propagating the crack sizes one time step
+    '''
+    n_samples = import_component_inputs(os.path.join(folder_path,"_SNparams.mat"))[9]
+    sampler, _ = get_deterioration_sampler(folder_path, design, seed)
+    a_0, function = sampler((n_samples,))
 
+    return function
@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+import numpy.testing as np_test
+from reliabpy.models.deterioration import Paris_Erdogan
+from reliabpy.models.inference import MonteCarloSimulation
+
+class TestParisErdogan(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        n_samples = 10000
+        self.inputs = (np.random.exponential(0.1, n_samples), 3.0, 5049216, 
+                       np.random.lognormal(np.log(1e-12), 0.5, n_samples), 
+                       np.random.normal(12.0, 2.0, n_samples), 1.0)
+
+    def reference(self, years):
+        # Paris-Erdogan law, year by year (infinite crack past the singularity, m > 2)
+        a_0, m, n, C, S, Y_g = self.inputs
+        a = a_0
+        for _ in range(years):
+            b = a**((2-m)/2) + ((2-m)/2)*C*(Y_g*np.pi**0.5*S)**m*n
+            a_next = b**(2./(2-m))
+            a = np.where(np.isnan(a_next) | (a_next <= a) | np.isinf(a) | (b <= 0), np.inf, a_next)
+        return a
+
+    def test_yearly_propagation(self):
+        model = Paris_Erdogan()
+        model.initialize(*self.inputs)
+        a = model.a
+        for _ in range(20):
+            self.assertIs(model.propagate(), a)
+        np_test.assert_allclose(a, self.reference(20), rtol=1e-9)
+
+    def test_closed_form_jump(self):
+        yearly, jump = Paris_Erdogan(), Paris_Erdogan()
+        yearly.initialize(*self.inputs)
+        jump.initialize(*self.inputs)
+        for _ in range(20):
+            yearly.propagate()
+        np_test.assert_allclose(jump.propagate(20), yearly.a, rtol=1e-9)
+
+    def test_monte_carlo_keeps_its_samples(self):
+        model = Paris_Erdogan()
+        model.initialize(*self.inputs)
+        mcs = MonteCarloSimulation(model.a.copy(), model.propagate, a_crit=20.0)
+        mcs.predict()
+        first = mcs.a
+        mcs.predict()
+        np_test.assert_allclose(first, self.reference(1), rtol=1e-9)
+        np_test.assert_allclose(mcs.a, self.reference(2), rtol=1e-9)
+
+    def test_scalar(self):
+        model = Paris_Erdogan()
+        model.initialize(2.0, 3.0, 5049216, 1.00e-12, 12.0, 1.0)
+        self.assertIsInstance(float(model.propagate()), float)
+        self.assertGreater(model.propagate(2), 2.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import unittest
+import numpy as np
+import numpy.testing as np_test
+from reliabpy.models.history import History, N_PHASES, PHASES
+from reliabpy.examples.offshore_wind_turbine import Simple
+from reliabpy.policy.policy import HeuristicRules
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'transition_matrices')
+
+class TestHistory(unittest.TestCase):
+    def test_columns(self):
+        history = History(capacity=2)
+        history.append(0, 0.0)
+        history.extend([1, 2, 3], [0.1, 0.2, 0.3])
+        history.append(3, 0.05, 'PoD', 'D')
+        history.append(3, 0.0, 'PR', 's0')
+
+        self.assertEqual(len(history), 6)
+        self.assertEqual(history.pf.dtype, np.float64)
+        self.assertEqual(history.action.dtype, np.int8)
+        np_test.assert_array_equal(history.get_year(), [0, 1, 2, 3, 3, 3])
+        np_test.assert_array_equal(history.get_phase(), [0, 0, 0, 0, 1, 2])
+        np_test.assert_allclose(history.get_pf(), [0.0, 0.1, 0.2, 0.3, 0.05, 0.0])
+        self.assertEqual(list(history.get_action()), [None]*4 + ['PoD', 'PR'])
+        self.assertEqual(list(history.get_output()), [None]*4 + ['D', 's0'])
+
+        # 14 bytes per row (int32 code, float64 pf, int8 action and output)
+        self.assertEqual(history.nbytes(), 14*len(history.code))
+        self.assertEqual(History(capacity=20*N_PHASES + 1).nbytes(), 14*61)
+
+    def test_unknown_labels(self):
+        history = History()
+        with self.assertRaises(ValueError):
+            history.append(1, 0.1, 'PoD', 'ND')
+        self.assertEqual(History.outputs, (None, 'D', 's0'))
+        self.assertEqual(len(history), 0)
+
+    def test_component_shares_inference_history(self):
+        model = Simple(input_folder=DATA_FOLDER)
+        model.mount_model(policy_rules=HeuristicRules(delta_t=4, nI=6, to_avoid=[8,9,10,11]))
+        model.run_one_episode(seed=3)
+
+        for component in model.monopile.components_list:
+            self.assertIs(component.history, component.inference_model.results)
+            year = component.history.get_year()
+            self.assertEqual(year[-1], 20)
+            self.assertTrue(np.all(np.diff(component.history.code[:len(component.history)]) > 0))
+
+    def test_integer_timeline(self):
+        model = Simple(input_folder=DATA_FOLDER)
+        model.mount_model(policy_rules=HeuristicRules(delta_t=4, nI=6, to_avoid=[8,9,10,11]))
+        model.run_one_episode(seed=3)
+        system = model.monopile
+
+        t, phase, _ = zip(*system.system_pf)
+        self.assertTrue(all(isinstance(x, int) for x in t + phase))
+        code = np.array(t)*N_PHASES + np.array(phase)
+        self.assertTrue(np.all(np.diff(code) > 0))
+        np_test.assert_array_equal(np.unique(t), np.arange(21))
+        for component in system.components_list:
+            self.assertTrue(np.issubdtype(component.t.dtype, np.integer))
+            np_test.assert_array_equal(component.phase[component.action == 'PoD'], PHASES['PoD'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import unittest
+import numpy as np
+import numpy.testing as np_test
+from scipy.stats import expon
+from reliabpy.models.inference import ChunkedMonteCarloSimulation, ParticleFilter
+from reliabpy.models.observation import Probability_of_Detection as PoD
+from reliabpy.models.base import ComponentLevel
+from reliabpy.models.history import PHASES
+from reliabpy.readwrite.ANAST import get_deterioration_inputs, get_deterioration_sampler
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'transition_matrices', 'atm')
+
+class TestChunkedMonteCarloSimulation(unittest.TestCase):
+    def setUp(self):
+        self.n_samples, self.shape, self.a_crit = 1000, (2, 3), 5.0
+        # deterministic samples: the n-th sample of every (episode, component) is the same in any chunk
+        quantiles = (np.arange(self.n_samples) + 0.5)/self.n_samples
+        self.a_0 = expon.ppf(quantiles, scale=0.5)*np.arange(1, 7).reshape(self.shape + (1,))
+        self.observations = {
+            2: ('good', np.array([[0, 1, np.nan], [1, 0, 0]])),
+            4: ('bad', np.array([[np.nan, 0, 1], [0, np.nan, 0]]))}
+
+    def sampler(self):
+        state = {'first': 0}
+        def sample(size):
+            a = self.a_0[..., state['first']:state['first'] + size[-1]].copy()
+            state['first'] += size[-1]
+            def function():
+                a[:] = a*1.3
+                return a
+            return a, function
+        return sample
+
+    def test_chunks_match_one_chunk(self):
+        one_chunk = ChunkedMonteCarloSimulation(self.sampler(), self.a_crit, self.n_samples, chunk_size=self.n_samples)
+        chunked = ChunkedMonteCarloSimulation(self.sampler(), self.a_crit, self.n_samples, chunk_size=300)
+        np_test.assert_allclose(one_chunk.run(6, self.observations), chunked.run(6, self.observations))
+        np_test.assert_allclose(one_chunk.ess, chunked.ess)
+
+    def test_likelihood_weights(self):
+        pf = ChunkedMonteCarloSimulation(self.sampler(), self.a_crit, self.n_samples, chunk_size=300).run(6, self.observations)
+
+        a, w = self.a_0.copy(), np.ones_like(self.a_0)
+        for t in range(7):
+            if t in self.observations:
+                quality, detected = self.observations[t]
+                p = PoD.function(a, **PoD.get_settings(quality)[0])
+                detected = detected[..., None]
+                w *= np.where(np.isnan(detected), 1.0, np.where(detected == 1, p, 1.0 - p))
+            np_test.assert_allclose(pf[..., t], (w*(a > self.a_crit)).sum(-1)/w.sum(-1))
+            a = a*1.3
+
+class TestParticleFilter(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.inputs, self.a_crit = get_deterioration_inputs(DATA_FOLDER)
+        self.inspections = [9, 17]
+
+    def run_component(self, particle_filter):
+        particle_filter.force_notdetection = True
+        component = ComponentLevel('atm1', particle_filter, 'bad')
+        for t in range(1, 21):
+            component.predict()
+            if t in self.inspections:
+                component.update()
+        return component
+
+    def test_matches_likelihood_weighted_monte_carlo(self):
+        sampler, _ = get_deterioration_sampler(DATA_FOLDER)
+        observations = {t: ('bad', np.zeros((1, 1))) for t in self.inspections}
+        reference = ChunkedMonteCarloSimulation(sampler, self.a_crit, 200000, chunk_size=50000).run(20, observations)[0, 0]
+
+        component = self.run_component(ParticleFilter(self.inputs, self.a_crit, 20000))
+        # the reference is the pf after the observations of each year
+        for t in [8, 9, 16, 20]:
+            phase = PHASES['PoD'] if t in self.inspections else PHASES[None]
+            pf = component.pf[(component.t == t) & (component.phase == phase)]
+            self.assertEqual(len(pf), 1)
+            np_test.assert_allclose(pf[0], reference[t], rtol=0.25)
+
+    def test_state_restores_particles(self):
+        particle_filter = ParticleFilter(self.inputs, self.a_crit, 2000, ess_threshold=1.0)
+        particle_filter.force_notdetection = True
+        particle_filter.predict(5)
+        state, random_state = particle_filter.get_state(), np.random.get_state()
+        self.assertIs(state['inputs'], particle_filter.inputs)
+
+        pf = list()
+        for _ in range(2):
+            particle_filter.set_state(state)
+            np.random.set_state(random_state)
+            particle_filter.predict(4)
+            particle_filter.update('bad')
+            particle_filter.predict(3)
+            pf.append(particle_filter.pf)
+        self.assertEqual(particle_filter.t, 12)
+        self.assertEqual(pf[0], pf[1])
+
+    def test_closed_form_prediction(self):
+        steps_pf = list()
+        for store_results in [True, False]:
+            np.random.seed(1)
+            particle_filter = ParticleFilter(self.inputs, self.a_crit, 5000)
+            particle_filter.store_results = store_results
+            particle_filter.force_notdetection = True
+            particle_filter.predict(10)
+            particle_filter.update('bad')
+            particle_filter.predict(6)
+            steps_pf.append(particle_filter.steps_pf)
+        self.assertEqual(len(steps_pf[1]), 6)
+        np_test.assert_allclose(steps_pf[1], steps_pf[0], rtol=1e-6)
+
+        # the negligible weights left by the inspection are dropped
+        self.assertTrue(np.all(particle_filter.weights > 1e-12*particle_filter.weights.max()))
+
+    def test_resampling(self):
+        particle_filter = ParticleFilter(self.inputs, self.a_crit, 5000, ess_threshold=1.0)
+        self.run_component(particle_filter)
+        self.assertEqual(particle_filter.n_resampling, len(self.inspections))
+        self.assertEqual(len(particle_filter.weights), 5000)
+        self.assertEqual(particle_filter.ess, 5000)
+
+        particle_filter.perform_action()
+        self.assertEqual(particle_filter.n_resampling, 0)
+        self.assertEqual(particle_filter.action, 'PR')
+
+if __name__ == '__main__':
+    unittest.main()
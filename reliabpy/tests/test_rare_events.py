@@ -0,0 +1,46 @@
+import os
+import unittest
+import numpy as np
+import numpy.testing as np_test
+from reliabpy.readwrite.ANAST import get_deterioration_inputs
+from reliabpy.models.rare_events import ImportanceSampling, SubsetSimulation
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'transition_matrices', 'atm')
+
+class TestRareEvents(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.inputs, self.a_crit = get_deterioration_inputs(DATA_FOLDER)
+        # crude Monte Carlo with 2*10^6 samples: pf(year 3) = 4.2e-4, 849 failures
+        self.year, self.pf = 3, 4.2e-4
+
+    def test_standard_normal_medians(self):
+        samples = self.inputs.from_standard_normal(np.zeros((1, self.inputs.dim)))
+        for name in self.inputs.names:
+            np_test.assert_allclose(samples[name], self.inputs.distributions[name].median())
+
+    def test_importance_sampling(self):
+        model = ImportanceSampling(self.inputs, self.a_crit, 2000)
+        model.fit(self.year)
+        pf, cov = model.run(self.year)
+        self.assertEqual(pf[0], 0.0)
+        self.assertLess(cov[-1], 0.1)
+        self.assertLess(abs(pf[-1] - self.pf), 4*cov[-1]*pf[-1])
+
+    def test_subset_simulation(self):
+        model = SubsetSimulation(self.inputs, self.a_crit, 2000)
+        pf, cov = model.run(self.year)
+        self.assertLess(cov, 0.3)
+        self.assertLess(abs(pf - self.pf), 4*cov*pf)
+
+    def test_subset_simulation_jointly_rare_outcomes(self):
+        # about 8% of the samples match the outcomes, less than the p0 = 10% seeds
+        # crude Monte Carlo with 2*10^6 samples: pf(year 3 | outcomes) = 2.35e-4, 41 failures
+        observations = {1: ('bad', True), 2: ('bad', False), 3: ('bad', True)}
+        model = SubsetSimulation(self.inputs, self.a_crit, 2000)
+        pf, cov = model.run(self.year, observations)
+        self.assertTrue(np.all(np.isfinite(model.levels)))
+        self.assertLess(abs(pf - 2.35e-4), 4*cov*pf)
+
+if __name__ == '__main__':
+    unittest.main()
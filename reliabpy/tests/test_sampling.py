@@ -0,0 +1,21 @@
+import unittest
+import numpy as np
+import numpy.testing as np_test
+from reliabpy.commons.sampling import UniformSampler
+
+class TestUniformSampler(unittest.TestCase):
+    def test_sobol_chunks_continue_the_sequence(self):
+        chunks = UniformSampler(4, "sobol", seed=0)
+        np_test.assert_array_equal(np.vstack([chunks(8), chunks(8)]), UniformSampler(4, "sobol", seed=0)(16))
+
+    def test_latin_hypercube_strata(self):
+        p = UniformSampler(3, "lhs", seed=0)(50)
+        for column in p.T:
+            np_test.assert_array_equal(np.sort(np.floor(column*50)), np.arange(50))
+
+    def test_unknown_design(self):
+        with self.assertRaises(ValueError):
+            UniformSampler(3, "halton")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,269 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import numpy.testing as np_test
+from reliabpy.examples.offshore_wind_turbine import Simple, Farm
+from reliabpy.policy.policy import HeuristicRules, HeuristicRulesGrid
+from reliabpy.policy.evaluation import BeliefTreeEvaluator
+from reliabpy.models.cost import InspectionMaintenance, EventLog
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'transition_matrices')
+COSTS = ['C_C', 'C_I', 'C_R', 'R_F', 'C_T']
+
+class TestSystemLevel(unittest.TestCase):
+    def setUp(self):
+        self.model = Simple(input_folder=DATA_FOLDER)
+        self.model.mount_model(policy_rules=HeuristicRules(delta_t=4, nI=6, to_avoid=[8,9,10,11]))
+
+    def test_batch_matches_sequential(self):
+        n_episodes, seed = 5, 7
+        sequential = list()
+        for e in range(n_episodes):
+            sequential.append(self.model.run_one_episode(seed=seed + e))
+            self.model.monopile._reset()
+        batched = self.model.run_one_episode(batch_size=n_episodes, seed=seed)
+
+        self.assertEqual(len(batched), n_episodes)
+        for seq, bat in zip(sequential, batched):
+            np_test.assert_allclose([seq[c] for c in COSTS], [bat[c] for c in COSTS], rtol=1e-6)
+
+    def test_uninspectable_components_raise(self):
+        # the buried components have no inspection model
+        self.model.mount_model(policy_rules=HeuristicRules(delta_t=4, nI=12))
+        with self.assertRaises(ValueError):
+            self.model.run_one_episode(seed=0)
+        with self.assertRaises(ValueError):
+            self.model.run_one_episode(batch_size=2, seed=0)
+        with self.assertRaises(ValueError):
+            BeliefTreeEvaluator(self.model.monopile).evaluate(20)
+
+    def test_jump_ahead_matches_yearly_steps(self):
+        jump = self.model.run_one_episode(seed=3)
+        jump_pf = np.array(self.model.monopile.system_pf, dtype=float)
+
+        policy = HeuristicRules(delta_t=4, nI=6, to_avoid=[8,9,10,11])
+        policy.next_decision = lambda t: t + 1
+        self.model.mount_model(policy_rules=policy)
+        yearly = self.model.run_one_episode(seed=3)
+        yearly_pf = np.array(self.model.monopile.system_pf, dtype=float)
+
+        np_test.assert_allclose(jump_pf, yearly_pf, rtol=1e-5, atol=1e-9)
+        np_test.assert_allclose([jump[c] for c in COSTS], [yearly[c] for c in COSTS], rtol=1e-5)
+
+    def test_cost_only_matches_breakdown(self):
+        for seed in range(5):
+            full = self.model.run_one_episode(seed=seed)
+            self.model.monopile._reset()
+            lean = self.model.run_one_episode(seed=seed, cost_only=True)
+            self.assertIsNone(self.model.monopile.system_pf)
+            self.assertTrue(all(component.inference_model.store_results for component in self.model.monopile.components_list))
+            self.model.monopile._reset()
+            self.assertEqual(full, lean)
+
+        # a sequential run can follow a cost only run
+        self.model.run_one_episode(cost_only=True)
+        self.assertIsNone(self.model.monopile.cost_accumulator)
+        self.model.monopile.run(30)
+        self.assertEqual(self.model.monopile.t, 30)
+        self.model.monopile._reset()
+
+        full = self.model.run_one_episode(batch_size=8, seed=0)
+        lean = self.model.run_one_episode(batch_size=8, seed=0, cost_only=True)
+        self.assertEqual(full, lean)
+
+    def test_cost_batch_matches_breakdown(self):
+        pf, pf_end = np.zeros((4, 21)), np.zeros((4, 21))
+        inspected, repaired = np.zeros((4, 21, 12), dtype=bool), np.zeros((4, 21, 12), dtype=bool)
+        sequential = list()
+        for e in range(4):
+            sequential.append(self.model.run_one_episode(seed=e))
+            system = self.model.monopile
+            for t, phase, x in system.system_pf:
+                pf_end[e, t] = x
+                if phase == 0: pf[e, t] = x
+            for i, component in enumerate(system.components_list):
+                inspected[e, component.t[component.action == 'PoD'], i] = True
+                repaired[e, component.t[component.action == 'PR'], i] = True
+            system._reset()
+
+        cost_model = self.model.monopile.cost_model
+        yearly, total, expected = cost_model.compute_cost_batch(pf, inspected, repaired, pf_end)
+        self.assertEqual(yearly['C_T'].shape, (4, 21))
+        for e, seq in enumerate(sequential):
+            self.assertEqual(seq, {c: total[c][e] for c in COSTS})
+        _, counted, _ = cost_model.compute_cost_batch(pf, inspected.sum(axis=2), repaired.sum(axis=2), pf_end)
+        for c in COSTS:
+            np_test.assert_array_equal(counted[c], total[c])
+            self.assertAlmostEqual(expected[c], np.mean([seq[c] for seq in sequential]))
+
+    def test_event_log_reprices_costs(self):
+        costs = self.model.run_one_episode(batch_size=6, seed=3, cost_only=True)
+        log = self.model.monopile.event_log
+        self.model.run_one_episode(batch_size=6, seed=3)
+        full_log = self.model.monopile.event_log
+        np_test.assert_array_equal(log.inspected, full_log.inspected)
+        np_test.assert_array_equal(log.repaired, full_log.repaired)
+        np_test.assert_array_equal(log.delta_pf, full_log.delta_pf)
+
+        with tempfile.TemporaryDirectory() as folder:
+            log.save(os.path.join(folder, 'log.npz'))
+            log = EventLog.load(os.path.join(folder, 'log.npz'))
+        _, total, _ = log.price(self.model.monopile.cost_model)
+        for e, episode in enumerate(costs):
+            self.assertEqual(episode, {c: total[c][e] for c in COSTS})
+
+        grid = log.expected_costs(c_f=[10000, 20000], r=[0.02, 0.05])
+        for c_f, r, C_T in zip([10000, 20000], [0.02, 0.05], grid['C_T']):
+            _, _, expected = log.price(InspectionMaintenance(c_f=c_f, r=r))
+            self.assertAlmostEqual(C_T, expected['C_T'])
+
+    def test_policy_grid_matches_policies(self):
+        system = self.model.monopile
+        policies, n_samples = [(3, 4, [8,9,10,11]), (4, 6, [0,8,9,10,11]), (10000, 1, [8,9,10,11])], 4
+        expected = list()
+        for delta_t, nI, to_avoid in policies:
+            system.policy_rules = HeuristicRules(delta_t, nI, to_avoid)
+            system.policy_rules.import_model(system)
+            expected += self.model.run_one_episode(batch_size=n_samples, seed=20)
+
+        delta_t, nI, to_avoid = zip(*policies)
+        grid = HeuristicRulesGrid(delta_t, nI, to_avoid, n_samples)
+        grid.import_model(system)
+        system.policy_rules = grid
+        seeds = np.tile(20 + np.arange(n_samples), len(policies))
+        self.assertEqual(expected, self.model.run_one_episode(batch_size=grid.batch_size, seed=seeds, cost_only=True))
+        self.assertEqual(expected, self.model.run_one_episode(batch_size=grid.batch_size, seed=seeds))
+        with self.assertRaises(ValueError):
+            self.model.run_one_episode(batch_size=grid.batch_size, seed=seeds[1:])
+        with self.assertRaises(TypeError):
+            grid.to_observe()
+
+    def test_farm_of_one_turbine_matches_system(self):
+        system = self.model.run_one_episode(batch_size=4, seed=5)
+        farm = Farm(input_folder=DATA_FOLDER)
+        farm.mount_model(n_turbines=1, turbine_k=1, policy_rules=HeuristicRules(delta_t=4, nI=6, to_avoid=[8,9,10,11]))
+        for seq, bat in zip(system, farm.run_one_episode(batch_size=4, seed=5)):
+            np_test.assert_allclose([seq[c] for c in COSTS], [bat[c] for c in COSTS], rtol=1e-12)
+
+    def test_farm_policy_grid_matches_policies(self):
+        farm = Farm(input_folder=DATA_FOLDER)
+        policies, n_samples, n_turbines = [(3, 4), (4, 6), (10000, 1)], 2, 3
+        expected = list()
+        for delta_t, nI in policies:
+            farm.mount_model(n_turbines=n_turbines, turbine_k=2, policy_rules=HeuristicRules(delta_t, nI, [8,9,10,11]))
+            self.assertIsNot(farm.monopile.policy_rules, farm.farm.policy_rules)
+            self.assertIs(farm.monopile.policy_rules.system_model, farm.monopile)
+            expected += farm.run_one_episode(batch_size=n_samples, seed=7)
+
+        delta_t, nI = zip(*policies)
+        grid = HeuristicRulesGrid(delta_t, nI, [8,9,10,11], n_samples*n_turbines)
+        grid.import_model(farm.farm)
+        farm.farm.policy_rules = grid
+        seeds = np.tile(7 + np.arange(n_samples), len(policies))
+        farm.farm.run(20, batch_size=len(seeds), seed=seeds)
+        self.assertEqual(expected, farm.farm.cost_breakdown)
+
+    def test_farm_shares_campaigns(self):
+        farm = Farm(input_folder=DATA_FOLDER)
+        farm.mount_model(n_turbines=20, turbine_k=18)
+        costs = farm.run_one_episode(seed=0)
+        campaigns = np.arange(4, 20, 4)
+        self.assertAlmostEqual(costs['C_C'], (5.0*0.98**campaigns).sum())
+        self.assertEqual(farm.farm.turbine_pf.shape, (21, 20))
+        self.assertTrue(np.all(farm.farm.farm_pf <= farm.farm.turbine_pf.sum(axis=1) + 1e-12))
+
+    def test_snapshot_restore_and_fork(self):
+        system = self.model.monopile
+        initial = system.snapshot()
+        full = self.model.run_one_episode(seed=2)
+        system.restore(initial)
+        self.assertEqual(full, self.model.run_one_episode(seed=2))
+
+        system.restore(initial)
+        system.lifetime, system.detection_draws = 20, system._detection_draws(20, 2)
+        for _ in range(9):
+            system.forward_one_timestep()
+        middle, fork = system.snapshot(), system.fork()
+        for branch in (system, fork):
+            while branch.t < 20:
+                branch.forward_one_timestep()
+            branch.cost_model.compute_cost_breakdown(branch)
+        # yearly steps instead of jumps: same costs up to round-off
+        np_test.assert_allclose([full[c] for c in COSTS], [system.cost_breakdown[c] for c in COSTS], rtol=1e-6)
+        self.assertEqual(system.cost_breakdown, fork.cost_breakdown)
+
+        system.restore(middle)
+        self.assertEqual(system.t, 9)
+        self.assertEqual(system.components_list[0].history.get_year()[-1], 9)
+
+    def test_system_state_matches_components(self):
+        self.model.run_one_episode(seed=11)
+        system = self.model.monopile
+        for i, component in enumerate(system.components_list):
+            self.assertEqual(system.state.pf[i], component.pf[-1])
+            self.assertEqual(system.get_step_results('output', dtype='list')[i], component.output[-1])
+        np_test.assert_array_equal(system.state.detected(), [x == 'D' for x in system.get_step_results('output', dtype='list')])
+
+    def test_reset_shares_zone_model(self):
+        self.model.run_one_episode(seed=1)
+        self.model.monopile._reset()
+        models = [component.inference_model for component in self.model.monopile.components_list]
+        mounted = [x['inference'] for x in self.model.monopile.components_reliability_models_list.values()]
+
+        for model, mounted_model in zip(models, mounted):
+            self.assertIsNot(model, mounted_model)
+            self.assertIs(model.model, mounted_model.model)
+            self.assertEqual(model.t, 0)
+        self.assertIs(models[0].T, models[3].T)
+
+    def test_belief_cache_matches_uncached(self):
+        models = {id(x['inference'].model): x['inference'].model for x in self.model.monopile.components_reliability_models_list.values()}
+        for model in models.values():
+            model.beliefs.maxsize = 0
+        uncached = self.model.run_one_episode(seed=5)
+        self.model.monopile._reset()
+
+        for model in models.values():
+            model.beliefs.maxsize = 64
+        self.model.run_one_episode(seed=5)
+        self.model.monopile._reset()
+        cached = self.model.run_one_episode(seed=5)
+
+        np_test.assert_allclose([uncached[c] for c in COSTS], [cached[c] for c in COSTS], rtol=1e-6)
+        self.assertGreater(sum(model.beliefs.hits for model in models.values()), 0)
+        self.assertTrue(all(len(model.beliefs) <= 64 for model in models.values()))
+
+    def test_belief_tree_matches_monte_carlo(self):
+        self.model.mount_model(policy_rules=HeuristicRules(delta_t=10, nI=2, to_avoid=[8,9,10,11]))
+        tree = BeliefTreeEvaluator(self.model.monopile, exchangeable=[[0,1,2,3], [4,5,6,7], [8,9,10,11]])
+        exact, error_bound = tree.evaluate(20)
+        self.assertEqual(error_bound, 0.0)
+
+        full, _ = BeliefTreeEvaluator(self.model.monopile).evaluate(20)
+        np_test.assert_allclose([exact[c] for c in COSTS], [full[c] for c in COSTS], rtol=1e-6)
+        self.assertEqual(self.model.monopile.t, 0)
+
+        self.model.monopile._reset()
+        episodes = np.array([[x[c] for c in COSTS] for x in self.model.run_one_episode(batch_size=500, seed=0)])
+        std_error = episodes.std(axis=0)/np.sqrt(len(episodes))
+        self.assertTrue(np.all(np.abs(episodes.mean(axis=0) - [exact[c] for c in COSTS]) <= 4*std_error + 1e-6))
+
+    def test_belief_tree_error_bound(self):
+        exchangeable = [[0,1,2,3], [4,5,6,7], [8,9,10,11]]
+        exact, _ = BeliefTreeEvaluator(self.model.monopile, exchangeable=exchangeable).evaluate(20)
+        bounds = list()
+        for min_probability in [1e-2, 1e-3]:
+            pruned, error_bound = BeliefTreeEvaluator(self.model.monopile, min_probability=min_probability, exchangeable=exchangeable).evaluate(20)
+            self.assertLessEqual(abs(exact['C_T'] - pruned['C_T']), error_bound)
+            bounds.append(error_bound)
+        self.assertLess(bounds[1], bounds[0])
+
+        # the system is left as it was: a sequential run still runs
+        sequential = self.model.run_one_episode(seed=1)
+        self.assertEqual(self.model.monopile.t, 20)
+        self.model.monopile._reset()
+        self.assertEqual(sequential, self.model.run_one_episode(seed=1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import itertools
+import unittest
+import numpy as np
+import numpy.testing as np_test
+from reliabpy.models.system_effects import comp_k_out_of_n, comp_k_out_of_n_batch, comp_k_out_of_n_importance, System_of_Subsystems, Binary_Decision_Diagram
+
+class TestKOutOfN(unittest.TestCase):
+    def test_batch_matches_scalar(self):
+        np.random.seed(0)
+        for n in range(1, 8):
+            for k in range(1, n + 1):
+                pf = np.random.random((10, n))**3
+                np_test.assert_allclose(comp_k_out_of_n_batch(pf, k),
+                                        [comp_k_out_of_n(x, k) for x in pf], rtol=1e-12, atol=1e-15)
+
+    def test_system_of_subsystems_batch(self):
+        np.random.seed(1)
+        system = System_of_Subsystems(['atm']*4 + ['sub']*4 + ['bur']*4, {'atm':3, 'sub':3, 'bur':3})
+        pf = 0.2*np.random.random((6, 5, 12))
+        pf_sys = system.compute_system_pf(pf)
+
+        self.assertEqual(pf_sys.shape, (6, 5))
+        np_test.assert_allclose(pf_sys.reshape(-1), [system.compute_system_pf(x) for x in pf.reshape(-1, 12)], rtol=1e-12)
+
+    def test_importance_matches_perturbation(self):
+        np.random.seed(2)
+        system = System_of_Subsystems(['atm']*4 + ['sub']*4 + ['bur']*4, {'atm':3, 'sub':3, 'bur':2})
+        pf = 0.3*np.random.random((5, 12))
+        pf_sys, birnbaum = system.compute_importance(pf)
+        _, raw = system.compute_importance(pf, measure='raw')
+
+        np_test.assert_allclose(pf_sys, system.compute_system_pf(pf), rtol=1e-12)
+        for i in range(12):
+            failed, working = pf.copy(), pf.copy()
+            failed[:, i], working[:, i] = 1.0, 0.0
+            np_test.assert_allclose(birnbaum[:, i], system.compute_system_pf(failed) - system.compute_system_pf(working), rtol=1e-9)
+            np_test.assert_allclose(raw[:, i], system.compute_system_pf(failed)/pf_sys, rtol=1e-9)
+
+    def test_importance_k_larger_than_n(self):
+        pf_sys, importance = comp_k_out_of_n_importance(np.full((1, 3), 0.1), 4)
+        np_test.assert_allclose(pf_sys, 1.0)
+        np_test.assert_allclose(importance, 0.0)
+
+class TestBinaryDecisionDiagram(unittest.TestCase):
+    def test_matches_system_of_subsystems(self):
+        np.random.seed(3)
+        system = System_of_Subsystems(['atm']*4 + ['sub']*4 + ['bur']*4, {'atm':3, 'sub':3, 'bur':2})
+        diagram = Binary_Decision_Diagram(("series", ("k_out_of_n", 3, 0, 1, 2, 3), 
+                                           ("k_out_of_n", 3, 4, 5, 6, 7), ("k_out_of_n", 2, 8, 9, 10, 11)))
+        pf = 0.4*np.random.random((20, 12))
+        # only the nodes reached from the root: 6 decision nodes per zone and the terminals
+        self.assertEqual(len(diagram), 20)
+
+        np_test.assert_allclose(diagram.compute_system_pf(pf), system.compute_system_pf(pf), rtol=1e-12)
+        np_test.assert_allclose(diagram.compute_importance(pf)[1], system.compute_importance(pf)[1], rtol=1e-9, atol=1e-15)
+        self.assertAlmostEqual(diagram.compute_system_pf(pf[0]), system.compute_system_pf(pf[0]))
+
+    def test_matches_enumeration(self):
+        structure = ("or", ("and", 0, ("k_out_of_n", 2, 1, 2, 3)), ("parallel", 4, ("series", 2, 5)), ("and", 1, 5))
+        def fails(x, node):
+            if isinstance(node, int):
+                return x[node]
+            gate, *children = node
+            if gate == "k_out_of_n":
+                return sum(not fails(x, child) for child in children[1:]) < children[0]
+            failed = [fails(x, child) for child in children]
+            return any(failed) if gate in ("or", "series") else all(failed)
+
+        np.random.seed(4)
+        pf = np.random.random(6)
+        reference = sum(np.prod(np.where(x, pf, 1 - pf)) for x in itertools.product([False, True], repeat=6) if fails(x, structure))
+        diagram = Binary_Decision_Diagram(structure)
+        self.assertAlmostEqual(diagram.compute_system_pf(pf), reference)
+
+        _, birnbaum = diagram.compute_importance(pf)
+        for i in range(6):
+            failed, working = pf.copy(), pf.copy()
+            failed[i], working[i] = 1.0, 0.0
+            self.assertAlmostEqual(birnbaum[i], diagram.compute_system_pf(failed) - diagram.compute_system_pf(working))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import numpy.testing as np_test
+from reliabpy.readwrite.ANAST import get_deterioration_inputs, import_DBN_input_data
+from reliabpy.models.inference import TransitionMatrix, DynamicBayesianNetwork
+
+DATA_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'transition_matrices', 'atm')
+
+class TestTransitionMatrix(unittest.TestCase):
+    def setUp(self):
+        self.inputs, _ = get_deterioration_inputs(DATA_FOLDER)
+        self.T_anast, self.b0_anast, self.discretization = import_DBN_input_data(os.path.join(DATA_FOLDER, "dr_OUT.mat"))
+        self.transition_matrix = TransitionMatrix(self.discretization, self.inputs, n_samples=50000, design="sobol")
+
+    def test_matches_anast(self):
+        T, b0, discretization = self.transition_matrix.get_DBN_input_data(chunk_size=2**14)
+        np_test.assert_allclose(T.sum(axis=1), 1.0)
+        self.assertEqual(T.shape, self.T_anast.shape)
+
+        pf = list()
+        for model in [DynamicBayesianNetwork(T, b0, discretization), DynamicBayesianNetwork(self.T_anast, self.b0_anast, discretization)]:
+            model.predict(steps=10)
+            pf.append(np.array(model.steps_pf, dtype=float))
+        np_test.assert_allclose(pf[0][4:], pf[1][4:], rtol=0.15)
+
+    def test_parallel_and_cache(self):
+        T = self.transition_matrix.build_T(chunk_size=2**14)
+        with tempfile.TemporaryDirectory() as folder:
+            parallel = self.transition_matrix.build_T(chunk_size=2**14, n_jobs=2, cache_folder=folder)
+            self.assertEqual(os.listdir(folder), [f"T_{self.transition_matrix.hash()}.npz"])
+            cached = self.transition_matrix.build_T(cache_folder=folder)
+        self.assertEqual((T != parallel).nnz, 0)
+        self.assertEqual((T != cached).nnz, 0)
+
+        other = TransitionMatrix(self.discretization, self.inputs, n_samples=50000, design="sobol", seed=1)
+        self.assertNotEqual(other.hash(), self.transition_matrix.hash())
+
+    def test_hash_of_lhs_chunks(self):
+        # Sobol chunks continue the sequence, Latin hypercube chunks do not
+        self.assertEqual(self.transition_matrix.hash(2**14), self.transition_matrix.hash(2**15))
+        lhs = TransitionMatrix(self.discretization, self.inputs, n_samples=50000, design="lhs")
+        self.assertNotEqual(lhs.hash(2**14), lhs.hash(2**15))
+        self.assertEqual(lhs.hash(), lhs.hash(10**6))
+
+if __name__ == '__main__':
+    unittest.main()